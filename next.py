@@ -1,36 +1,44 @@
 import pandas as pd
-import pickle
-import time
 from datetime import datetime, timedelta
 import numpy as np
 import os
+from predict import predict_horizon, read_predictions, record_first_prediction, rollout_data
+from hot_store import HotPredictionWriter, default_archive, get_hot_store
+from model_registry import get_registry
+from prediction_log import PredictionLogWriter
+from sensor_schema import read_csv
+
+# 한 스텝 최대 변화량 (온도 ±0.5도, 습도 ±1%)
+CLAMP_LIMITS = (0.5, 1.0)
+
+# 예측 로그 (프로세스당 하나, 첫 저장 시 생성)
+_prediction_writer = None
+
+def get_prediction_writer():
+    """예측 로그 반환 (HOT_STORE_PATH가 있으면 SQLite 저장소, 없으면 predictions.csv에 한 줄씩 추가)"""
+    global _prediction_writer
+    if _prediction_writer is None:
+        hot_store = get_hot_store()
+        if hot_store is not None:
+            _prediction_writer = HotPredictionWriter(hot_store)
+        else:
+            _prediction_writer = PredictionLogWriter("predictions.csv", fsync='interval')
+    return _prediction_writer
 
 def prepare_data_from_time(data, start_time):
-    """특정 시간까지의 데이터만 사용"""
-    data['저장시간'] = pd.to_datetime(data['저장시간'])
-    return data[data['저장시간'] <= start_time].copy()
+    """특정 시간까지의 데이터만 사용 (data는 sensor_schema 타입 데이터프레임)"""
+    if data['저장시간'].is_monotonic_increasing:
+        # 시간순이면 복사 없이 앞부분만 사용
+        return data.iloc[:data['저장시간'].searchsorted(start_time, side='right')]
+    return data[data['저장시간'] <= start_time]
 
 def predict_next_values(temp_model_dict, humid_model_dict, data):
     """다음 시점 예측"""
     try:
-        # 입력 데이터 준비
-        X = data[['내부온도', '내부습도']].iloc[-1:]
-        
-        # 스케일러 적용
-        X_scaled_temp = temp_model_dict['scaler'].transform(X)
-        X_scaled_humid = humid_model_dict['scaler'].transform(X)
-        
-        # 예측
-        next_temp = temp_model_dict['model'].predict(X_scaled_temp)[0]
-        next_humid = humid_model_dict['model'].predict(X_scaled_humid)[0]
-        
-        # 예측값이 너무 급격하게 변하지 않도록 제한
-        last_temp = float(data['내부온도'].iloc[-1])
-        last_humid = float(data['내부습도'].iloc[-1])
-        
-        # 변화량을 제한 (최대 ±0.5도, ±1% 변화)
-        next_temp = last_temp + np.clip(next_temp - last_temp, -0.5, 0.5)
-        next_humid = last_humid + np.clip(next_humid - last_humid, -1.0, 1.0)
+        # 스케일러 적용 및 예측 (특성 모델이면 최근 이력으로 특성 계산), 변화량을 제한 (최대 ±0.5도, ±1% 변화)
+        next_temp, next_humid = rollout_data(
+            temp_model_dict, humid_model_dict, data, 1, clamp=CLAMP_LIMITS, round_state=False
+        )[0, 0]
         
         return float(next_temp), float(next_humid)
         
@@ -45,87 +53,66 @@ def predict_next_values(temp_model_dict, humid_model_dict, data):
 
 def save_prediction(next_time, next_temp, next_humid, mode='a'):
     """예측 데이터 저장 (누적)"""
-    new_prediction = pd.DataFrame({
-        '예측시간': [next_time],
-        '예측온도': [round(next_temp, 1)],
-        '예측습도': [round(next_humid, 1)]
-    })
-
-    if mode == 'w' or not os.path.exists("predictions.csv"):
-        # 파일이 없거나 초기화 모드일 때는 새로 생성
-        new_prediction.to_csv("predictions.csv", index=False)
-    else:
-        # 기존 파일이 있을 때는 누적
-        predictions = pd.read_csv("predictions.csv")
-        updated_predictions = pd.concat([predictions, new_prediction], ignore_index=True)
-        updated_predictions.to_csv("predictions.csv", index=False)
+    writer = get_prediction_writer()
+    if mode == 'w':
+        # 초기화 모드일 때는 헤더만 남기고 새로 시작
+        writer.reset()
+    # 기존 파일을 다시 읽지 않고 끝에 한 줄만 추가
+    writer.append(next_time, round(next_temp, 1), round(next_humid, 1))
     
     print(f"예측 완료 - 시간: {next_time}, 온도: {round(next_temp, 1)}°C, 습도: {round(next_humid, 1)}%")
 
-def run_prediction_service():
-    """예측 서비스 실행"""
+def run_prediction_service(horizon=10):
+    """예측 서비스 실행 (horizon: 예측할 분 수)"""
     print("예측 서비스를 시작합니다...")
     
-    # 모델 파일 경로
-    temp_model_path = "/Users/choejihye/pkl/lgb_temp_model_1min.pkl"
-    humid_model_path = "/Users/choejihye/pkl/lgb_humid_model_1min.pkl"
-    
     # 시작 시간 설정
     start_time = pd.Timestamp('2018-05-10 09:50:00')
     print(f"예측 시작 시간: {start_time}")
     
-    # 모델 로드
+    # 모델은 백그라운드에서 로드하고 그동안 입력 데이터를 읽음 (경로는 config.MODEL_DIR, 프로세스당 한 번만 로드)
+    registry = get_registry()
+    registry.prewarm()
+    # 실행 중 배포된 새 모델은 백그라운드에서 로드해서 교체 (예측 경로에서는 로드하지 않음)
+    registry.start_watcher()
+    
+    # 초기 데이터 읽기
+    if get_hot_store() is not None:
+        data = get_hot_store().table('sensor', default_archive()).window(None, start_time)
+    else:
+        data = read_csv("sensor_data.csv")
+    data = prepare_data_from_time(data, start_time)
+    
     try:
-        with open(temp_model_path, 'rb') as f:
-            temp_model_dict = pickle.load(f)
-        with open(humid_model_path, 'rb') as f:
-            humid_model_dict = pickle.load(f)
+        temp_model_dict = registry.get('temperature')
+        humid_model_dict = registry.get('humidity')
         print("모델 로드 완료")
+        registry.report()
     except Exception as e:
         print(f"모델 로드 실패: {str(e)}")
         return
     
-    # 초기 데이터 읽기
-    data = pd.read_csv("sensor_data.csv")
-    data = prepare_data_from_time(data, start_time)
-    current_time = start_time
-    
-    # predictions.csv 초기화
-    if os.path.exists("predictions.csv"):
-        os.remove("predictions.csv")
+    # 예측 초기화 (predictions.csv는 삭제하지 않고 헤더만 있는 파일로 원자적 교체)
+    get_prediction_writer().reset()
     
-    while current_time < pd.Timestamp('2018-05-10 10:00:00'):
-        try:
-            # 예측
-            next_temp, next_humid = predict_next_values(temp_model_dict, humid_model_dict, data)
-            next_time = current_time + timedelta(minutes=1)
-            
-            # 예측 결과 저장 (누적)
+    try:
+        # 전체 예측 구간을 한 번에 계산한 뒤 누적 저장
+        forecast = predict_horizon(
+            temp_model_dict, humid_model_dict, data, horizon, start_time, clamp=CLAMP_LIMITS
+        )
+        for next_time, next_temp, next_humid in forecast.itertuples(index=False):
             save_prediction(next_time, next_temp, next_humid)
-            
-            # 예측 결과를 데이터에 추가
-            new_row = pd.DataFrame({
-                '저장시간': [next_time],
-                '내부온도': [round(next_temp, 1)],
-                '내부습도': [round(next_humid, 1)]
-            })
-            data = pd.concat([data, new_row], ignore_index=True)
-            
-            # 시간 업데이트
-            current_time = next_time
-            
-            # 1초 대기
-            time.sleep(1)
-            
-        except Exception as e:
-            print(f"에러 발생: {str(e)}")
-            time.sleep(1)
+        record_first_prediction()
+    except Exception as e:
+        print(f"에러 발생: {str(e)}")
     
     # 최종 결과 출력
+    get_prediction_writer().close()
     print("\n예측 완료")
-    predictions = pd.read_csv("predictions.csv")
+    predictions = read_predictions()
     print("\n최종 예측 결과:")
-    print(predictions)
+    # 예측값은 0.1 단위로 저장됨 (float32 값을 그대로 출력하면 59.299999처럼 보임)
+    print(predictions.to_string(float_format='{:.1f}'.format))
 
 if __name__ == "__main__":
     run_prediction_service()
\ No newline at end of file
@@ -0,0 +1,372 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import get_metrics
+from sensor_schema import epoch_minutes
+
+# 검사할 센서 컬럼
+ANOMALY_COLUMNS = ['내부온도', '내부습도', '외부온도', '풍속', '이슬점', '누적일사량']
+
+# 이상 종류 (비트 플래그)
+RANGE = 1       # 측정 범위 밖 또는 결측
+SPIKE = 2       # EWMA 평균에서 표준편차의 sigma배 이상 벗어남
+RATE = 4        # 직전 값 대비 분당 변화량 초과
+STUCK = 8       # 같은 값이 오래 계속됨
+BACKWARDS = 16  # 누적일사량이 같은 날 안에서 감소
+DEW_POINT = 32  # 이슬점이 내부온도보다 높음
+ANOMALY_KINDS = {
+    RANGE: ('range', '측정 범위 밖'),
+    SPIKE: ('spike', '급격한 이상값'),
+    RATE: ('rate', '변화율 초과'),
+    STUCK: ('stuck', '값 고정 (센서 멈춤 의심)'),
+    BACKWARDS: ('backwards', '누적값 감소'),
+    DEW_POINT: ('dew_point', '이슬점이 내부온도보다 높음'),
+}
+
+# 컬럼별 물리적 범위
+SENSOR_LIMITS = {
+    '내부온도': (-10.0, 60.0),
+    '내부습도': (0.0, 100.0),
+    '외부온도': (-40.0, 60.0),
+    '풍속': (0.0, 60.0),
+    '이슬점': (-40.0, 60.0),
+    '누적일사량': (0.0, 5000.0),
+}
+# 분당 최대 변화량
+RATE_LIMITS = {
+    '내부온도': 3.0,
+    '내부습도': 15.0,
+    '외부온도': 3.0,
+    '풍속': 15.0,
+    '이슬점': 3.0,
+    '누적일사량': 20.0,
+}
+# 이상값 판단에 쓰는 최소 표준편차 (없는 컬럼은 검사 안 함: 돌풍이 잦은 풍속, 하루 동안 계속 오르는 누적일사량)
+SPIKE_MIN_STD = {
+    '내부온도': 0.3,
+    '내부습도': 1.5,
+    '외부온도': 0.3,
+    '이슬점': 0.3,
+}
+# 값 고정으로 볼 시간(분) (바람 없는 날의 풍속 0, 밤 동안의 누적일사량은 정상이므로 제외)
+STUCK_MINUTES = {
+    '내부온도': 120,
+    '내부습도': 120,
+    '외부온도': 240,
+    '이슬점': 120,
+}
+# 이슬점이 내부온도보다 이만큼 넘게 높으면 이상
+DEW_POINT_TOLERANCE = 0.5
+# 예측 전에 검사할 이전 행 수 (EWMA/분산이 자리 잡을 만큼)
+ANOMALY_LOOKBACK = 120
+
+
+class AnomalyDetector:
+    """
+    온실별 센서 이상 감지/보정기 (온실 × 컬럼당 상수 크기의 상태: EWMA 평균/분산, 직전 값, 고정 지속 시간 등)
+    process()는 여러 온실의 행을 배치로 받아, 같은 온실의 k번째 행끼리 묶어 NumPy로 한 번에 처리한다
+    이상값은 직전 정상 값으로, 이슬점은 내부온도 이하로 바꿔 내보낸다 (값 고정은 값 자체는 그럴듯하므로 표시만 함)
+    이상이 shift_after행 이상 계속되면 새 수준으로 받아들인다 (센서 교체, 실제 급변)
+    """
+
+    def __init__(self, columns=ANOMALY_COLUMNS, span=30, sigma=6.0, warmup=10, shift_after=10):
+        self.columns = list(columns)
+        self.alpha = 2.0 / (span + 1)
+        self.sigma = sigma
+        self.warmup = warmup
+        self.shift_after = shift_after
+
+        def per_column(table, default=np.nan):
+            return np.array([table.get(column, default) for column in self.columns], dtype=float)
+
+        self._low = per_column({c: limits[0] for c, limits in SENSOR_LIMITS.items()}, -np.inf)
+        self._high = per_column({c: limits[1] for c, limits in SENSOR_LIMITS.items()}, np.inf)
+        self._rate = per_column(RATE_LIMITS)
+        self._min_std = per_column(SPIKE_MIN_STD)
+        self._stuck = per_column(STUCK_MINUTES)
+        self._solar = self.columns.index('누적일사량') if '누적일사량' in self.columns else None
+        has_dew = '이슬점' in self.columns and '내부온도' in self.columns
+        self._dew = (self.columns.index('이슬점'), self.columns.index('내부온도')) if has_dew else None
+
+        self.sites = {}
+        self._site_ids = []
+        self._lock = threading.Lock()
+        self._allocate(16)
+        metrics = get_metrics()
+        self._counters = {
+            bit: metrics.counter('anomaly_readings_total', '이상으로 판단한 센서 값 수', kind=kind)
+            for bit, (kind, _) in ANOMALY_KINDS.items()
+        }
+
+    def _allocate(self, capacity):
+        columns = len(self.columns)
+        old = getattr(self, '_count', None)
+        size = 0 if old is None else len(old)
+        grown = {
+            '_count': np.zeros(capacity, dtype=np.int64),
+            '_minute': np.zeros(capacity, dtype=np.int64),
+            '_mean': np.zeros((capacity, columns)),
+            '_var': np.zeros((capacity, columns)),
+            '_last': np.zeros((capacity, columns)),
+            '_raw': np.zeros((capacity, columns)),
+            '_run': np.zeros((capacity, columns)),
+            '_shift': np.zeros((capacity, columns), dtype=np.int64),
+            '_flags': np.zeros((capacity, columns), dtype=np.uint8),
+            '_since': np.zeros((capacity, columns), dtype=np.int64),
+        }
+        for name, array in grown.items():
+            if size:
+                array[:size] = getattr(self, name)
+            setattr(self, name, array)
+
+    def site_index(self, site_id):
+        index = self.sites.get(site_id)
+        if index is None:
+            index = len(self._site_ids)
+            if index >= len(self._count):
+                self._allocate(2 * len(self._count))
+            self.sites[site_id] = index
+            self._site_ids.append(site_id)
+        return index
+
+    def reset(self):
+        """모든 온실 상태 초기화 (시간이 거꾸로 갔을 때 등)"""
+        with self._lock:
+            self.sites = {}
+            self._site_ids = []
+            self._count = None
+            self._allocate(16)
+
+    def last_minute(self, site_id):
+        """온실의 마지막으로 검사한 시점 (분 단위 정수), 없으면 None"""
+        index = self.sites.get(site_id)
+        if index is None or self._count[index] == 0:
+            return None
+        return int(self._minute[index])
+
+    def process(self, sites, minutes, values):
+        """
+        sites: 온실 id (하나 또는 행별 목록), minutes: 행별 시간 (분 단위 정수), values: (n, 컬럼 수)
+        같은 온실의 행은 시간순이어야 함, 이미 검사한 시점의 행은 상태를 바꾸지 않음
+        반환: (보정한 값, 행 × 컬럼 이상 플래그)
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.columns))
+        minutes = np.asarray(minutes, dtype=np.int64).reshape(-1)
+        n = len(values)
+        out = values.copy()
+        flags = np.zeros(values.shape, dtype=np.uint8)
+        if n == 0:
+            return out, flags
+        with self._lock:
+            if isinstance(sites, (str, int)):
+                index = np.full(n, self.site_index(sites), dtype=np.int64)
+            else:
+                index = np.fromiter((self.site_index(site) for site in sites), dtype=np.int64, count=n)
+            # 같은 온실의 k번째 행끼리 묶어서 차례로 처리 (한 묶음 안에서는 온실이 겹치지 않음)
+            order = np.argsort(index, kind='stable')
+            starts = np.flatnonzero(np.r_[True, index[order][1:] != index[order][:-1]])
+            sizes = np.diff(np.r_[starts, n])
+            for k in range(int(sizes.max())):
+                rows = order[starts[sizes > k] + k]
+                out[rows], flags[rows] = self._step(index[rows], minutes[rows], values[rows])
+        for bit, counter in self._counters.items():
+            count = int(np.count_nonzero(flags & bit))
+            if count:
+                counter.inc(count)
+        return out, flags
+
+    def _step(self, s, m, x):
+        """온실이 겹치지 않는 행들을 한 번에 검사하고 상태 갱신"""
+        count = self._count[s]
+        first = count == 0
+        seen = ~first[:, None]
+        last_minute = self._minute[s]
+        dt = np.maximum(m - last_minute, 1)[:, None].astype(float)
+        last = self._last[s]
+        mean = self._mean[s]
+        var = self._var[s]
+
+        with np.errstate(invalid='ignore'):
+            bad_range = np.isnan(x) | (x < self._low) | (x > self._high)
+            bad_rate = seen & ~bad_range & (np.abs(x - last) > self._rate * dt)
+            std = np.maximum(np.sqrt(var), self._min_std)
+            bad_spike = (count >= self.warmup)[:, None] & ~bad_range & (np.abs(x - mean) > self.sigma * std)
+            same = seen & (x == self._raw[s])
+            run = np.where(same, self._run[s] + dt, 0.0)
+            stuck = run >= self._stuck
+        backwards = np.zeros_like(bad_range)
+        if self._solar is not None:
+            # 누적일사량은 날이 바뀔 때 0으로 돌아가므로, 같은 날 안의 감소만 이상이고 변화율은 증가만 검사
+            j = self._solar
+            same_day = ~first & (m // 1440 == last_minute // 1440)
+            backwards[:, j] = same_day & ~bad_range[:, j] & (x[:, j] < last[:, j])
+            bad_rate[:, j] = same_day & ~bad_range[:, j] & (x[:, j] - last[:, j] > self._rate[j] * dt[:, 0])
+
+        # 이상이 계속되면 새 수준으로 받아들임 (하루 중간에 누적값이 다시 시작된 경우 포함)
+        jumped = bad_rate | bad_spike | backwards
+        shift = np.where(jumped, self._shift[s] + 1, 0)
+        accepted = shift >= self.shift_after
+        shift[accepted] = 0
+
+        flags = (RANGE * bad_range | SPIKE * bad_spike | RATE * bad_rate | STUCK * stuck
+                 | BACKWARDS * backwards).astype(np.uint8)
+        replace = (bad_range | jumped) & ~accepted
+        # 직전 정상 값으로 대체 (첫 행이면 범위 안으로 자름)
+        fallback = np.where(seen, last, np.clip(x, self._low, self._high))
+        out = np.where(replace, fallback, x)
+        if self._dew is not None:
+            dew, temp = self._dew
+            # 원래 값이 어긋나면 표시하고, 보정한 뒤에도 어긋나면 내부온도 이하로 바꿈
+            raw_dew = x[:, dew] > x[:, temp] + DEW_POINT_TOLERANCE
+            bad_dew = out[:, dew] > out[:, temp] + DEW_POINT_TOLERANCE
+            flags[:, dew] |= (DEW_POINT * (raw_dew | bad_dew)).astype(np.uint8)
+            out[:, dew] = np.where(bad_dew, np.minimum(np.where(first, out[:, temp], last[:, dew]), out[:, temp]),
+                                   out[:, dew])
+
+        # 상태 갱신 (보정한 값 기준, 이미 검사한 시점의 행은 제외)
+        live = first | (m > last_minute)
+        diff = out - mean
+        new_mean = np.where(seen & ~accepted, mean + self.alpha * diff, out)
+        new_var = np.where(seen & ~accepted, (1 - self.alpha) * (var + self.alpha * diff * diff), 0.0)
+        previous_flags = self._flags[s]
+        since = np.where((flags != 0) & (previous_flags == 0), m[:, None], self._since[s])
+        t = s[live]
+        self._mean[t] = new_mean[live]
+        self._var[t] = np.nan_to_num(new_var[live])
+        self._last[t] = out[live]
+        self._raw[t] = x[live]
+        self._run[t] = run[live]
+        self._shift[t] = shift[live]
+        self._flags[t] = flags[live]
+        self._since[t] = since[live]
+        self._minute[t] = m[live]
+        self._count[t] += 1
+
+        if not live.all():
+            # 같은 시점이 다시 들어오면 (같은 값을 여러 번 조회) 그때의 결과를, 더 이전 시점이면 그대로 돌려줌
+            again = ~live & (m == last_minute)
+            out[again] = last[again]
+            flags[again] = previous_flags[again]
+            older = ~live & ~again
+            out[older] = x[older]
+            flags[older] = 0
+        return out, flags
+
+    def alerts(self, site_id=None):
+        """
+        마지막 값에서 이상이 있는 (온실, 컬럼, 종류) 목록
+        반환: {'site_id', 'column', 'kind', 'label', 'since', 'value'} 딕셔너리 목록
+        """
+        with self._lock:
+            site_ids = [site_id] if site_id is not None else list(self._site_ids)
+            result = []
+            for site in site_ids:
+                index = self.sites.get(site)
+                if index is None:
+                    continue
+                for j in np.flatnonzero(self._flags[index]):
+                    for bit, (kind, label) in ANOMALY_KINDS.items():
+                        if self._flags[index, j] & bit:
+                            result.append({
+                                'site_id': site,
+                                'column': self.columns[j],
+                                'kind': kind,
+                                'label': label,
+                                'since': pd.Timestamp(int(self._since[index, j]), unit='m'),
+                                'value': float(self._raw[index, j]),
+                            })
+            return result
+
+
+def frame_minutes(frame):
+    """저장시간 컬럼을 분 단위 정수로"""
+    return epoch_minutes(frame['저장시간'])
+
+
+def repair_frame(frame, detector=None, site_id='default'):
+    """
+    센서 데이터프레임을 시간순으로 검사해서 (보정한 복사본, 컬럼별 이상 플래그 데이터프레임) 반환
+    detector를 주면 그 상태에 이어서 검사 (없으면 새로 만듦)
+    """
+    columns = [column for column in ANOMALY_COLUMNS if column in frame]
+    detector = detector or AnomalyDetector(columns)
+    repaired, flags = detector.process(site_id, frame_minutes(frame), frame[detector.columns].to_numpy(dtype=float))
+    frame = frame.copy()
+    frame[detector.columns] = repaired
+    return frame, pd.DataFrame(flags, columns=detector.columns, index=frame.index)
+
+
+class RecentRepairer:
+    """
+    예측 입력 보정기 (프로세스당 하나, get_recent_repairer()): 감지기 하나를 계속 쓰면서 아직 넣지 않은 새 행만 검사하고,
+    보정한 최근 값은 시간별로 보관해서 다시 조회할 때는 검사 없이 돌려준다 (예측마다 한두 행만 처리)
+    """
+
+    def __init__(self, lookback=ANOMALY_LOOKBACK, site_id='default'):
+        self.lookback = lookback
+        self.site_id = site_id
+        self._detector = None
+        self._minutes = np.empty(0, dtype=np.int64)
+        self._values = None
+        self._keep = 0
+        self._lock = threading.Lock()
+
+    def repair(self, frame, columns, rows=1):
+        """
+        마지막 rows행의 columns 값 배열 (rows, 컬럼 수), 센서 컬럼은 보정한 값
+        처음이거나 시간이 이어지지 않으면 그 앞 lookback행부터 새 감지기로 다시 검사
+        """
+        values = frame[columns].iloc[-rows:].to_numpy(dtype=float)
+        if len(frame) == 0 or '저장시간' not in frame:
+            return values
+        checked = [column for column in ANOMALY_COLUMNS if column in frame]
+        recent = frame.iloc[-(rows + self.lookback):]
+        minutes = frame_minutes(recent)
+        with self._lock:
+            self._keep = max(self._keep, rows + self.lookback)
+            detector = self._detector
+            last_minute = detector.last_minute(self.site_id) if detector is not None else None
+            if (detector is None or detector.columns != checked or last_minute is None
+                    or last_minute < minutes[0] or last_minute > minutes[-1]):
+                # 처음이거나 새 행이 창보다 많거나 시간이 거꾸로 가면 창 전체를 새 감지기로 검사
+                detector = self._detector = AnomalyDetector(checked)
+                self._minutes = np.empty(0, dtype=np.int64)
+                self._values = np.empty((0, len(checked)))
+                last_minute = minutes[0] - 1
+            new = minutes > last_minute
+            if new.any():
+                repaired, _ = detector.process(self.site_id, minutes[new],
+                                               recent[checked].to_numpy(dtype=float)[new])
+                self._minutes = np.concatenate([self._minutes, minutes[new]])[-self._keep:]
+                self._values = np.concatenate([self._values, repaired])[-self._keep:]
+            cached_minutes, cached_values = self._minutes, self._values
+
+        positions = np.minimum(np.searchsorted(cached_minutes, minutes[-rows:]), len(cached_minutes) - 1)
+        found = cached_minutes[positions] == minutes[-rows:]
+        for j, column in enumerate(columns):
+            if column in checked:
+                values[found, j] = cached_values[positions[found], checked.index(column)]
+        return values
+
+
+_repairer = None
+_repairer_lock = threading.Lock()
+
+
+def get_recent_repairer():
+    """프로세스 전체에서 공유하는 예측 입력 보정기"""
+    global _repairer
+    if _repairer is None:
+        with _repairer_lock:
+            if _repairer is None:
+                _repairer = RecentRepairer()
+    return _repairer
+
+
+def repair_recent(frame, columns, rows=1):
+    """
+    예측 입력용: 마지막 rows행의 columns 값 배열, 센서 이상값은 보정 (공용 보정기가 이전 호출에 이어서 새 행만 검사)
+    """
+    return get_recent_repairer().repair(frame, columns, rows)
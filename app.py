@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import time
 import numpy as np
 import os  # 이 줄을 추가
+import threading
+from anomaly import AnomalyDetector, frame_minutes
+from config import (DASHBOARD_ADMIN, DASHBOARD_PREWARM, DASHBOARD_STATE_FILE, HOT_STORE_PATH, SENSOR_ARCHIVE_DIR,
+                    SNAPSHOT_API_HOST, SNAPSHOT_API_PORT)
+from downsample import lttb_indices
+from metrics import BYTE_BUCKETS, get_metrics, process_start_time
+from sensor_schema import widen
+from sensor_store import ROLLUP_TIERS, SensorStore
+from ticker import Ticker
 
 # 페이지 설정 (스크립트 최상단에 위치)
 st.set_page_config(
@@ -17,6 +24,8 @@ st.set_page_config(
 # 세션 상태 초기화
 if 'update_counter' not in st.session_state:
     st.session_state.update_counter = 0
+if 'session_started' not in st.session_state:
+    st.session_state.session_started = time.perf_counter()
 
 # CSS 스타일은 동일하게 유지...
 st.markdown("""
@@ -67,43 +76,227 @@ st.markdown("""
             font-size: 1.5rem;
             font-weight: bold;
         }
+        .alert-container {
+            background-color: #fdecea;
+            border-left: 0.3rem solid #FF4B4B;
+            padding: 0.75rem 1rem;
+            border-radius: 0.5rem;
+            margin-bottom: 1rem;
+        }
+        .alert-title {
+            color: #b71c1c;
+            font-weight: bold;
+            margin-bottom: 0.25rem;
+        }
+        .alert-detail {
+            color: #666;
+            font-size: 0.9rem;
+        }
     </style>
 """, unsafe_allow_html=True)
 
-# 전역 변수로 상태 관리
-if 'current_time' not in st.session_state:
-    st.session_state.current_time = pd.Timestamp('2018-05-10 10:00:00')
+# 현재 시간보다 이 이상 오래된 센서 값은 표시하지 않음
+SENSOR_STALENESS = pd.Timedelta(minutes=5)
+# 센서 이상 감지를 처음 시작할 때 검사할 이전 구간
+ALERT_LOOKBACK = pd.Timedelta(hours=2)
+ALERT_SITE = 'default'
 
-def get_current_time():
-    """현재 시간 업데이트 및 반환"""
-    try:
-        # predictions.csv 파일 읽기
-        predictions = pd.read_csv("predictions.csv")
-        predictions['예측시간'] = pd.to_datetime(predictions['예측시간'])
-        
-        # 현재 시간을 예측 시간의 1분 전으로 설정
-        if not predictions.empty:
-            next_time = st.session_state.current_time + pd.Timedelta(minutes=1)
-            
-            # 다음 시간이 예측 시간 범위 내에 있으면 시간 업데이트
-            if next_time < predictions['예측시간'].max():
-                st.session_state.current_time = next_time
-                
-        return st.session_state.current_time
+# 조회 시작 시간, 조회 시간을 1분 진행시키는 간격(초)과 각 화면 조각의 갱신 주기(초)
+START_TIME = pd.Timestamp('2018-05-10 10:00:00')
+CLOCK_TICK_SECONDS = 1
+METRICS_REFRESH_SECONDS = 1
+CHART_REFRESH_SECONDS = 1
+
+# 그래프 조회 범위
+HISTORY_WINDOWS = {
+    '과거 30분': pd.Timedelta(minutes=30),
+    '과거 6시간': pd.Timedelta(hours=6),
+    '과거 1일': pd.Timedelta(days=1),
+    '과거 7일': pd.Timedelta(days=7),
+    '과거 30일': pd.Timedelta(days=30),
+    '과거 1년': pd.Timedelta(days=365),
+}
+
+# 그래프 표시 옵션
+CHART_CONFIG = {
+    'displayModeBar': False,
+    'staticPlot': False,    #툴팁 (그래프 가져다대면 정보 나오게)
+    'displaylogo': False,     # Plotly 로고 비활성화
+    'scrollZoom': True,      # 스크롤로 줌 가능
+}
+
+@st.cache_resource
+def get_store():
+    """모든 세션이 공유하는 센서/예측 데이터 저장소"""
+    return SensorStore("sensor_data.csv", "predictions.csv", archive_dir=SENSOR_ARCHIVE_DIR,
+                       hot_store_path=HOT_STORE_PATH)
+
+@st.cache_resource
+def start_metrics_export():
+    """METRICS_FILE / METRICS_PORT가 설정되어 있으면 서버 프로세스당 한 번 내보내기 시작"""
+    get_metrics().export_from_config()
+
+def store_bytes_read():
+    store = get_store()
+    return store.sensor.bytes_read + store.predictions.bytes_read
+
+def record_refresh(part, bytes_before):
+    """조각 갱신 횟수와 갱신 한 번에 파일에서 읽은 바이트 수 기록"""
+    metrics = get_metrics()
+    metrics.counter('dashboard_reruns_total', '대시보드 갱신 횟수', part=part).inc()
+    metrics.histogram('dashboard_bytes_read_per_refresh', '갱신 한 번에 읽은 바이트 수',
+                      buckets=BYTE_BUCKETS, part=part).observe(store_bytes_read() - bytes_before)
+
+def advance_time(current_time, store):
+    """조회 시간을 1분 진행 (마지막 예측 시간 전까지만)"""
+    last_prediction_time = store.predictions.last_time()
+    
+    # 현재 시간을 예측 시간의 1분 전으로 설정
+    if last_prediction_time is not None:
+        next_time = current_time + pd.Timedelta(minutes=1)
         
+        # 다음 시간이 예측 시간 범위 내에 있으면 시간 업데이트
+        if next_time < last_prediction_time:
+            return next_time
+    return current_time
+
+def build_snapshot(current_time, errors, store, detector=None):
+    """공용 시계가 시점마다 한 번 계산하는 값 (조회 범위별 그래프는 요청될 때 snapshot_chart에서 계산)"""
+    metrics = get_metrics()
+    with metrics.timed('dashboard_load_seconds', '대시보드 데이터 조회 시간', loader='sensor'):
+        sensor_data = get_sensor_data(current_time, errors, store)
+    with metrics.timed('dashboard_load_seconds', '대시보드 데이터 조회 시간', loader='prediction'):
+        prediction_data = get_prediction_data(current_time, errors, store)
+    alerts = []
+    if detector is not None:
+        with metrics.timed('dashboard_load_seconds', '대시보드 데이터 조회 시간', loader='alerts'):
+            alerts = get_sensor_alerts(current_time, detector, errors, store)
+    return {'sensor_data': sensor_data, 'prediction_data': prediction_data, 'alerts': alerts}
+
+@st.cache_resource
+def get_ticker():
+    """
+    서버 프로세스당 하나인 공용 시계 (모든 세션이 같은 스냅샷을 읽음)
+    DASHBOARD_STATE_FILE이 있으면 재시작 직후 마지막 스냅샷(그래프 포함)을 바로 보여주고 새 값은 백그라운드에서 계산
+    """
+    from model_registry import get_registry
+
+    # 이 프로세스에서 쓰는 모델의 교체 확인/로드는 백그라운드 스레드에서만 (시계 틱이 모델 로드로 밀리지 않도록)
+    get_registry().start_watcher()
+    # 시계 스레드에는 스크립트 실행 문맥이 없으므로 캐시된 저장소를 직접 넘긴다
+    store = get_store()
+    figures = get_chart_figures()
+    detector = AnomalyDetector()
+    ticker = Ticker(
+        START_TIME,
+        lambda current_time: advance_time(current_time, store),
+        lambda current_time, errors: build_snapshot(current_time, errors, store, detector),
+        sources=lambda: (store.sensor.version, store.predictions.version),
+        tick_seconds=CLOCK_TICK_SECONDS, name='dashboard', state_path=DASHBOARD_STATE_FILE,
+    ).start()
+    if DASHBOARD_PREWARM:
+        threading.Thread(target=prewarm, args=(ticker, store, figures), name='dashboard-prewarm',
+                         daemon=True).start()
+    return ticker
+
+@st.cache_resource
+def start_snapshot_api():
+    """SNAPSHOT_API_PORT가 설정되어 있으면 서버 프로세스당 한 번 스냅샷 JSON API 시작 (공용 시계 스냅샷을 그대로 사용)"""
+    from snapshot_api import SnapshotApi
+
+    ticker = get_ticker()
+    store = get_store()
+    api = SnapshotApi(lambda: ticker.snapshot, lambda snapshot: snapshot_payload(snapshot, store))
+    api.start(SNAPSHOT_API_PORT, SNAPSHOT_API_HOST)
+    return api
+
+def snapshot_payload(snapshot, store):
+    """스냅샷 API 응답: 지표 카드 값, 과거 30분 내부 온도/습도, 이후 예측, 센서 이상 알림"""
+    window = HISTORY_WINDOWS['과거 30분']
+    history = get_historical_data(window, None, snapshot.current_time, [], store)
+    prediction_data = snapshot['prediction_data']
+
+    def times(column):
+        return column.dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+    return {
+        'current_time': snapshot.current_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'sensor': snapshot['sensor_data'],
+        'history': {
+            'time': times(history['저장시간']),
+            'internal_temp': widen(history['내부온도'].to_numpy()).tolist(),
+            'internal_humidity': widen(history['내부습도'].to_numpy()).tolist(),
+        } if history is not None and not history.empty else None,
+        'predictions': {
+            'time': times(prediction_data['예측시간']),
+            'temp': widen(prediction_data['예측온도'].to_numpy()).tolist(),
+            'humidity': widen(prediction_data['예측습도'].to_numpy()).tolist(),
+        } if prediction_data is not None else None,
+        'alerts': [
+            {**alert, 'since': alert['since'].strftime('%Y-%m-%d %H:%M:%S')}
+            for alert in snapshot.values.get('alerts') or []
+        ],
+        'errors': snapshot.errors,
+    }
+
+def prewarm(ticker, store, figures):
+    """첫 화면에 필요한 것을 백그라운드에서 미리 준비 (조회 범위별 그래프 뼈대, 기본 조회 범위 그래프)"""
+    try:
+        with get_metrics().timed('dashboard_prewarm_seconds', '서버 시작 시 미리 준비한 시간'):
+            # 첫 세션이 바로 쓰는 기본 조회 범위부터
+            snapshot = ticker.snapshot
+            window_label = next(iter(HISTORY_WINDOWS))
+            snapshot.memo(('figure', window_label), lambda: snapshot_chart(snapshot, window_label, store, figures))
+            for window_label in HISTORY_WINDOWS:
+                chart_figure(figures, window_label)
     except Exception as e:
-        print(f"시간 업데이트 오류: {str(e)}")
-        return st.session_state.current_time
+        print(f"대시보드 미리 준비 오류: {str(e)}")
+
+@st.cache_resource
+def get_startup():
+    """서버 프로세스 시작 시각과 첫 화면 표시 여부"""
+    return {'started_at': process_start_time(), 'first_render': None, 'lock': threading.Lock()}
+
+def record_first_render(snapshot):
+    """세션의 첫 그래프 표시까지 걸린 시간과, 서버 프로세스 시작부터 첫 화면까지 걸린 시간 기록"""
+    if st.session_state.get('first_render_recorded'):
+        return
+    st.session_state.first_render_recorded = True
+    metrics = get_metrics()
+    source = 'restored' if snapshot.restored else 'computed'
+    metrics.histogram('dashboard_session_first_render_seconds', '세션 시작부터 첫 그래프 표시까지 시간',
+                      source=source).observe(time.perf_counter() - st.session_state.session_started)
+    startup = get_startup()
+    with startup['lock']:
+        if startup['first_render'] is not None:
+            return
+        startup['first_render'] = time.time() - startup['started_at']
+    metrics.histogram('dashboard_time_to_first_render_seconds', '서버 프로세스 시작부터 첫 화면 표시까지 시간',
+                      source=source).observe(startup['first_render'])
+    print(f"첫 화면 표시까지 {startup['first_render']:.2f}초 ({'저장된 스냅샷' if snapshot.restored else '새로 계산'})")
+
+def get_current_time():
+    """공용 시계의 현재 조회 시간"""
+    return get_ticker().snapshot.current_time
 
-def get_sensor_data():
-    """최신 센서 데이터 읽기"""
+def report_error(message, errors=None):
+    """세션 안에서는 바로 표시하고, 공용 시계에서는 스냅샷에 담아 각 세션이 표시"""
+    if errors is None:
+        st.error(message)
+    else:
+        errors.append(message)
+
+def get_sensor_data(current_time=None, errors=None, store=None):
+    """최신 센서 데이터 읽기 (current_time이 없으면 공용 시계의 현재 시간)"""
     try:
-        data = pd.read_csv("sensor_data.csv")
-        data['저장시간'] = pd.to_datetime(data['저장시간'])
-        current_time = get_current_time()
+        if current_time is None:
+            current_time = get_current_time()
         
-        # 현재 시간에 해당하는 데이터 찾기
-        latest_data = data[data['저장시간'] == current_time].iloc[0]
+        # 현재 시간 또는 그 직전의 가장 최근 데이터 찾기
+        latest_data = (store or get_store()).sensor.asof(current_time, tolerance=SENSOR_STALENESS)
+        if latest_data is None:
+            report_error(f"센서 데이터 없음: {current_time} 이전 {SENSOR_STALENESS} 이내의 측정값이 없습니다", errors)
+            return None
         
         return {
             'internal_temp': round(float(latest_data['내부온도']), 1),
@@ -115,50 +308,77 @@ def get_sensor_data():
             'solar_radiation': int(latest_data['누적일사량'])
         }
     except Exception as e:
-        st.error(f"센서 데이터 로드 오류: {str(e)}")
+        report_error(f"센서 데이터 로드 오류: {str(e)}", errors)
         return None
 
-def get_historical_data():
-    """과거 30분 데이터 읽기"""
+def get_sensor_alerts(current_time, detector, errors=None, store=None):
+    """
+    current_time 시점의 센서 이상 알림 (공용 시계 스레드에서 호출)
+    감지기에는 아직 넣지 않은 새 행만 넣으므로 시점마다 한두 행만 검사한다
+    """
     try:
-        data = pd.read_csv("sensor_data.csv")
-        data['저장시간'] = pd.to_datetime(data['저장시간'])
-        
-        current_time = get_current_time()
-        start_time = current_time - pd.Timedelta(minutes=30)
+        last_minute = detector.last_minute(ALERT_SITE)
+        start_time = current_time - ALERT_LOOKBACK
+        if last_minute is not None:
+            last_time = pd.Timestamp(last_minute, unit='m')
+            if last_time > current_time:
+                # 조회 시간이 거꾸로 가면 처음부터 다시 검사
+                detector.reset()
+            else:
+                start_time = max(start_time, last_time + pd.Timedelta(minutes=1))
+        rows = (store or get_store()).sensor.window(start_time, current_time)
+        if rows is not None and not rows.empty:
+            detector.process(ALERT_SITE, frame_minutes(rows), rows[detector.columns].to_numpy(dtype=float))
+        last_minute = detector.last_minute(ALERT_SITE)
+        # 마지막 값이 오래됐으면 알림도 표시하지 않음 (센서 데이터 없음 오류로 표시됨)
+        if last_minute is None or current_time - pd.Timestamp(last_minute, unit='m') > SENSOR_STALENESS:
+            return []
+        return detector.alerts(ALERT_SITE)
+    except Exception as e:
+        report_error(f"센서 이상 감지 오류: {str(e)}", errors)
+        return []
+
+def pick_rollup_tier(window, max_points):
+    """그래프를 채우는(구간 수 ≥ max_points) 가장 큰 집계 단위, 없으면 None (원본 1분 데이터)"""
+    tier = None
+    for name, freq in sorted(ROLLUP_TIERS.items(), key=lambda item: item[1]):
+        if window / freq >= max_points:
+            tier = name
+    return tier
+
+def get_historical_data(window=pd.Timedelta(minutes=30), max_points=None, current_time=None, errors=None,
+                        store=None):
+    """과거 데이터 읽기 (기본 30분, max_points를 주면 긴 구간은 미리 집계된 데이터 사용)"""
+    try:
+        if current_time is None:
+            current_time = get_current_time()
+        start_time = current_time - window
         
+        tier = pick_rollup_tier(window, max_points) if max_points else None
+        if tier is not None:
+            return (store or get_store()).sensor.rollup(tier, start_time, current_time)
         # 현재 시간까지의 데이터만 반환
-        return data[
-            (data['저장시간'] >= start_time) & 
-            (data['저장시간'] <= current_time)
-        ]
+        return (store or get_store()).sensor.window(start_time, current_time)
         
     except Exception as e:
-        st.error(f"과거 데이터 로드 오류: {str(e)}")
+        report_error(f"과거 데이터 로드 오류: {str(e)}", errors)
         return None
 
-def get_prediction_data():
+def get_prediction_data(current_time=None, errors=None, store=None):
     """예측 데이터 읽기"""
     try:
-        # predictions.csv 파일이 있는지 확인
-        if not os.path.exists("predictions.csv"):
-            return None
-            
-        # predictions.csv 파일 읽기
-        predictions = pd.read_csv("predictions.csv")
-        predictions['예측시간'] = pd.to_datetime(predictions['예측시간'])
+        # 현재 시간 이후의 예측 데이터만 반환 (predictions.csv 파일이 없으면 None)
+        if current_time is None:
+            current_time = get_current_time()
+        future_predictions = (store or get_store()).predictions.after(current_time)
         
-        # 현재 시간 이후의 예측 데이터만 반환
-        current_time = get_current_time()
-        future_predictions = predictions[predictions['예측시간'] > current_time]
-        
-        if future_predictions.empty:
+        if future_predictions is None or future_predictions.empty:
             return None
             
         return future_predictions
         
     except Exception as e:
-        st.error(f"예측 데이터 로드 오류: {str(e)}")
+        report_error(f"예측 데이터 로드 오류: {str(e)}", errors)
         return None
 
 def create_metric_card(label, value):
@@ -169,17 +389,27 @@ def create_metric_card(label, value):
         </div>
     """
 
-def create_combined_graph(historical_data, prediction_data):
+def create_alert_card(alert):
+    return f"""
+        <div class="alert-container">
+            <div class="alert-title">{alert['column']}: {alert['label']}</div>
+            <div class="alert-detail">값 {alert['value']:g} · {alert['since'].strftime("%m-%d %H:%M")}부터</div>
+        </div>
+    """
+
+def create_figure_skeleton():
+    """레이아웃과 빈 트레이스만 가진 그래프 뼈대 (세션마다 한 번 생성 후 데이터만 교체)"""
+    # Plotly 그래프 객체는 처음 그래프를 만들 때 로드
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
-    # 현재 시간 가져오기
-    current_time = get_current_time()
-    
     # 실제 데이터 표시
     fig.add_trace(
         go.Scatter(
-            x=historical_data['저장시간'],
-            y=historical_data['내부온도'],
+            x=[],
+            y=[],
             name="실제 온도",
             line=dict(color="#FF4B4B", width=2)
         ),
@@ -188,70 +418,65 @@ def create_combined_graph(historical_data, prediction_data):
     
     fig.add_trace(
         go.Scatter(
-            x=historical_data['저장시간'],
-            y=historical_data['내부습도'],
+            x=[],
+            y=[],
             name="실제 습도",
             line=dict(color="#4B4BFF", width=2)
         ),
         secondary_y=True,
     )
 
-    # 예측 데이터가 있는 경우에만 표시
-    if prediction_data is not None and not prediction_data.empty:
-        # 현재 시점과 첫 예측 시점을 연결하기 위한 포인트 추가
-        last_real_temp = historical_data['내부온도'].iloc[-1]
-        last_real_humid = historical_data['내부습도'].iloc[-1]
-        first_pred_time = prediction_data['예측시간'].iloc[0]
-        
-        # 연결 포인트 추가
-        connect_times = [current_time, first_pred_time]
-        connect_temps = [last_real_temp, prediction_data['예측온도'].iloc[0]]
-        connect_humids = [last_real_humid, prediction_data['예측습도'].iloc[0]]
-        
-        # 온도 연결선
-        fig.add_trace(
-            go.Scatter(
-                x=connect_times,
-                y=connect_temps,
-                name="예측 온도",
-                line=dict(color="#FF4B4B", width=2, dash='dash'),
-                showlegend=False
-            ),
-            secondary_y=False,
-        )
-        
-        # 습도 연결선
-        fig.add_trace(
-            go.Scatter(
-                x=connect_times,
-                y=connect_humids,
-                name="예측 습도",
-                line=dict(color="#4B4BFF", width=2, dash='dash'),
-                showlegend=False
-            ),
-            secondary_y=True,
-        )
-        
-        # # 예측선 추가
-        # fig.add_trace(
-        #     go.Scatter(
-        #         x=prediction_data['예측시간'],
-        #         y=prediction_data['예측온도'],
-        #         name="예측 온도",
-        #         line=dict(color="#FF4B4B", width=2, dash='dash')
-        #     ),
-        #     secondary_y=False,
-        # )
-        
-        # fig.add_trace(
-        #     go.Scatter(
-        #         x=prediction_data['예측시간'],
-        #         y=prediction_data['예측습도'],
-        #         name="예측 습도",
-        #         line=dict(color="#4B4BFF", width=2, dash='dash')
-        #     ),
-        #     secondary_y=True,
-        # )
+    # 현재 시점과 첫 예측 시점을 잇는 연결선 (예측 데이터가 있을 때만 채움)
+    fig.add_trace(
+        go.Scatter(
+            x=[],
+            y=[],
+            name="예측 온도",
+            line=dict(color="#FF4B4B", width=2, dash='dash'),
+            showlegend=False
+        ),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Scatter(
+            x=[],
+            y=[],
+            name="예측 습도",
+            line=dict(color="#4B4BFF", width=2, dash='dash'),
+            showlegend=False
+        ),
+        secondary_y=True,
+    )
+
+    # 집계 데이터를 볼 때 구간별 최소~최대 범위
+    fig.add_trace(
+        go.Scatter(
+            x=[],
+            y=[],
+            name="온도 범위",
+            fill='toself',
+            fillcolor='rgba(255, 75, 75, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Scatter(
+            x=[],
+            y=[],
+            name="습도 범위",
+            fill='toself',
+            fillcolor='rgba(75, 75, 255, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ),
+        secondary_y=True,
+    )
 
     # 레이아웃 설정
     fig.update_layout(
@@ -301,9 +526,7 @@ def create_combined_graph(historical_data, prediction_data):
                 type="line",
                 xref="x",
                 yref="paper",
-                x0=historical_data['저장시간'].iloc[-1],
                 y0=0,
-                x1=historical_data['저장시간'].iloc[-1],
                 y1=1,
                 line=dict(
                     color="gray",
@@ -314,7 +537,6 @@ def create_combined_graph(historical_data, prediction_data):
         ],
         annotations=[
             dict(
-                x=historical_data['저장시간'].iloc[-1],
                 y=1.05,
                 xref="x",
                 yref="paper",
@@ -327,15 +549,100 @@ def create_combined_graph(historical_data, prediction_data):
 
     return fig
 
+def max_points_per_trace(fig):
+    """플롯 영역 너비(px)만큼만 점을 보냄 (그 이상은 화면에서 구분되지 않음)"""
+    margin = fig.layout.margin
+    return int(fig.layout.width - margin.l - margin.r)
 
-def main():
-    # 데이터 로드
-    current_time = get_current_time()  # 현재 시간 가져오기
-    sensor_data = get_sensor_data()
-    historical_data = get_historical_data()
-    prediction_data = get_prediction_data()
+def _band(historical_data, column, idx):
+    """최소/최대 컬럼이 있으면 범위 다각형 좌표 (최대값 정방향 + 최소값 역방향)"""
+    if f'{column}_min' not in historical_data:
+        return [], []
+    times = historical_data['저장시간'].to_numpy()[idx]
+    lows = historical_data[f'{column}_min'].to_numpy()[idx]
+    highs = historical_data[f'{column}_max'].to_numpy()[idx]
+    return np.concatenate([times, times[::-1]]), np.concatenate([highs, lows[::-1]])
+
+def update_combined_graph(fig, historical_data, prediction_data, current_time=None):
+    """그래프 뼈대의 트레이스 데이터와 '현재' 표시만 교체"""
+    # 현재 시간 가져오기
+    if current_time is None:
+        current_time = get_current_time()
+    max_points = max_points_per_trace(fig)
+    
+    times = historical_data['저장시간'].to_numpy()
+    temps = widen(historical_data['내부온도'].to_numpy())
+    humids = widen(historical_data['내부습도'].to_numpy())
+    temp_idx = lttb_indices(times, temps, max_points)
+    humid_idx = lttb_indices(times, humids, max_points)
+    temp_band = _band(historical_data, '내부온도', temp_idx)
+    humid_band = _band(historical_data, '내부습도', humid_idx)
+    
+    connect_times, connect_temps, connect_humids = [], [], []
+    if prediction_data is not None and not prediction_data.empty:
+        # 현재 시점과 첫 예측 시점을 연결하기 위한 포인트
+        connect_times = [current_time, prediction_data['예측시간'].iloc[0]]
+        connect_temps = [temps[-1], prediction_data['예측온도'].iloc[0]]
+        connect_humids = [humids[-1], prediction_data['예측습도'].iloc[0]]
+    
+    last_time = historical_data['저장시간'].iloc[-1]
+    with fig.batch_update():
+        fig.data[0].update(x=times[temp_idx], y=temps[temp_idx])
+        fig.data[1].update(x=times[humid_idx], y=humids[humid_idx])
+        fig.data[2].update(x=connect_times, y=connect_temps)
+        fig.data[3].update(x=connect_times, y=connect_humids)
+        fig.data[4].update(x=temp_band[0], y=temp_band[1])
+        fig.data[5].update(x=humid_band[0], y=humid_band[1])
+        fig.layout.shapes[0].update(x0=last_time, x1=last_time)
+        fig.layout.annotations[0].update(x=last_time)
+    return fig
+
+def create_combined_graph(historical_data, prediction_data, current_time=None):
+    return update_combined_graph(create_figure_skeleton(), historical_data, prediction_data, current_time)
+
+@st.cache_resource
+def get_chart_figures():
+    """조회 범위별 그래프 뼈대 (서버 프로세스당 하나, 공용 시계 스냅샷에서 재사용)"""
+    return {}, threading.Lock()
+
+def chart_figure(figures, window_label):
+    """조회 범위의 (잠금, 그래프 뼈대), 없으면 생성 (범위별 잠금으로 동시 갱신 방지)"""
+    entries, entries_lock = figures
+    with entries_lock:
+        if window_label not in entries:
+            entries[window_label] = (threading.Lock(), create_figure_skeleton())
+        return entries[window_label]
+
+def snapshot_chart(snapshot, window_label, store=None, figures=None):
+    """스냅샷 시점의 조회 범위 그래프 (스냅샷/범위당 한 번만 계산, 데이터가 없으면 None)"""
+    import plotly.graph_objects as go
+
+    metrics = get_metrics()
+    lock, fig = chart_figure(figures or get_chart_figures(), window_label)
+    with lock:
+        with metrics.timed('dashboard_load_seconds', '대시보드 데이터 조회 시간', loader='historical'):
+            historical_data = get_historical_data(
+                HISTORY_WINDOWS[window_label], max_points_per_trace(fig), snapshot.current_time, snapshot.errors,
+                store)
+        if historical_data is None or historical_data.empty:
+            return None
+        with metrics.timed('dashboard_figure_seconds', '그래프 데이터 교체 시간'):
+            update_combined_graph(fig, historical_data, snapshot['prediction_data'], snapshot.current_time)
+            # 뼈대는 다음 스냅샷에서 다시 바뀌므로 세션이 그릴 그래프는 사본으로 보관
+            return go.Figure(fig)
+
+
+@st.fragment(run_every=METRICS_REFRESH_SECONDS)
+def live_metrics():
+    """조회 시간과 지표 카드 (공용 시계 스냅샷을 읽기만 함)"""
+    bytes_before = store_bytes_read()
+    snapshot = get_ticker().snapshot
+    current_time = snapshot.current_time
+    sensor_data = snapshot['sensor_data']
+    for message in snapshot.errors:
+        st.error(message)
     
-    if sensor_data and historical_data is not None:
+    if sensor_data:
         # 현재 시간 표시
         st.markdown(
             f'<div class="time-display">조회 시간: {current_time.strftime("%Y-%m-%d %H:%M")}</div>',
@@ -375,17 +682,64 @@ def main():
                     unsafe_allow_html=True
                 )
 
-        st.subheader('과거 30분 내부 환경 변화 및 예측', anchor=False)
-        fig = create_combined_graph(historical_data, prediction_data)
-        st.plotly_chart(fig, use_container_width=True, config={
-            'displayModeBar': False,
-            'staticPlot': False,    #툴팁 (그래프 가져다대면 정보 나오게)
-            'displaylogo': False,     # Plotly 로고 비활성화
-            'scrollZoom': True,      # 스크롤로 줌 가능
-        })
-        
-    time.sleep(1)
-    st.rerun()
+        # 3. 센서 이상 알림 (있을 때만)
+        alerts = snapshot.values.get('alerts') or []
+        if alerts:
+            st.subheader('센서 이상', anchor=False)
+            cols = st.columns(min(len(alerts), 4))
+            for i, alert in enumerate(alerts):
+                with cols[i % len(cols)]:
+                    st.markdown(create_alert_card(alert), unsafe_allow_html=True)
+    record_refresh('metrics', bytes_before)
+
+@st.fragment(run_every=CHART_REFRESH_SECONDS)
+def live_chart():
+    """과거/예측 그래프 (조회 범위별 그래프는 스냅샷마다 한 번만 계산해서 모든 세션이 공유)"""
+    bytes_before = store_bytes_read()
+    window_label = st.selectbox('조회 범위', list(HISTORY_WINDOWS), key='history_window')
+    snapshot = get_ticker().snapshot
+    fig = snapshot.memo(('figure', window_label), lambda: snapshot_chart(snapshot, window_label))
+    if fig is None:
+        return
+    
+    # 그림이 같으면 전송 내용도 같아서 브라우저에 캐시된 메시지를 재사용
+    st.subheader(f'{window_label} 내부 환경 변화 및 예측', anchor=False)
+    with get_metrics().timed('dashboard_render_seconds', '그래프 전송 시간'):
+        st.plotly_chart(fig, use_container_width=True, config=CHART_CONFIG, key='combined_chart')
+    record_first_render(snapshot)
+    record_refresh('chart', bytes_before)
+
+def render_admin_sidebar():
+    """관리자용 사이드바: 구간별 처리 시간 분위수와 카운터"""
+    rows = []
+    for item in sorted(get_metrics().snapshot(), key=lambda item: item['name']):
+        labels = ', '.join(f'{key}={value}' for key, value in item['labels'].items())
+        name = f"{item['name']} ({labels})" if labels else item['name']
+        if 'value' in item:
+            rows.append({'지표': name, '값': item['value']})
+            continue
+        # 시간은 ms, 바이트는 그대로 표시
+        scale = 1000 if item['name'].endswith('_seconds') else 1
+        row = {'지표': name, '횟수': item['count']}
+        for q in ('p50', 'p95', 'p99'):
+            row[q] = round(item[q] * scale, 3) if item[q] is not None else None
+        rows.append(row)
+    with st.sidebar:
+        st.subheader('성능 지표', anchor=False)
+        st.caption('시간 지표(_seconds)는 ms 단위')
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.button('지표 새로고침')
+
+def main():
+    # 전체 스크립트는 처음 한 번만 실행되고, 이후에는 각 조각이 자기 주기로 갱신
+    start_metrics_export()
+    if SNAPSHOT_API_PORT:
+        start_snapshot_api()
+    get_metrics().counter('dashboard_reruns_total', '대시보드 갱신 횟수', part='main').inc()
+    live_metrics()
+    live_chart()
+    if DASHBOARD_ADMIN:
+        render_admin_sidebar()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
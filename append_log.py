@@ -0,0 +1,226 @@
+import csv
+import io
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from metrics import get_metrics
+from sensor_schema import read_csv
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+def _format_value(value):
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class AppendLogWriter:
+    """
+    레코드(예측 결과, 수집한 센서 값)를 CSV 파일 끝에 한 줄씩 추가하는 로그
+    - 완성된 줄만 한 번의 write로 붙이므로 읽는 쪽이 잘린 행을 보지 않는다
+    - fsync 정책: 'always'(flush마다), 'interval'(fsync_interval초마다), 'never'
+    - max_bytes 또는 날짜가 바뀌면 현재 파일을 세그먼트로 봉인하고 새 파일을 원자적으로 교체
+    """
+
+    def __init__(self, path, columns, buffer_size=1, fsync='interval', fsync_interval=1.0,
+                 max_bytes=None, rotate_daily=False):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"지원하지 않는 fsync 정책: {fsync}")
+        self.path = path
+        self.columns = list(columns)
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._fd = None
+        self._size = 0
+        self._segment_day = None
+        self._last_fsync = time.monotonic()
+
+    def append(self, *values):
+        """레코드 한 줄 추가 (buffer_size만큼 모이면 파일에 기록)"""
+        if len(values) != len(self.columns):
+            raise ValueError(f"컬럼 수 불일치: {len(values)} != {len(self.columns)}")
+        with self._lock:
+            day = pd.Timestamp(values[0]).date() if self.rotate_daily else None
+            if day is not None and self._segment_day is not None and day != self._segment_day:
+                self._flush_locked()
+                self._rotate_locked()
+            if day is not None and self._segment_day is None:
+                self._segment_day = day
+            self._buffer.append([_format_value(v) for v in values])
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        """버퍼에 남은 레코드를 파일에 기록"""
+        with self._lock:
+            self._flush_locked()
+
+    def reset(self):
+        """기존 기록을 버리고 헤더만 있는 파일로 원자적으로 교체"""
+        with self._lock:
+            self._buffer.clear()
+            self._close_fd()
+            self._replace_with_header()
+            self._segment_day = None
+
+    def rotate(self):
+        """현재 파일을 세그먼트로 봉인하고 새 파일 시작"""
+        with self._lock:
+            self._flush_locked()
+            self._rotate_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._close_fd()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        out = io.StringIO()
+        csv.writer(out, lineterminator='\n').writerows(self._buffer)
+        payload = out.getvalue().encode('utf-8')
+        self._buffer.clear()
+
+        metrics = get_metrics()
+        log = os.path.basename(self.path)
+        with metrics.timed('csv_write_seconds', 'CSV 기록 시간 (fsync 포함)', log=log):
+            fd = self._open_fd()
+            os.write(fd, payload)
+            self._size += len(payload)
+
+            now = time.monotonic()
+            if self.fsync == 'always' or (
+                    self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(fd)
+                self._last_fsync = now
+        metrics.counter('csv_bytes_written_total', 'CSV에 기록한 바이트 수', log=log).inc(len(payload))
+
+        if self.max_bytes is not None and self._size >= self.max_bytes:
+            self._rotate_locked()
+
+    def _open_fd(self):
+        if self._fd is None:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                self._replace_with_header()
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self._size = os.fstat(self._fd).st_size
+            if self._size and os.pread(self._fd, 1, self._size - 1) != b'\n':
+                # 이전 프로세스가 줄 중간에 멈췄으면 줄을 끝내고 이어 씀 (새 레코드가 잘린 줄에 붙지 않도록)
+                self._size += os.write(self._fd, b'\n')
+        return self._fd
+
+    def _close_fd(self):
+        if self._fd is not None:
+            if self.fsync != 'never':
+                os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _rotate_locked(self):
+        self._close_fd()
+        if os.path.exists(self.path):
+            # 하드링크로 봉인한 뒤 교체하므로 활성 파일 경로는 항상 존재한다
+            os.link(self.path, self._segment_path())
+        self._replace_with_header()
+        self._segment_day = None
+
+    def _segment_path(self):
+        root, ext = os.path.splitext(self.path)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        candidate = f"{root}-{stamp}{ext}"
+        n = 1
+        while os.path.exists(candidate):
+            candidate = f"{root}-{stamp}-{n}{ext}"
+            n += 1
+        return candidate
+
+    def _replace_with_header(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f, lineterminator='\n').writerow(self.columns)
+            f.flush()
+            if self.fsync != 'never':
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._size = 0
+
+
+class AppendLogReader:
+    """
+    AppendLogWriter가 쓰는 파일을 오프셋 기준으로 따라 읽는 리더
+    파일이 교체(회전/초기화)되면 이전 파일의 남은 줄을 마저 읽고 새 파일로 넘어간다
+    """
+
+    def __init__(self, path, time_column):
+        self.path = path
+        self.time_column = time_column
+        self.offset = 0
+        self._file = None
+        self._columns = None
+
+    def read_new(self):
+        """마지막으로 읽은 위치 이후 추가된 완성된 레코드를 데이터프레임으로 반환"""
+        frames = []
+        while True:
+            if self._file is None and not self._open():
+                break
+            # 교체 여부를 먼저 확인해야 교체 직전에 추가된 줄까지 빠짐없이 읽는다
+            replaced = self._replaced()
+            chunk = self._read_complete_lines()
+            if chunk:
+                frames.append(chunk)
+            if not replaced:
+                break
+            # 이전 파일을 끝까지 읽었으므로 새 파일로 이동
+            self._file.close()
+            self._file = None
+
+        if not frames:
+            return pd.DataFrame(columns=self._columns or [])
+        raw = b''.join(frames)
+        return read_csv(raw, names=self._columns)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        header = self._file.readline()
+        if not header.endswith(b'\n'):
+            # 헤더가 아직 완성되지 않음
+            self._file.close()
+            self._file = None
+            return False
+        self._columns = header.decode('utf-8').rstrip('\r\n').split(',')
+        self.offset = self._file.tell()
+        return True
+
+    def _read_complete_lines(self):
+        self._file.seek(self.offset)
+        raw = self._file.read()
+        end = raw.rfind(b'\n') + 1
+        self.offset += end
+        return raw[:end]
+
+    def _replaced(self):
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        return current != os.fstat(self._file.fileno()).st_ino
@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import SENSOR_ARCHIVE_DIR
+from model_registry import get_registry
+from predict import STATE_COLUMNS, feature_plan, feature_rollout, model_features, rollout
+from sensor_schema import epoch_minutes, read_csv
+
+# 백테스트할 예측 방식: predict.py(제한 없음)와 next.py(한 스텝 변화량 제한, CLAMP_LIMITS와 동일)
+MODES = {
+    'predict': None,
+    'next': (0.5, 1.0),
+}
+TARGETS = ['온도', '습도']
+DEFAULT_CHUNK_ROWS = 20_000
+
+
+def load_history(source=None, start=None, end=None, value_columns=STATE_COLUMNS):
+    """
+    백테스트용 이력 (저장시간을 분 단위 정수로 바꾼 배열과 (n, 컬럼 수) float32 값 배열)
+    source: CSV 경로 또는 아카이브 디렉토리 (없으면 SENSOR_ARCHIVE_DIR 또는 sensor_data.csv)
+    value_columns: 값 배열 컬럼 (상태 컬럼이 빈 행은 제외, 나머지 결측은 그대로 둠)
+    """
+    source = source or SENSOR_ARCHIVE_DIR or "sensor_data.csv"
+    columns = ['저장시간'] + list(value_columns)
+    if os.path.isdir(source):
+        from sensor_archive import SensorArchive
+        frame = SensorArchive(source).read_range(start, end, columns=columns)
+    else:
+        frame = read_csv(source, columns=columns)
+        if start is not None:
+            frame = frame[frame['저장시간'] >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame['저장시간'] <= pd.Timestamp(end)]
+    # 정리가 필요할 때만 복사 (여러 해 이력은 복사 한 번도 크다)
+    if frame[STATE_COLUMNS].isna().to_numpy().any():
+        frame = frame.dropna(subset=STATE_COLUMNS)
+    if not frame['저장시간'].is_monotonic_increasing:
+        frame = frame.sort_values('저장시간', kind='stable')
+    if not frame['저장시간'].is_unique:
+        frame = frame.drop_duplicates('저장시간', keep='last')
+    return epoch_minutes(frame['저장시간']), frame[list(value_columns)].to_numpy(dtype=np.float32)
+
+
+def _init_worker():
+    # 프로세스마다 모델을 한 번만 로드
+    registry = get_registry()
+    registry.entry('temperature')
+    registry.entry('humidity')
+
+
+def _backtest_chunk(minutes, values, origins, horizon, modes):
+    """
+    origins 위치의 각 시점에서 horizon분 재귀 예측 후 실제 값과 비교
+    minutes/values는 origins 뒤로 horizon분까지 (특성 모델이면 앞쪽 특성 이력도) 포함한 구간
+    반환: 방식 → (오차 절댓값 합, 오차 제곱 합, 개수), 각각 (horizon, 2) 배열
+    """
+    registry = get_registry()
+    temp_model_dict = registry.get('temperature')
+    humid_model_dict = registry.get('humidity')
+    use_features = bool(model_features(temp_model_dict) or model_features(humid_model_dict))
+    if use_features:
+        feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+        states = values[:, [feature_set.columns.index(column) for column in STATE_COLUMNS]]
+    else:
+        states = values
+
+    # 시점 + h분의 실제 값 (그 시각의 행이 없으면 비교에서 제외)
+    targets = minutes[origins, None] + np.arange(1, horizon + 1)[None, :]
+    positions = np.minimum(np.searchsorted(minutes, targets), len(minutes) - 1)
+    valid = minutes[positions] == targets
+    actual = states[positions]
+
+    results = {}
+    for mode in modes:
+        if use_features:
+            forecast = feature_rollout(temp_model_dict, humid_model_dict, values, origins, horizon,
+                                       clamp=MODES[mode])
+        else:
+            forecast = rollout(temp_model_dict, humid_model_dict, states[origins], horizon,
+                               clamp=MODES[mode])
+        errors = np.where(valid[..., None], forecast - actual, 0.0)
+        results[mode] = (
+            np.abs(errors).sum(axis=0),
+            np.square(errors).sum(axis=0),
+            valid.sum(axis=0),
+        )
+    return results
+
+
+def _chunks(minutes, chunk_rows, horizon):
+    """시점을 chunk_rows개씩 나누고, 각 구간에 예측 정답으로 쓸 뒤쪽 horizon분을 덧붙임"""
+    for start in range(0, len(minutes), chunk_rows):
+        stop = min(start + chunk_rows, len(minutes))
+        tail = np.searchsorted(minutes, minutes[stop - 1] + horizon, side='right')
+        yield start, stop, tail
+
+
+def run_backtest(source=None, start=None, end=None, horizon=30, modes=tuple(MODES),
+                 chunk_rows=DEFAULT_CHUNK_ROWS, workers=None):
+    """
+    전체 이력을 가상 시계로 재생하듯 모든 시점에서 예측해서 방식/예측 거리별 MAE, RMSE 계산
+    시간 구간을 나눠 프로세스 풀에서 병렬로 처리한다
+    """
+    started = time.perf_counter()
+    # 특성 모델이면 특성 컬럼 전체를 읽고, 각 구간 앞에 특성 계산용 이력을 덧붙임
+    registry = get_registry()
+    temp_model_dict = registry.get('temperature')
+    humid_model_dict = registry.get('humidity')
+    value_columns, warmup = STATE_COLUMNS, 0
+    if model_features(temp_model_dict) or model_features(humid_model_dict):
+        feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+        value_columns, warmup = feature_set.columns, feature_set.history
+    minutes, values = load_history(source, start, end, value_columns)
+    if len(minutes) == 0:
+        print("백테스트할 데이터가 없습니다")
+        return None
+    print(f"이력 로드 완료 - {len(minutes)}행, {time.perf_counter() - started:.1f}초")
+
+    totals = {mode: [np.zeros((horizon, 2)), np.zeros((horizon, 2)), np.zeros(horizon)]
+              for mode in modes}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(_backtest_chunk, minutes[head:tail], values[head:tail],
+                        np.arange(lo - head, stop - head), horizon, modes)
+            for lo, stop, tail in _chunks(minutes, chunk_rows, horizon)
+            for head in [max(0, lo - warmup)]
+        ]
+        for done, future in enumerate(futures, 1):
+            for mode, (abs_sum, sq_sum, count) in future.result().items():
+                totals[mode][0] += abs_sum
+                totals[mode][1] += sq_sum
+                totals[mode][2] += count
+            print(f"진행: {done}/{len(futures)} 구간")
+
+    rows = []
+    for mode, (abs_sum, sq_sum, count) in totals.items():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mae = abs_sum / count[:, None]
+            rmse = np.sqrt(sq_sum / count[:, None])
+        for h in range(horizon):
+            row = {'방식': mode, '예측거리(분)': h + 1, '표본수': int(count[h])}
+            for j, target in enumerate(TARGETS):
+                row[f'{target}_MAE'] = mae[h, j]
+                row[f'{target}_RMSE'] = rmse[h, j]
+            rows.append(row)
+    report = pd.DataFrame(rows)
+
+    elapsed = time.perf_counter() - started
+    print(f"\n백테스트 완료 - 시점 {len(minutes)}개 × {horizon}분, {elapsed:.1f}초")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="과거 이력 전체에 대한 예측 백테스트 (MAE/RMSE)")
+    parser.add_argument("--source", help="센서 CSV 또는 아카이브 디렉토리")
+    parser.add_argument("--start", help="시작 시간")
+    parser.add_argument("--end", help="종료 시간")
+    parser.add_argument("--horizon", type=int, default=30, help="예측 거리(분)")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--output", help="결과 CSV 경로")
+    args = parser.parse_args()
+
+    report = run_backtest(args.source, args.start, args.end, args.horizon, args.modes,
+                          args.chunk_rows, args.workers)
+    if report is not None:
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(report.round(3).to_string(index=False))
+        if args.output:
+            report.to_csv(args.output, index=False)
@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZES = [1_000, 100_000, 10_000_000]
+# 센서 데이터의 마지막 시간 (app.py 조회 시작 시간 직후)과 측정에 쓰는 조회 시간
+DATA_END = pd.Timestamp('2018-05-10 10:05:00')
+QUERY_TIME = DATA_END - pd.Timedelta(minutes=5)
+PREDICTION_ROWS = 60
+
+
+class StubScaler:
+    """피클 모델 대신 쓰는 스케일러 (StandardScaler와 같은 transform 인터페이스)"""
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean) / self.scale
+
+
+class StubModel:
+    """선형 결합으로 다음 값을 내는 모델 (LightGBM과 같은 predict 인터페이스)"""
+
+    def __init__(self, weights, bias):
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.weights + self.bias
+
+
+def stub_model_dicts():
+    scaler = StubScaler([20.0, 60.0], [2.0, 5.0])
+    return (
+        {'model': StubModel([2.0, 0.1], 20.0), 'scaler': scaler},
+        {'model': StubModel([-0.2, 5.0], 60.0), 'scaler': scaler},
+    )
+
+
+def write_stub_models(directory):
+    """config.MODEL_FILES 이름으로 스텁 모델 피클 저장"""
+    from config import MODEL_FILES
+    for name, model_dict in zip(['temperature', 'humidity'], stub_model_dicts()):
+        with open(os.path.join(directory, MODEL_FILES[name]), 'wb') as f:
+            pickle.dump(model_dict, f)
+
+
+def generate_sensor_data(rows, seed=0):
+    """DATA_END에서 끝나는 1분 간격 센서 데이터 (시드 고정)"""
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(rows)
+    daily = np.sin(2 * np.pi * minutes / 1440)
+    return pd.DataFrame({
+        '저장시간': pd.date_range(end=DATA_END, periods=rows, freq='min'),
+        '내부온도': (20 + 3 * daily + rng.normal(0, 0.2, rows)).round(1),
+        '내부습도': (60 - 8 * daily + rng.normal(0, 0.5, rows)).round(1),
+        '외부온도': (15 + 5 * daily + rng.normal(0, 0.3, rows)).round(1),
+        '풍속': rng.uniform(0, 2, rows).round(1),
+        '이슬점': (12 + daily + rng.normal(0, 0.2, rows)).round(1),
+        '누적일사량': (minutes % 1440) * 3,
+    })
+
+
+def prepare_workspace(directory, rows):
+    """rows행 sensor_data.csv, 예측 CSV, 스텁 모델이 있는 작업 디렉토리 (이미 있으면 재사용)"""
+    os.makedirs(directory, exist_ok=True)
+    sensor_path = os.path.join(directory, "sensor_data.csv")
+    if not os.path.exists(sensor_path):
+        frame = generate_sensor_data(rows)
+        frame.to_csv(sensor_path + ".tmp", index=False)
+        os.replace(sensor_path + ".tmp", sensor_path)
+    predictions = pd.DataFrame({
+        '예측시간': pd.date_range(DATA_END + pd.Timedelta(minutes=1), periods=PREDICTION_ROWS, freq='min'),
+        '예측온도': 21.0,
+        '예측습도': 60.0,
+    })
+    predictions.to_csv(os.path.join(directory, "predictions.csv"), index=False)
+    model_dir = os.path.join(directory, "models")
+    os.makedirs(model_dir, exist_ok=True)
+    write_stub_models(model_dir)
+    return model_dir
+
+
+def measure(fn, repeat, setup=None):
+    """fn을 repeat번 실행한 시간(ms) 통계"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'mean_ms': statistics.fmean(times),
+        'max_ms': max(times),
+    }
+
+
+def run_size(rows, directory, repeat):
+    """작업 디렉토리에서 rows행 기준으로 각 경로를 측정"""
+    model_dir = prepare_workspace(directory, rows)
+    os.chdir(directory)
+
+    from streamlit.logger import set_log_level
+    import app
+    import model_registry
+    import predict
+    from model_registry import ModelRegistry
+    from sensor_store import SensorStore
+
+    # 대시보드 함수를 streamlit run 밖(bare mode)에서 호출할 때 나오는 경고 숨김
+    set_log_level('error')
+
+    # 스텁 모델을 공용 레지스트리로 사용
+    model_registry._registry = ModelRegistry(model_dir=model_dir, compile_trees=False)
+    temp_model_dict, humid_model_dict = stub_model_dicts()
+
+    results = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def cold_load():
+        SensorStore().sensor.snapshot()
+
+    results['store_cold_load'] = measure(cold_load, max(1, repeat // 5))
+
+    # 대시보드 경로 (공용 저장소 캐시가 채워진 상태)
+    app.get_store.clear()
+    app.get_store().sensor.snapshot()
+    # 조회 시간을 고정 (공용 시계에 따라 진행하지 않도록 명시적으로 전달)
+    store = app.get_store()
+    results['get_sensor_data'] = measure(lambda: app.get_sensor_data(QUERY_TIME), repeat)
+    results['get_historical_data'] = measure(
+        lambda: app.get_historical_data(current_time=QUERY_TIME), repeat)
+    results['get_prediction_data'] = measure(lambda: app.get_prediction_data(QUERY_TIME), repeat)
+    historical = app.get_historical_data(current_time=QUERY_TIME)
+    prediction = app.get_prediction_data(QUERY_TIME)
+    results['create_combined_graph'] = measure(
+        lambda: app.create_combined_graph(historical, prediction, QUERY_TIME), repeat)
+    # 공용 시계가 시점마다 한 번 계산하는 스냅샷 (세션 수와 무관)
+    results['build_snapshot'] = measure(lambda: app.build_snapshot(QUERY_TIME, [], store), repeat)
+
+    data = app.get_store().sensor.snapshot()
+    results['predict_next_values'] = measure(
+        lambda: predict.predict_next_values(temp_model_dict, humid_model_dict, data), repeat)
+
+    with quiet:
+        results['save_prediction'] = measure(
+            lambda: predict.save_prediction(DATA_END, 21.0, 60.0), repeat)
+        predict.get_prediction_writer().close()
+        results['run_prediction_service'] = measure(
+            predict.run_prediction_service, max(1, repeat // 5))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=20, data_dir=None):
+    """크기별 벤치마크 실행 → JSON으로 저장할 수 있는 결과 딕셔너리"""
+    root = data_dir or tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    report = {
+        'commit': git_commit(),
+        'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': {},
+    }
+    try:
+        for rows in sizes:
+            print(f"측정 중 - {rows}행", file=sys.stderr)
+            report['results'][str(rows)] = run_size(rows, os.path.join(root, f"rows-{rows}"), repeat)
+    finally:
+        os.chdir(cwd)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="대시보드 조회/그래프/예측/파일 기록 경로 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="센서 데이터 행 수")
+    parser.add_argument("--repeat", type=int, default=20, help="항목별 반복 횟수")
+    parser.add_argument("--data-dir", help="생성한 데이터를 보관/재사용할 디렉토리 (기본: 임시 디렉토리)")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: 표준 출력)")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        args.data_dir = os.path.abspath(args.data_dir)
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    report = run_benchmarks(args.sizes, args.repeat, args.data_dir)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
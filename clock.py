@@ -0,0 +1,33 @@
+import time
+
+import pandas as pd
+
+
+class VirtualClock:
+    """
+    재생/시뮬레이션용 가상 시계
+    tick()마다 step만큼 진행하고, tick_seconds가 0이면 기다리지 않고 바로 다음 시점으로 넘어간다
+    """
+
+    def __init__(self, start, step=pd.Timedelta(minutes=1), tick_seconds=0.0):
+        self.now = pd.Timestamp(start)
+        self.step = pd.Timedelta(step)
+        self.tick_seconds = tick_seconds
+        self._next_wall = time.monotonic() + tick_seconds
+
+    def tick(self):
+        """한 스텝 진행 (tick_seconds가 있으면 실제 시간 간격을 맞춰 대기)"""
+        if self.tick_seconds:
+            delay = self._next_wall - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_wall = max(self._next_wall, time.monotonic() - self.tick_seconds) + self.tick_seconds
+        self.now += self.step
+        return self.now
+
+    def ticks(self, end):
+        """now부터 end 이전까지 시점을 차례로 반환"""
+        end = pd.Timestamp(end)
+        while self.now < end:
+            yield self.now
+            self.tick()
@@ -0,0 +1,53 @@
+import os
+
+# 날짜별 Parquet 센서 아카이브 디렉토리 (설정하지 않으면 sensor_data.csv 사용)
+SENSOR_ARCHIVE_DIR = os.environ.get("SENSOR_ARCHIVE_DIR") or None
+
+# LightGBM 모델 디렉토리와 파일 이름 ({'model', 'scaler'} 딕셔너리 피클)
+MODEL_DIR = os.environ.get("MODEL_DIR", "/Users/choejihye/pkl")
+MODEL_FILES = {
+    'temperature': os.environ.get("TEMP_MODEL_FILE", "lgb_temp_model_1min.pkl"),
+    'humidity': os.environ.get("HUMID_MODEL_FILE", "lgb_humid_model_1min.pkl"),
+}
+# 모델 파일 변경 확인 간격(초), 백그라운드 스레드에서 확인하고 새 모델을 로드 (예측 경로에서는 로드하지 않음)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "5"))
+
+# 센서 수집 서비스 주소 (ingest_service.py)
+INGEST_HOST = os.environ.get("INGEST_HOST", "127.0.0.1")
+INGEST_PORT = int(os.environ.get("INGEST_PORT", "9750"))
+
+# 메트릭 내보내기 (설정하지 않으면 내보내지 않음)
+# METRICS_FILE: Prometheus 텍스트 형식 파일 경로, METRICS_PORT: /metrics HTTP 포트
+METRICS_FILE = os.environ.get("METRICS_FILE") or None
+METRICS_PORT = int(os.environ.get("METRICS_PORT") or 0) or None
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "10"))
+# 외부 표시 장치용 스냅샷 JSON API 포트 (설정하지 않으면 사용 안 함, app.py 프로세스에서 실행)
+SNAPSHOT_API_PORT = int(os.environ.get("SNAPSHOT_API_PORT") or 0) or None
+SNAPSHOT_API_HOST = os.environ.get("SNAPSHOT_API_HOST", "0.0.0.0")
+# 대시보드 관리자 사이드바 표시 (서버 설정으로만 켬, 켜면 모든 접속자에게 보임)
+DASHBOARD_ADMIN = os.environ.get("DASHBOARD_ADMIN") == "1"
+
+# 최근 센서/예측 데이터용 SQLite(WAL) 저장소 경로 (설정하지 않으면 CSV/아카이브 사용)
+HOT_STORE_PATH = os.environ.get("HOT_STORE_PATH") or None
+# 저장소에 남겨 둘 기간(시간)과 보존 작업 실행 간격(초), 더 오래된 센서 행은 아카이브로 이동
+HOT_STORE_RETENTION_HOURS = float(os.environ.get("HOT_STORE_RETENTION_HOURS", "48"))
+HOT_STORE_RETENTION_INTERVAL = float(os.environ.get("HOT_STORE_RETENTION_INTERVAL", "600"))
+
+# 모델 추론 캐시: 최대 항목 수(0이면 사용 안 함), 유효 시간(초, 0이면 제한 없음), 입력 양자화 자릿수(센서 분해능 0.1)
+INFERENCE_CACHE_SIZE = int(os.environ.get("INFERENCE_CACHE_SIZE", "100000"))
+INFERENCE_CACHE_TTL = float(os.environ.get("INFERENCE_CACHE_TTL", "0"))
+INFERENCE_CACHE_DECIMALS = int(os.environ.get("INFERENCE_CACHE_DECIMALS", "1"))
+
+# 모델 재학습 (retrain.py): 검증 구간(시간), warm start로 추가할 트리 수, 최소 새 학습 행 수, 학습 프로세스 nice 값
+RETRAIN_HOLDOUT_HOURS = float(os.environ.get("RETRAIN_HOLDOUT_HOURS", "24"))
+RETRAIN_ROUNDS = int(os.environ.get("RETRAIN_ROUNDS", "50"))
+RETRAIN_MIN_ROWS = int(os.environ.get("RETRAIN_MIN_ROWS", "1440"))
+RETRAIN_NICE = int(os.environ.get("RETRAIN_NICE", "10"))
+
+# 대시보드 빠른 시작: 마지막 스냅샷을 저장할 피클 경로 (설정하면 재시작 시 저장된 화면을 바로 표시),
+# 서버 시작 시 그래프 뼈대/기본 그래프를 백그라운드에서 미리 준비할지
+DASHBOARD_STATE_FILE = os.environ.get("DASHBOARD_STATE_FILE") or None
+DASHBOARD_PREWARM = os.environ.get("DASHBOARD_PREWARM", "1") == "1"
+
+# 센서 이상값 보정 (anomaly.py): 예측 전에 최근 입력의 이상값을 직전 정상 값으로 바꿀지
+ANOMALY_REPAIR = os.environ.get("ANOMALY_REPAIR", "1") == "1"
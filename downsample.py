@@ -0,0 +1,63 @@
+import numpy as np
+
+
+def _as_numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').view('int64').astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링
+    첫/마지막 점은 유지하고, 구간마다 이전 선택점과 다음 구간 평균점으로 만든 삼각형이
+    가장 큰 점 하나를 고른다. 선택된 점의 인덱스 배열 반환
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_numeric(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 첫/마지막 점을 제외한 나머지를 n_out - 2개 구간으로 나눔
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # 다음 구간 평균점은 선택 결과와 무관하므로 미리 계산
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        cx, cy = avg_x[bucket + 1], avg_y[bucket + 1]
+        area = np.abs(
+            (x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """구간마다 최솟값/최댓값 두 점을 남기는 다운샘플링 (완전 벡터화, 결과는 최대 n_out개)"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = n_out // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    # 구간별 argmin/argmax: 구간 길이를 맞추기 위해 가장 긴 구간 기준으로 채움
+    width = int(np.diff(edges).max())
+    offsets = starts[:, None] + np.arange(width)[None, :]
+    valid = offsets < edges[1:, None]
+    values = y[np.minimum(offsets, n - 1)]
+    lows = np.where(valid, values, np.inf).argmin(axis=1) + starts
+    highs = np.where(valid, values, -np.inf).argmax(axis=1) + starts
+    return np.unique(np.concatenate([lows, highs]))
@@ -0,0 +1,247 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# 특성을 만들 수 있는 센서 컬럼
+FEATURE_COLUMNS = ['내부온도', '내부습도', '외부온도', '풍속', '이슬점', '누적일사량']
+FEATURE_KINDS = ('lag', 'delta', 'mean', 'std', 'ewm')
+
+# 특성 이름: '<컬럼>' (현재 값) 또는 '<컬럼>_<종류><n>' 예) 내부온도_lag5, 풍속_mean30, 이슬점_ewm60
+_NAME_PATTERN = re.compile(r'^(.+)_(' + '|'.join(FEATURE_KINDS) + r')(\d+)$')
+
+# EWMA를 최근 행만으로 시작할 때 사용할 길이 (span의 배수, 이전 값의 영향이 1e-8 이하)
+_EWM_HISTORY_SPANS = 10
+
+
+class FeatureSet:
+    """
+    특성 이름 목록으로 정의한 특성 집합
+    - lag<k>: k행 전 값, delta<k>: 현재 값 - k행 전 값
+    - mean<w>/std<w>: 최근 w행 평균/표준편차(모표준편차), ewm<s>: span s 지수 이동 평균
+    시작 부분은 첫 행 값이 계속 이어졌다고 보고 계산한다 (스트리밍/배치 동일)
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        specs = []
+        used = set()
+        for name in self.names:
+            match = _NAME_PATTERN.match(name)
+            column, kind, n = (match.group(1), match.group(2), int(match.group(3))) if match else (name, 'value', 0)
+            if column not in FEATURE_COLUMNS:
+                raise ValueError(f"지원하지 않는 특성: {name}")
+            if kind != 'value' and n < 1:
+                raise ValueError(f"특성 길이는 1 이상이어야 함: {name}")
+            specs.append((column, kind, n))
+            used.add(column)
+        self.columns = [column for column in FEATURE_COLUMNS if column in used]
+        index = {column: i for i, column in enumerate(self.columns)}
+        self.specs = [(index[column], kind, n) for column, kind, n in specs]
+
+        lags = [n for _, kind, n in self.specs if kind in ('lag', 'delta')]
+        self.windows = sorted({n for _, kind, n in self.specs if kind in ('mean', 'std')})
+        self.spans = sorted({n for _, kind, n in self.specs if kind == 'ewm'})
+        # 링 버퍼 길이: 가장 긴 lag + 1과 가장 긴 창 중 큰 값
+        self.capacity = max([1] + [n + 1 for n in lags] + self.windows)
+        # 예측 시 최근 몇 행으로 상태를 만들지 (EWMA는 span의 배수만큼)
+        self.history = max([self.capacity] + [_EWM_HISTORY_SPANS * n for n in self.spans])
+
+        # 종류별로 (출력 위치, 컬럼 위치, 길이 또는 창/span 위치) 배열로 묶어 한 번에 계산
+        window_index = {w: i for i, w in enumerate(self.windows)}
+        span_index = {n: i for i, n in enumerate(self.spans)}
+        self.groups = {}
+        for kind in ('value',) + FEATURE_KINDS:
+            picked = [(j, c, n) for j, (c, k, n) in enumerate(self.specs) if k == kind]
+            if not picked:
+                continue
+            out, cols, ns = (np.array(v) for v in zip(*picked))
+            if kind in ('mean', 'std'):
+                ns = np.array([window_index[n] for n in ns])
+            elif kind == 'ewm':
+                ns = np.array([span_index[n] for n in ns])
+            self.groups[kind] = (out, cols, ns)
+
+    @classmethod
+    def default(cls, columns=FEATURE_COLUMNS, lags=(1, 5, 15), deltas=(1, 5), windows=(10, 30, 60),
+                spans=(10, 60)):
+        names = []
+        for column in columns:
+            names.append(column)
+            names += [f"{column}_lag{n}" for n in lags]
+            names += [f"{column}_delta{n}" for n in deltas]
+            names += [f"{column}_mean{n}" for n in windows]
+            names += [f"{column}_std{n}" for n in windows]
+            names += [f"{column}_ewm{n}" for n in spans]
+        return cls(names)
+
+    def union(self, other):
+        return FeatureSet(self.names + [name for name in other.names if name not in set(self.names)])
+
+    def indices(self, names):
+        """names 순서대로 이 집합의 특성 위치"""
+        position = {name: i for i, name in enumerate(self.names)}
+        return np.array([position[name] for name in names])
+
+
+class FeatureEngine:
+    """
+    스트리밍 특성 계산기 (n개 시계열을 한 번에)
+    새 행마다 링 버퍼, 창별 누적 합/제곱합, EWMA만 갱신하므로 이력 길이와 무관하게 행당 O(특성 수)
+    누적 합은 첫 행 기준으로 뺀 값으로 유지해서 표준편차 계산의 자릿수 손실을 줄인다
+    """
+
+    def __init__(self, feature_set, n=1):
+        self.feature_set = feature_set
+        self.n = n
+        self.count = 0
+        columns = len(feature_set.columns)
+        self._windows = np.array(feature_set.windows, dtype=np.int64)
+        self._alphas = 2.0 / (np.array(feature_set.spans, dtype=float) + 1)
+        self._origin = np.zeros((n, columns))
+        self._last = np.zeros((n, columns))
+        self._buffer = np.zeros((n, columns, feature_set.capacity))
+        self._sums = np.zeros((n, columns, len(self._windows)))
+        self._squares = np.zeros((n, columns, len(self._windows)))
+        self._ewm = np.zeros((n, columns, len(self._alphas)))
+
+    @classmethod
+    def from_history(cls, values, positions, feature_set):
+        """
+        values: (T, 컬럼 수) 배열 (feature_set.columns 순서), positions: 상태를 만들 행 위치들
+        각 위치까지 한 행씩 update한 것과 같은 상태를 배치 연산으로 만든다
+        """
+        values = _fill_missing(np.asarray(values, dtype=float))
+        positions = np.asarray(positions)
+        capacity = feature_set.capacity
+        engine = cls(feature_set, len(positions))
+        origin = values[0]
+        centered = _pad(values - origin, capacity)
+        # 위치 p의 최근 capacity행 (마지막이 p)
+        windows = np.lib.stride_tricks.sliding_window_view(centered, capacity, axis=0)[positions + 1]
+        engine._buffer = windows + origin[None, :, None]
+        engine._origin = np.broadcast_to(origin, (len(positions), len(origin))).copy()
+        engine._last = values[positions].copy()
+        for i, w in enumerate(feature_set.windows):
+            recent = windows[..., capacity - w:]
+            engine._sums[..., i] = recent.sum(axis=2)
+            engine._squares[..., i] = np.square(recent).sum(axis=2)
+        for i, span in enumerate(feature_set.spans):
+            engine._ewm[..., i] = _ewm(values, span)[positions]
+        engine.count = capacity
+        return engine
+
+    @classmethod
+    def stack(cls, engines):
+        """
+        같은 feature_set, 같은 count의 엔진들을 시계열 축으로 이어 붙인 엔진 (시계열별 이력이 섞이지 않음)
+        여러 온실을 각자의 이력으로 만든 뒤 한 번에 예측할 때 사용
+        """
+        first = engines[0]
+        engine = cls(first.feature_set, sum(e.n for e in engines))
+        for name in ('_origin', '_last', '_buffer', '_sums', '_squares', '_ewm'):
+            setattr(engine, name, np.concatenate([getattr(e, name) for e in engines]))
+        engine.count = first.count
+        return engine
+
+    def update(self, rows):
+        """새 행 (n, 컬럼 수) 추가 (결측값은 직전 값으로 채움)"""
+        rows = np.asarray(rows, dtype=float).reshape(self.n, -1)
+        capacity = self.feature_set.capacity
+        if self.count == 0:
+            rows = np.where(np.isnan(rows), 0.0, rows)
+            # 첫 행 이전은 첫 행 값이 이어졌다고 봄
+            self._origin = rows.copy()
+            self._buffer[:] = rows[..., None]
+            self._sums[:] = 0.0
+            self._squares[:] = 0.0
+            self._ewm[:] = rows[..., None]
+        else:
+            rows = np.where(np.isnan(rows), self._last, rows)
+            new = (rows - self._origin)[..., None]
+            leaving = self._buffer[..., (self.count - self._windows) % capacity] - self._origin[..., None]
+            self._sums += new - leaving
+            self._squares += new * new - leaving * leaving
+            self._ewm += self._alphas * (rows[..., None] - self._ewm)
+        self._buffer[..., self.count % capacity] = rows
+        self._last = rows
+        self.count += 1
+
+    @property
+    def last(self):
+        """마지막으로 들어온 행 (n, 컬럼 수), 결측값은 채워진 값"""
+        return self._last
+
+    def values(self):
+        """현재 특성 (n, 특성 수), feature_set.names 순서"""
+        capacity = self.feature_set.capacity
+        current = self.count - 1
+        out = np.empty((self.n, len(self.feature_set.specs)))
+        for kind, (j, c, k) in self.feature_set.groups.items():
+            if kind == 'value':
+                out[:, j] = self._last[:, c]
+            elif kind == 'lag':
+                out[:, j] = self._buffer[:, c, (current - k) % capacity]
+            elif kind == 'delta':
+                out[:, j] = self._last[:, c] - self._buffer[:, c, (current - k) % capacity]
+            elif kind == 'mean':
+                out[:, j] = self._sums[:, c, k] / self._windows[k] + self._origin[:, c]
+            elif kind == 'std':
+                mean = self._sums[:, c, k] / self._windows[k]
+                out[:, j] = np.sqrt(np.maximum(self._squares[:, c, k] / self._windows[k] - mean * mean, 0.0))
+            else:
+                out[:, j] = self._ewm[:, c, k]
+        return out
+
+
+def compute_features(frame, feature_set):
+    """
+    배치 계산: frame의 모든 행에 대한 특성 데이터프레임 (학습/백테스트용)
+    FeatureEngine으로 한 행씩 계산한 결과와 같다
+    """
+    values = _fill_missing(frame[feature_set.columns].to_numpy(dtype=float))
+    capacity = feature_set.capacity
+    origin = values[0] if len(values) else np.zeros(len(feature_set.columns))
+    centered = _pad(values - origin, capacity)
+    rows = len(values)
+    cumulative = np.cumsum(centered, axis=0)
+    cumulative_squares = np.cumsum(np.square(centered), axis=0)
+    ewms = {s: _ewm(values, s) for s in feature_set.spans}
+
+    out = np.empty((rows, len(feature_set.specs)))
+    current = slice(capacity, capacity + rows)
+    for j, (c, kind, k) in enumerate(feature_set.specs):
+        if kind == 'value':
+            out[:, j] = values[:, c]
+        elif kind == 'lag':
+            out[:, j] = centered[capacity - k:capacity - k + rows, c] + origin[c]
+        elif kind == 'delta':
+            out[:, j] = centered[current, c] - centered[capacity - k:capacity - k + rows, c]
+        elif kind in ('mean', 'std'):
+            total = cumulative[current, c] - cumulative[capacity - k:capacity - k + rows, c]
+            mean = total / k
+            if kind == 'mean':
+                out[:, j] = mean + origin[c]
+            else:
+                squares = cumulative_squares[current, c] - cumulative_squares[capacity - k:capacity - k + rows, c]
+                out[:, j] = np.sqrt(np.maximum(squares / k - mean * mean, 0.0))
+        else:
+            out[:, j] = ewms[k][:, c]
+    return pd.DataFrame(out, columns=feature_set.names, index=frame.index)
+
+
+def _fill_missing(values):
+    """결측값을 직전 값으로 (맨 앞 결측은 0으로) 채움"""
+    if not np.isnan(values).any():
+        return values
+    return pd.DataFrame(values).ffill().fillna(0.0).to_numpy()
+
+
+def _pad(values, capacity):
+    """앞쪽에 첫 행(0)을 capacity행 덧붙임"""
+    return np.concatenate([np.zeros((capacity, values.shape[1])), values])
+
+
+def _ewm(values, span):
+    """span 지수 이동 평균 (첫 값에서 시작, 각 컬럼 독립)"""
+    return pd.DataFrame(values).ewm(span=span, adjust=False).mean().to_numpy()
@@ -0,0 +1,435 @@
+import argparse
+import contextlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import (HOT_STORE_PATH, HOT_STORE_RETENTION_HOURS, HOT_STORE_RETENTION_INTERVAL,
+                    SENSOR_ARCHIVE_DIR)
+from metrics import get_metrics
+from sensor_schema import apply_schema, widen
+from sensor_store import PREDICTION_COLUMNS, ROLLUP_TIERS, SENSOR_COLUMNS, RollupTier
+
+# 테이블 이름 → (컬럼 목록, 정수로 저장하는 값 컬럼), 첫 컬럼이 시간 컬럼
+TABLES = {
+    'sensor': (SENSOR_COLUMNS, ['누적일사량']),
+    'predictions': (PREDICTION_COLUMNS, []),
+}
+# 다른 프로세스가 쓰는 중일 때 기다릴 최대 시간(초)
+BUSY_TIMEOUT = 5.0
+_NS_PER_SECOND = 1_000_000_000
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _epoch(timestamp, ceil=False):
+    """시각 → 초 단위 정수 (시간 컬럼 저장 형식)"""
+    value = pd.Timestamp(timestamp).as_unit('ns').value
+    return -(-value // _NS_PER_SECOND) if ceil else value // _NS_PER_SECOND
+
+
+class HotStore:
+    """
+    최근 센서/예측 데이터를 담는 SQLite 저장소 (WAL 모드)
+    - 시간 컬럼이 INTEGER PRIMARY KEY(테이블 B-트리 키)라서 구간 조회가 인덱스 범위 스캔이 된다
+    - WAL 모드에서는 쓰는 쪽 하나와 읽는 쪽 여럿이 서로 막지 않고, 읽기는 커밋된 상태만 본다
+    - sqlite3 연결은 스레드마다 따로 연다
+    - 오래된 행은 retain()으로 아카이브로 옮기고 지워서 작은 크기를 유지한다
+    """
+
+    def __init__(self, path, timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._retention_started = False
+        self._create_tables()
+
+    def connection(self):
+        """현재 스레드의 연결 (처음 호출 시 생성)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # WAL에서는 커밋마다 fsync하지 않아도 손상되지 않음 (전원 장애 시 마지막 커밋만 유실 가능)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """쓰기 트랜잭션 (프로세스 안에서는 잠금, 프로세스 간에는 SQLite 쓰기 잠금으로 직렬화)"""
+        conn = self.connection()
+        with self._write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _create_tables(self):
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS hot_store_meta '
+                '(name TEXT PRIMARY KEY, version INTEGER NOT NULL, cutoff INTEGER)'
+            )
+            for table, (columns, int_columns) in TABLES.items():
+                definitions = [f'{_quote(columns[0])} INTEGER PRIMARY KEY'] + [
+                    f"{_quote(column)} {'INTEGER' if column in int_columns else 'REAL'}"
+                    for column in columns[1:]
+                ]
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(definitions)})')
+                conn.execute('INSERT OR IGNORE INTO hot_store_meta VALUES (?, 0, NULL)', (table,))
+
+    def _bump(self, conn, table, cutoff=None):
+        if cutoff is None:
+            conn.execute('UPDATE hot_store_meta SET version = version + 1 WHERE name = ?', (table,))
+        else:
+            conn.execute('UPDATE hot_store_meta SET version = version + 1, cutoff = ? WHERE name = ?',
+                         (cutoff, table))
+
+    def write(self, table, frame):
+        """행 추가 (시간이 같은 행은 새 값으로 교체), 기록한 행 수 반환"""
+        columns, _ = TABLES[table]
+        if not isinstance(frame, pd.DataFrame):
+            frame = pd.DataFrame(list(frame), columns=columns)
+        if frame.empty:
+            return 0
+        times = pd.to_datetime(frame[columns[0]]).to_numpy().astype('datetime64[s]').astype(np.int64)
+        # NaN은 SQLite에서 NULL로 저장된다
+        records = zip(times.tolist(), *(widen(frame[column].to_numpy()).tolist() for column in columns[1:]))
+        sql = (f'INSERT OR REPLACE INTO {table} ({", ".join(map(_quote, columns))}) '
+               f'VALUES ({", ".join("?" * len(columns))})')
+        with get_metrics().timed('hot_store_write_seconds', '저장소 쓰기 시간', table=table):
+            with self._transaction() as conn:
+                conn.executemany(sql, records)
+                self._bump(conn, table)
+        return len(frame)
+
+    def reset(self, table):
+        """테이블의 모든 행 삭제 (예측 초기화용)"""
+        with self._transaction() as conn:
+            conn.execute(f'DELETE FROM {table}')
+            self._bump(conn, table)
+
+    def version(self, table):
+        """테이블 데이터 버전 (쓰기/삭제가 커밋될 때마다 증가)"""
+        row = self.connection().execute(
+            'SELECT version FROM hot_store_meta WHERE name = ?', (table,)).fetchone()
+        return row[0]
+
+    def cutoff(self, table):
+        """아카이브로 옮긴 경계 시각 (이 시각 이전 행은 저장소에 없음, 옮긴 적이 없으면 None)"""
+        row = self.connection().execute(
+            'SELECT cutoff FROM hot_store_meta WHERE name = ?', (table,)).fetchone()
+        return None if row[0] is None else pd.Timestamp(row[0], unit='s')
+
+    def read(self, table, start=None, end=None, include_start=True, last=None):
+        """start ~ end 구간(end 포함) 행을 시간순으로 반환, last를 주면 마지막 last행만"""
+        columns, _ = TABLES[table]
+        time_column = _quote(columns[0])
+        conditions, params = [], []
+        if start is not None:
+            if include_start:
+                conditions.append(f'{time_column} >= ?')
+                params.append(_epoch(start, ceil=True))
+            else:
+                conditions.append(f'{time_column} > ?')
+                params.append(_epoch(start))
+        if end is not None:
+            conditions.append(f'{time_column} <= ?')
+            params.append(_epoch(end))
+        sql = f'SELECT {", ".join(map(_quote, columns))} FROM {table}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {time_column}'
+        if last is not None:
+            sql += f' DESC LIMIT {int(last)}'
+
+        with get_metrics().timed('hot_store_query_seconds', '저장소 조회 시간', table=table):
+            rows = self.connection().execute(sql, params).fetchall()
+        if last is not None:
+            rows.reverse()
+        frame = pd.DataFrame(rows, columns=columns)
+        frame[columns[0]] = pd.to_datetime(frame[columns[0]].to_numpy(dtype=np.int64), unit='s')
+        return apply_schema(frame)
+
+    def last_time(self, table):
+        columns, _ = TABLES[table]
+        row = self.connection().execute(f'SELECT MAX({_quote(columns[0])}) FROM {table}').fetchone()
+        return None if row[0] is None else pd.Timestamp(row[0], unit='s')
+
+    def count(self, table):
+        return self.connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def table(self, name, archive=None):
+        """sensor_store.CsvTable과 같은 조회 인터페이스의 테이블"""
+        return HotTable(self, name, archive)
+
+    def retain(self, keep=pd.Timedelta(hours=HOT_STORE_RETENTION_HOURS), archive=None):
+        """
+        마지막 시간 - keep 이전 행을 저장소에서 제거
+        sensor 테이블은 날짜 경계에서 자르고, archive가 있으면 지우기 전에 아카이브에 기록한다
+        (아카이브 기록 후 삭제가 커밋되기 전에 실패하면 다음 실행 때 같은 행이 다시 기록될 수 있음)
+        반환: 테이블 → 제거한 행 수
+        """
+        removed = {}
+        for table, (columns, _) in TABLES.items():
+            last = self.last_time(table)
+            if last is None:
+                removed[table] = 0
+                continue
+            cutoff = last - pd.Timedelta(keep)
+            if table == 'sensor':
+                # 집계 구간(최대 1일)이 아카이브와 저장소에 나뉘지 않도록 날짜 단위로 자름
+                cutoff = cutoff.floor('D')
+            boundary = _epoch(cutoff, ceil=True)
+            time_column = _quote(columns[0])
+            with self._transaction() as conn:
+                if table == 'sensor' and archive is not None:
+                    old = self.read(table, end=pd.Timestamp(boundary - 1, unit='s'))
+                    if not old.empty:
+                        archive.write(old)
+                deleted = conn.execute(f'DELETE FROM {table} WHERE {time_column} < ?', (boundary,)).rowcount
+                if deleted:
+                    # 센서 테이블은 아카이브에서 읽을 경계도 함께 기록
+                    self._bump(conn, table, boundary if table == 'sensor' else None)
+            removed[table] = deleted
+            get_metrics().counter('hot_store_rows_retired_total', '보존 기간이 지나 저장소에서 옮기거나 지운 행 수',
+                                  table=table).inc(deleted)
+        return removed
+
+    def start_retention(self, keep=pd.Timedelta(hours=HOT_STORE_RETENTION_HOURS),
+                        interval=HOT_STORE_RETENTION_INTERVAL, archive=None):
+        """interval초마다 retain()을 실행하는 백그라운드 스레드 (한 번만 시작)"""
+        with self._write_lock:
+            if self._retention_started:
+                return
+            self._retention_started = True
+
+        def retain_forever():
+            while True:
+                try:
+                    removed = self.retain(keep, archive)
+                    if any(removed.values()):
+                        print(f"저장소 보존 작업 - {removed}")
+                except Exception as e:
+                    print(f"저장소 보존 작업 실패: {str(e)}")
+                time.sleep(interval)
+
+        threading.Thread(target=retain_forever, name="hot-store-retention", daemon=True).start()
+
+
+class HotTable:
+    """
+    HotStore 테이블 하나를 sensor_store.CsvTable과 같은 인터페이스로 조회
+    archive를 주면 저장소에서 옮겨진 구간(cutoff 이전)은 아카이브에서 읽는다
+    """
+
+    def __init__(self, store, name, archive=None):
+        self.store = store
+        self.name = name
+        self.archive = archive
+        self.time_column = TABLES[name][0][0]
+        self._lock = threading.Lock()
+        # (버전, 집계 단위별 RollupTier): 저장소 부분 집계 (저장소가 작으므로 버전이 바뀌면 다시 계산)
+        self._rollups = (None, None)
+
+    @property
+    def version(self):
+        return self.store.version(self.name)
+
+    @property
+    def bytes_read(self):
+        """파일에서 읽은 바이트 수 (저장소 조회는 제외, 아카이브 읽기만)"""
+        return self.archive.bytes_read if self.archive is not None else 0
+
+    def snapshot(self):
+        return self._range(None, None)
+
+    def last_time(self):
+        last = self.store.last_time(self.name)
+        if last is None and self.archive is not None:
+            return self.archive.last_time()
+        return last
+
+    def asof(self, timestamp, tolerance=None):
+        """timestamp 시점 또는 그 이전의 가장 최근 행 (tolerance보다 오래되면 None)"""
+        timestamp = pd.Timestamp(timestamp)
+        frame = self.store.read(self.name, end=timestamp, last=1)
+        if not frame.empty:
+            row = frame.iloc[-1]
+        elif self.archive is not None:
+            row = self.archive.asof(timestamp, tolerance)
+        else:
+            row = None
+        if row is None or (tolerance is not None and timestamp - row[self.time_column] > tolerance):
+            return None
+        return row
+
+    def window(self, start=None, end=None):
+        return self._range(start, end)
+
+    def after(self, timestamp):
+        return self._range(timestamp, None, include_start=False)
+
+    def rollup(self, tier, start=None, end=None):
+        """집계 단위 tier로 start ~ end 구간 조회 (아카이브 구간은 아카이브의 날짜별 집계 사용)"""
+        frames = []
+        cutoff = self._archived_until(start)
+        if cutoff is not None:
+            frames.append(self.archive.rollup(tier, start, self._archive_end(end, cutoff)))
+        if cutoff is None or end is None or pd.Timestamp(end) >= cutoff:
+            hot_start = start if cutoff is None or start is None else max(pd.Timestamp(start), cutoff)
+            frames.append(self._hot_rollups()[tier].window(hot_start, end))
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return RollupTier(ROLLUP_TIERS[tier], self.time_column).window()
+        return pd.concat(frames, ignore_index=True)
+
+    def _hot_rollups(self):
+        with self._lock:
+            version = self.version
+            if self._rollups[0] != version:
+                frame = self.store.read(self.name)
+                tiers = {name: RollupTier(freq, self.time_column) for name, freq in ROLLUP_TIERS.items()}
+                for rollup in tiers.values():
+                    rollup.extend(frame)
+                self._rollups = (version, tiers)
+            return self._rollups[1]
+
+    def _archived_until(self, start):
+        """start부터 읽을 때 아카이브에서 읽어야 하면 그 경계(cutoff), 아니면 None"""
+        if self.archive is None:
+            return None
+        cutoff = self.store.cutoff(self.name)
+        if cutoff is None or (start is not None and pd.Timestamp(start) >= cutoff):
+            return None
+        return cutoff
+
+    @staticmethod
+    def _archive_end(end, cutoff):
+        """아카이브에서 읽을 구간의 끝 (cutoff 직전까지)"""
+        last = cutoff - pd.Timedelta(1, 'ns')
+        return last if end is None else min(pd.Timestamp(end), last)
+
+    def _range(self, start, end, include_start=True):
+        cutoff = self._archived_until(start)
+        if cutoff is None:
+            return self.store.read(self.name, start, end, include_start)
+        frames = [self.archive.read_range(start, self._archive_end(end, cutoff),
+                                          columns=TABLES[self.name][0], include_start=include_start)]
+        if end is None or pd.Timestamp(end) >= cutoff:
+            frames.append(self.store.read(self.name, cutoff, end))
+        return pd.concat(frames, ignore_index=True)
+
+
+class HotPredictionWriter:
+    """
+    예측 결과를 HotStore에 기록 (prediction_log.PredictionLogWriter와 같은 인터페이스)
+    buffer_size만큼 모아서 한 트랜잭션으로 기록한다
+    """
+
+    def __init__(self, store, table='predictions', buffer_size=1):
+        self.store = store
+        self.table = table
+        self.columns = TABLES[table][0]
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._buffer = []
+
+    def append(self, *values):
+        if len(values) != len(self.columns):
+            raise ValueError(f"컬럼 수 불일치: {len(values)} != {len(self.columns)}")
+        with self._lock:
+            self._buffer.append(values)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def reset(self):
+        with self._lock:
+            self._buffer.clear()
+            self.store.reset(self.table)
+
+    def close(self):
+        self.flush()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self.store.write(self.table, pd.DataFrame(self._buffer, columns=self.columns))
+            self._buffer.clear()
+
+
+_hot_store = None
+_hot_store_lock = threading.Lock()
+
+
+def get_hot_store():
+    """config.HOT_STORE_PATH의 프로세스 공용 저장소 (설정하지 않았으면 None)"""
+    global _hot_store
+    if not HOT_STORE_PATH:
+        return None
+    with _hot_store_lock:
+        if _hot_store is None:
+            _hot_store = HotStore(HOT_STORE_PATH)
+    return _hot_store
+
+
+def default_archive():
+    """보존 작업이 오래된 센서 행을 옮길 아카이브 (SENSOR_ARCHIVE_DIR가 없으면 None → 삭제만)"""
+    if not SENSOR_ARCHIVE_DIR:
+        return None
+    from sensor_archive import SensorArchive
+    return SensorArchive(SENSOR_ARCHIVE_DIR)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="최근 센서/예측 데이터 SQLite 저장소 관리")
+    parser.add_argument("--path", default=HOT_STORE_PATH, required=not HOT_STORE_PATH,
+                        help="저장소 파일 경로 (기본: HOT_STORE_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("import", help="기존 CSV 파일을 저장소로 가져오기")
+    load.add_argument("--sensor", default="sensor_data.csv")
+    load.add_argument("--predictions", default="predictions.csv")
+    load.add_argument("--chunksize", type=int, default=100_000)
+
+    retain = commands.add_parser("retain", help="보존 기간이 지난 행을 아카이브로 옮기고 삭제")
+    retain.add_argument("--keep-hours", type=float, default=HOT_STORE_RETENTION_HOURS)
+    retain.add_argument("--archive", default=SENSOR_ARCHIVE_DIR, help="센서 아카이브 디렉토리 (없으면 삭제만)")
+
+    commands.add_parser("stats", help="테이블별 행 수와 시간 범위")
+
+    args = parser.parse_args()
+    store = HotStore(args.path)
+    if args.command == "import":
+        for table, path in [('sensor', args.sensor), ('predictions', args.predictions)]:
+            total = 0
+            try:
+                for chunk in pd.read_csv(path, chunksize=args.chunksize):
+                    total += store.write(table, chunk)
+            except FileNotFoundError:
+                print(f"{path} 파일이 없습니다")
+                continue
+            print(f"{path} → {table}: {total}행")
+    elif args.command == "retain":
+        archive = None
+        if args.archive:
+            from sensor_archive import SensorArchive
+            archive = SensorArchive(args.archive)
+        print(store.retain(pd.Timedelta(hours=args.keep_hours), archive))
+    else:
+        for table in TABLES:
+            print(f"{table}: {store.count(table)}행, 마지막 {store.last_time(table)}, "
+                  f"아카이브 경계 {store.cutoff(table)}, 버전 {store.version(table)}")
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import INFERENCE_CACHE_DECIMALS, INFERENCE_CACHE_SIZE, INFERENCE_CACHE_TTL
+from metrics import get_metrics
+
+# 입력이 양자화 격자 위에 있다고 볼 허용 오차 (격자 단위 기준)
+# float32로 저장된 측정값(20.9f = 20.899999618...)도 격자 위로 보도록 격자 값에 비례하는 float32 반올림 오차를 더함
+_GRID_TOLERANCE = 1e-6
+_FLOAT32_EPS = float(np.finfo(np.float32).eps)
+# 이 행 수 이하는 NumPy 중복 제거 대신 행별 조회 (한 행 예측에서 캐시 비용이 추론보다 커지지 않도록)
+_SMALL_BATCH = 4
+
+
+class InferenceCache:
+    """
+    모델 예측 결과 캐시 (LRU + 선택적 TTL)
+    키: (모델 버전, 10^decimals배 해서 정수로 바꾼 입력 행)
+    센서 값은 0.1 단위라서 같은 입력이 자주 반복되고, 격자 위에 있는 행만 캐시하므로 결과는 직접 계산한 것과 같다
+    (배치 구성에 따른 트리 합산 순서 차이, 1e-14 수준과 같은 값의 float32/float64 표현 차이는 제외)
+    (평균/표준편차 특성처럼 격자 밖의 값이 있는 행은 캐시하지 않고 바로 계산)
+    """
+
+    def __init__(self, max_entries=INFERENCE_CACHE_SIZE, ttl=INFERENCE_CACHE_TTL,
+                 decimals=INFERENCE_CACHE_DECIMALS):
+        self.max_entries = max_entries
+        self.ttl = ttl or None
+        self.scale = 10.0 ** decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        metrics = get_metrics()
+        help_text = '추론 캐시 조회 행 수 (hit/miss, 격자 밖 입력은 bypass)'
+        self._hit_counter = metrics.counter('inference_cache_rows_total', help_text, result='hit')
+        self._miss_counter = metrics.counter('inference_cache_rows_total', help_text, result='miss')
+        self._bypass_counter = metrics.counter('inference_cache_rows_total', help_text, result='bypass')
+
+    def predict(self, model_dict, X, compute):
+        """
+        X (n, 입력 수)의 행별 예측: 캐시에 있는 행은 재사용하고 나머지만 compute(행들)로 한 번에 계산
+        같은 배치 안에서 반복되는 행도 한 번만 계산한다
+        """
+        X = np.asarray(X, dtype=float)
+        if not self.max_entries or X.ndim != 2 or len(X) == 0:
+            return compute(X)
+        scaled = X * self.scale
+        grid = np.rint(scaled)
+        cacheable = (np.abs(scaled - grid) <= _GRID_TOLERANCE + np.abs(grid) * _FLOAT32_EPS).all(axis=1)
+        if not cacheable.any():
+            self._count(0, 0, len(X))
+            return compute(X)
+
+        token = model_token(model_dict)
+        if len(X) <= _SMALL_BATCH:
+            return self._predict_small(token, X, grid, cacheable, compute)
+        rows = np.flatnonzero(cacheable)
+        keys, first, inverse = np.unique(grid[rows].astype(np.int64), axis=0,
+                                         return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        key_bytes = [(token, key.tobytes()) for key in keys]
+        values = np.empty(len(keys))
+        found = self._lookup(key_bytes, values)
+
+        missing = np.flatnonzero(~found)
+        uncached = np.flatnonzero(~cacheable)
+        if len(missing) or len(uncached):
+            # 캐시에 없는 대표 행과 격자 밖의 행을 한 번에 계산
+            batch = np.concatenate([rows[first[missing]], uncached])
+            computed = np.asarray(compute(X[batch]), dtype=float).reshape(-1)
+            values[missing] = computed[:len(missing)]
+            self._store([key_bytes[i] for i in missing], computed[:len(missing)])
+
+        out = np.empty(len(X))
+        out[rows] = values[inverse]
+        if len(uncached):
+            out[uncached] = computed[len(missing):]
+        self._count(len(rows) - len(missing), len(missing), len(uncached))
+        return out
+
+    def _predict_small(self, token, X, grid, cacheable, compute):
+        out = np.empty(len(X))
+        keys = {}
+        pending = []
+        now = time.monotonic()
+        grid = grid.astype(np.int64)
+        with self._lock:
+            for i in range(len(X)):
+                if not cacheable[i]:
+                    pending.append((i, None))
+                    continue
+                key = (token, grid[i].tobytes())
+                entry = self._entries.get(key)
+                if entry is not None and (self.ttl is None or now - entry[1] <= self.ttl):
+                    self._entries.move_to_end(key)
+                    out[i] = entry[0]
+                elif key in keys:
+                    keys[key].append(i)
+                else:
+                    keys[key] = [i]
+                    pending.append((i, key))
+        hits = int(cacheable.sum()) - sum(len(rows) for rows in keys.values())
+        if pending:
+            computed = np.asarray(compute(X[[i for i, _ in pending]]), dtype=float).reshape(-1)
+            for (i, key), value in zip(pending, computed):
+                if key is None:
+                    out[i] = value
+                else:
+                    out[keys[key]] = value
+            self._store([key for _, key in pending if key is not None],
+                        np.array([value for (_, key), value in zip(pending, computed) if key is not None]))
+        self._count(hits, len(keys), int(len(X) - cacheable.sum()))
+        return out
+
+    def invalidate(self):
+        """모든 항목 삭제 (모델 교체 시)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        looked_up = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / looked_up if looked_up else None,
+        }
+
+    def _lookup(self, keys, values):
+        found = np.zeros(len(keys), dtype=bool)
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if self.ttl is not None and now - entry[1] > self.ttl:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                values[i] = entry[0]
+                found[i] = True
+        return found
+
+    def _store(self, keys, values):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in zip(keys, values.tolist()):
+                self._entries[key] = (value, now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _count(self, hits, misses, bypassed):
+        # 통계는 대략적인 값이면 충분하므로 잠금 없이 갱신
+        self.hits += hits
+        self.misses += misses
+        self.bypassed += bypassed
+        if hits:
+            self._hit_counter.inc(hits)
+        if misses:
+            self._miss_counter.inc(misses)
+        if bypassed:
+            self._bypass_counter.inc(bypassed)
+
+
+def model_token(model_dict):
+    """캐시 키에 쓰는 모델 식별자 (레지스트리가 붙인 버전, 없으면 객체 id)"""
+    return model_dict.get('version') or id(model_dict)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_inference_cache():
+    """프로세스 전체에서 공유하는 추론 캐시"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = InferenceCache()
+    return _cache
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import signal
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from anomaly import AnomalyDetector
+from append_log import AppendLogWriter
+from config import INGEST_HOST, INGEST_PORT, SENSOR_ARCHIVE_DIR
+from hot_store import default_archive, get_hot_store
+from sensor_schema import COLUMN_TYPES, SENSOR_COLUMNS
+
+# 저장시간을 제외한 측정값 컬럼과 타입 (정수 컬럼은 sensor_schema 타입 범위도 검사)
+READING_TYPES = {
+    column: int if np.issubdtype(COLUMN_TYPES[column], np.integer) else float
+    for column in SENSOR_COLUMNS[1:]
+}
+DEFAULT_SITE = 'default'
+
+
+def parse_reading(line):
+    """
+    JSON 한 줄을 검증해서 (site_id, 센서 행) 반환, 잘못된 값이면 ValueError
+    {"site_id": "gh-01", "저장시간": "2018-05-10 10:00:00", "내부온도": 19.7, ...}
+    """
+    try:
+        message = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"JSON 형식 오류: {str(e)}")
+    if not isinstance(message, dict):
+        raise ValueError("JSON 객체가 아님")
+    missing = [column for column in SENSOR_COLUMNS if column not in message]
+    if missing:
+        raise ValueError(f"누락된 컬럼: {missing}")
+
+    try:
+        timestamp = datetime.fromisoformat(str(message['저장시간']))
+    except ValueError:
+        raise ValueError(f"저장시간 형식 오류: {message['저장시간']}")
+    row = [timestamp.replace(microsecond=0)]
+    for column, kind in READING_TYPES.items():
+        value = message[column]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{column} 값이 숫자가 아님: {value!r}")
+        if kind is int and value != int(value):
+            raise ValueError(f"{column} 값이 정수가 아님: {value!r}")
+        if not math.isfinite(value):
+            raise ValueError(f"{column} 값이 유한하지 않음: {value!r}")
+        if kind is int and not np.iinfo(COLUMN_TYPES[column]).min <= value <= np.iinfo(COLUMN_TYPES[column]).max:
+            raise ValueError(f"{column} 값이 범위를 벗어남: {value!r}")
+        row.append(kind(value))
+    return str(message.get('site_id', DEFAULT_SITE)), row
+
+
+class CsvSink:
+    """온실별 센서 CSV에 배치 단위로 추가 (배치마다 write 한 번)"""
+
+    def __init__(self, path):
+        self.writer = AppendLogWriter(path, SENSOR_COLUMNS, buffer_size=sys.maxsize, fsync='interval')
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.writer.append(*row)
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class ArchiveSink:
+    """날짜별 Parquet 아카이브에 배치 단위로 추가 (배치마다 파일 하나)"""
+
+    def __init__(self, root):
+        from sensor_archive import SensorArchive
+        self.archive = SensorArchive(root)
+
+    def write_rows(self, rows):
+        self.archive.write(pd.DataFrame(rows, columns=SENSOR_COLUMNS))
+
+    def close(self):
+        pass
+
+
+class HotStoreSink:
+    """SQLite 저장소에 배치 단위로 추가 (배치마다 트랜잭션 하나), 보존 작업도 이 프로세스에서 실행"""
+
+    def __init__(self, store):
+        self.store = store
+        self.store.start_retention(archive=default_archive())
+
+    def write_rows(self, rows):
+        self.store.write('sensor', rows)
+
+    def close(self):
+        pass
+
+
+def build_sinks(sites_path=None):
+    """site_id → 저장 대상 (온실 목록이 없으면 저장소, 아카이브, sensor_data.csv 중 하나)"""
+    if sites_path:
+        with open(sites_path, encoding='utf-8') as f:
+            entries = json.load(f)
+        return {entry['site_id']: CsvSink(entry['sensor_csv']) for entry in entries}
+    if get_hot_store() is not None:
+        return {DEFAULT_SITE: HotStoreSink(get_hot_store())}
+    if SENSOR_ARCHIVE_DIR:
+        return {DEFAULT_SITE: ArchiveSink(SENSOR_ARCHIVE_DIR)}
+    return {DEFAULT_SITE: CsvSink("sensor_data.csv")}
+
+
+class IngestStats:
+    """수집 처리량 집계 (report 간격마다 구간 처리량을 계산)"""
+
+    def __init__(self):
+        self.received = 0
+        self.rejected = 0
+        self.anomalies = 0
+        self.committed = 0
+        self.batches = 0
+        self.connections = 0
+        self.started = time.perf_counter()
+        self._last = (self.started, 0, 0)
+
+    def report(self, pending):
+        now = time.perf_counter()
+        last_time, last_received, last_committed = self._last
+        elapsed = max(now - last_time, 1e-9)
+        total = max(now - self.started, 1e-9)
+        self._last = (now, self.received, self.committed)
+        average_batch = self.committed / self.batches if self.batches else 0
+        print(f"수집 현황 - 수신: {(self.received - last_received) / elapsed:.0f}건/초, "
+              f"기록: {(self.committed - last_committed) / elapsed:.0f}건/초 "
+              f"(누적 평균 {self.committed / total:.0f}건/초), 거부: {self.rejected}건, 이상: {self.anomalies}건, "
+              f"평균 배치: {average_batch:.0f}건, 연결: {self.connections}개, 대기: {pending}건")
+
+
+class IngestService:
+    """
+    여러 컨트롤러의 센서 값을 TCP(JSON 한 줄에 한 건)로 받아 배치로 저장하는 수집 서비스
+    - 연결마다 아직 기록되지 않은 건수를 max_pending으로 제한 (넘으면 그 연결의 읽기를 멈춤)
+    - batch_size건이 모이거나 batch_interval초가 지나면 온실별로 한 번에 기록
+    - detector가 있으면 기록 전에 배치 전체를 한 번에 검사해서 이상 값 수를 집계 (저장은 원래 값 그대로)
+    """
+
+    def __init__(self, sinks, batch_size=1000, batch_interval=0.2, max_pending=2000,
+                 report_interval=5.0, detector=None):
+        self.sinks = sinks
+        self.detector = detector
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_pending = max_pending
+        self.report_interval = report_interval
+        self.stats = IngestStats()
+        self._queue = asyncio.Queue()
+
+    async def serve(self, host=INGEST_HOST, port=INGEST_PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"센서 수집 서비스 시작 - {host}:{port}, 온실: {list(self.sinks)}")
+        committer = asyncio.create_task(self._commit_loop())
+        reporter = asyncio.create_task(self._report_loop())
+        # SIGINT/SIGTERM을 받으면 남은 데이터를 기록한 뒤 종료
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            # 이미 받은 값은 모두 기록될 때까지 기다린 뒤 정리
+            await self._queue.join()
+            committer.cancel()
+            reporter.cancel()
+            await self._drain()
+            for sink in self.sinks.values():
+                sink.close()
+            self.stats.report(0)
+            print("수집 서비스 종료")
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        # 이 연결에서 받았지만 아직 기록되지 않은 건수 제한
+        pending = asyncio.Semaphore(self.max_pending)
+        self.stats.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.stats.received += 1
+                try:
+                    site_id, row = parse_reading(line)
+                    if site_id not in self.sinks:
+                        raise ValueError(f"등록되지 않은 온실: {site_id}")
+                except ValueError as e:
+                    self.stats.rejected += 1
+                    if self.stats.rejected <= 10:
+                        print(f"잘못된 센서 값 ({peer}): {str(e)}")
+                    continue
+                await pending.acquire()
+                self._queue.put_nowait((pending, site_id, row))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"연결 오류 ({peer}): {str(e)}")
+        finally:
+            self.stats.connections -= 1
+            writer.close()
+
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_interval
+            while len(batch) < self.batch_size:
+                self._take_ready(batch)
+                timeout = deadline - loop.time()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._commit(batch)
+
+    def _take_ready(self, batch):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _commit(self, batch):
+        by_site = {}
+        for _, site_id, row in batch:
+            by_site.setdefault(site_id, []).append(row)
+        try:
+            # 파일 기록은 이벤트 루프 밖에서 (기록 중에도 다른 연결의 수신은 계속)
+            await asyncio.to_thread(self._write, by_site)
+            self.stats.committed += len(batch)
+            self.stats.batches += 1
+        except Exception as e:
+            print(f"센서 데이터 기록 실패: {str(e)}")
+        finally:
+            for pending, _, _ in batch:
+                pending.release()
+                self._queue.task_done()
+
+    def _write(self, by_site):
+        for rows in by_site.values():
+            # 여러 연결에서 섞여 들어온 행을 시간순으로 기록
+            rows.sort(key=lambda row: row[0])
+        if self.detector is not None:
+            self._check(by_site)
+        for site_id, rows in by_site.items():
+            self.sinks[site_id].write_rows(rows)
+
+    def _check(self, by_site):
+        sites = [site_id for site_id, rows in by_site.items() for _ in rows]
+        rows = [row for rows in by_site.values() for row in rows]
+        minutes = np.array([row[0] for row in rows], dtype='datetime64[m]').astype(np.int64)
+        flags = self.detector.process(sites, minutes, [row[1:] for row in rows])[1]
+        self.stats.anomalies += int(np.count_nonzero(flags.any(axis=1)))
+
+    async def _drain(self):
+        batch = []
+        self._take_ready(batch)
+        while batch:
+            await self._commit(batch)
+            batch = []
+            self._take_ready(batch)
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.stats.report(self._queue.qsize())
+
+
+async def _send_readings(host, port, site_id, rate, duration, start_time):
+    """컨트롤러 하나를 흉내 내서 rate건/초로 duration초 동안 전송"""
+    _, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = 0
+    temp, humid = random.uniform(18, 24), random.uniform(55, 70)
+    while loop.time() - started < duration:
+        target = int((loop.time() - started) * rate) + 1
+        lines = []
+        for _ in range(target - sent):
+            temp += random.uniform(-0.1, 0.1)
+            humid += random.uniform(-0.2, 0.2)
+            timestamp = start_time + pd.Timedelta(minutes=sent)
+            lines.append(json.dumps({
+                'site_id': site_id,
+                '저장시간': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                '내부온도': round(temp, 1),
+                '내부습도': round(humid, 1),
+                '외부온도': round(temp - 5 + random.uniform(-0.5, 0.5), 1),
+                '풍속': round(random.uniform(0, 2), 1),
+                '이슬점': round(temp - 7, 1),
+                '누적일사량': sent % 1440,
+            }, ensure_ascii=False))
+            sent += 1
+        if lines:
+            writer.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            # 서버가 읽기를 멈추면 여기서 대기 (백프레셔)
+            await writer.drain()
+        await asyncio.sleep(0.01)
+    writer.close()
+    await writer.wait_closed()
+    return sent
+
+
+async def run_fake_senders(host, port, controllers, rate, duration, site_ids, start_time):
+    """여러 컨트롤러를 동시에 흉내 내는 테스트용 전송기"""
+    start_time = pd.Timestamp(start_time)
+    started = time.perf_counter()
+    counts = await asyncio.gather(*(
+        _send_readings(host, port, site_ids[i % len(site_ids)], rate, duration, start_time)
+        for i in range(controllers)
+    ))
+    elapsed = time.perf_counter() - started
+    print(f"전송 완료 - 컨트롤러: {controllers}개, 총 {sum(counts)}건, {sum(counts) / elapsed:.0f}건/초")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="센서 값 수집 서비스 (TCP, JSON 한 줄에 한 건)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="수집 서비스 실행")
+    serve.add_argument("--host", default=INGEST_HOST)
+    serve.add_argument("--port", type=int, default=INGEST_PORT)
+    serve.add_argument("--sites", help="온실 목록 JSON (없으면 HOT_STORE_PATH, SENSOR_ARCHIVE_DIR 또는 sensor_data.csv)")
+    serve.add_argument("--batch-size", type=int, default=1000)
+    serve.add_argument("--batch-interval", type=float, default=0.2, help="배치 최대 대기 시간(초)")
+    serve.add_argument("--max-pending", type=int, default=2000, help="연결당 미기록 최대 건수")
+    serve.add_argument("--report-interval", type=float, default=5.0)
+    serve.add_argument("--no-anomaly", action="store_true", help="센서 이상 감지 끄기")
+
+    send = commands.add_parser("send", help="테스트용 가짜 컨트롤러 실행")
+    send.add_argument("--host", default=INGEST_HOST)
+    send.add_argument("--port", type=int, default=INGEST_PORT)
+    send.add_argument("--controllers", type=int, default=10)
+    send.add_argument("--rate", type=float, default=100.0, help="컨트롤러당 초당 전송 건수")
+    send.add_argument("--duration", type=float, default=10.0, help="전송 시간(초)")
+    send.add_argument("--site-ids", nargs="+", default=[DEFAULT_SITE])
+    send.add_argument("--start", default="2018-05-10 10:06:00", help="첫 측정 시간")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        service = IngestService(build_sinks(args.sites), args.batch_size, args.batch_interval,
+                                args.max_pending, args.report_interval,
+                                None if args.no_anomaly else AnomalyDetector())
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run_fake_senders(args.host, args.port, args.controllers, args.rate,
+                                     args.duration, args.site_ids, args.start))
@@ -0,0 +1,269 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_FILE, METRICS_INTERVAL, METRICS_PORT
+
+# 시간 히스토그램 구간 경계: 1µs ~ 약 100초, 2^(1/4)배 간격 (분위수 오차 약 ±10%)
+TIME_BUCKETS = tuple(1e-6 * 2 ** (k / 4) for k in range(107))
+# 바이트 히스토그램 구간 경계: 0, 64B ~ 4GB 2배 간격 (읽은 것이 없는 갱신은 0 구간)
+BYTE_BUCKETS = (0.0,) + tuple(float(2 ** k) for k in range(6, 33))
+
+_IMPORTED_AT = time.time()
+
+
+class Histogram:
+    """
+    고정 구간 히스토그램 (관측 1회 = 이진 탐색 + 정수 증가)
+    분위수는 구간 안에서 선형 보간한 근사값
+    """
+
+    def __init__(self, name, help_text='', buckets=TIME_BUCKETS, labels=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = dict(labels or {})
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """with histogram.time(): 블록 실행 시간(초) 기록"""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return self._count
+
+    def quantile(self, q):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            'count': self._count,
+            'sum': self._sum,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+    def render(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self._count, self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_labels(self.labels, le=f'{bound:.6g}')} {cumulative}")
+        lines.append(f"{self.name}_bucket{_labels(self.labels, le='+Inf')} {total}")
+        lines.append(f"{self.name}_sum{_labels(self.labels)} {value_sum:.9g}")
+        lines.append(f"{self.name}_count{_labels(self.labels)} {total}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Counter:
+    """단조 증가 카운터"""
+
+    def __init__(self, name, help_text='', labels=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = dict(labels or {})
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{self.name}{_labels(self.labels)} {self.value}"]
+
+
+def _labels(labels, **extra):
+    merged = {**labels, **extra}
+    if not merged:
+        return ''
+    body = ','.join(f'{key}="{_escape(value)}"' for key, value in merged.items())
+    return '{' + body + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """프로세스 안의 히스토그램/카운터 모음 (이름 + 라벨별로 하나씩 생성)"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._exporters = set()
+
+    def histogram(self, name, help_text='', buckets=TIME_BUCKETS, **labels):
+        return self._get(Histogram, name, labels, help_text=help_text, buckets=buckets)
+
+    def counter(self, name, help_text='', **labels):
+        return self._get(Counter, name, labels, help_text=help_text)
+
+    def timed(self, name, help_text='', **labels):
+        """with metrics.timed('...'): 블록 실행 시간(초)을 히스토그램에 기록"""
+        return self.histogram(name, help_text, **labels).time()
+
+    def _get(self, kind, name, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = kind(name, labels=labels, **kwargs)
+                    self._metrics[key] = metric
+        return metric
+
+    def snapshot(self):
+        """대시보드 표시용: 히스토그램은 분위수 요약, 카운터는 값"""
+        rows = []
+        for metric in list(self._metrics.values()):
+            row = {'name': metric.name, 'labels': metric.labels}
+            if isinstance(metric, Histogram):
+                row.update(metric.summary())
+            else:
+                row['value'] = metric.value
+            rows.append(row)
+        return rows
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 형식"""
+        by_name = {}
+        for metric in list(self._metrics.values()):
+            by_name.setdefault(metric.name, []).append(metric)
+        lines = []
+        for name in sorted(by_name):
+            metrics = by_name[name]
+            kind = 'histogram' if isinstance(metrics[0], Histogram) else 'counter'
+            if metrics[0].help_text:
+                lines.append(f"# HELP {name} {metrics[0].help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """node_exporter textfile 수집기용 파일로 원자적 기록"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_textfile_writer(self, path, interval=METRICS_INTERVAL):
+        """interval초마다 파일로 내보내는 백그라운드 스레드 (경로당 한 번만 시작)"""
+        with self._lock:
+            if ('file', path) in self._exporters:
+                return
+            self._exporters.add(('file', path))
+
+        def write_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    print(f"메트릭 파일 기록 실패: {str(e)}")
+
+        threading.Thread(target=write_forever, name="metrics-textfile", daemon=True).start()
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """http://host:port/metrics 로 내보내는 백그라운드 서버 (포트당 한 번만 시작)"""
+        with self._lock:
+            if ('http', port) in self._exporters:
+                return
+            self._exporters.add(('http', port))
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def export_from_config(self):
+        """config의 METRICS_FILE / METRICS_PORT가 설정되어 있으면 내보내기 시작"""
+        if METRICS_FILE:
+            self.start_textfile_writer(METRICS_FILE)
+        if METRICS_PORT:
+            try:
+                self.start_http_server(METRICS_PORT)
+            except OSError as e:
+                print(f"메트릭 서버 시작 실패: {str(e)}")
+
+
+def process_start_time():
+    """프로세스 시작 시각 (epoch 초), /proc를 읽을 수 없으면 이 모듈을 처음 import한 시각"""
+    try:
+        with open('/proc/self/stat') as f:
+            # 프로그램 이름(괄호 안) 뒤 20번째 값이 부팅 후 시작 시각 (clock tick)
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return _IMPORTED_AT
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics():
+    """프로세스 전체에서 공유하는 메트릭 레지스트리"""
+    return _metrics
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from config import MODEL_DIR, MODEL_FILES, MODEL_WATCH_INTERVAL
+from inference_cache import get_inference_cache
+from metrics import get_metrics
+
+
+def _resident_bytes():
+    """현재 프로세스 상주 메모리(RSS) 바이트 (확인할 수 없으면 None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class ModelEntry:
+    """로드된 모델 하나 ({'model', 'scaler'} 딕셔너리와 메타 정보)"""
+
+    def __init__(self, name, path, model_dict, checksum, signature, load_seconds, memory_bytes):
+        self.name = name
+        self.path = path
+        self.model_dict = model_dict
+        self.checksum = checksum
+        self.version = checksum[:12]
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """
+    모델 파일을 프로세스당 한 번만 로드하는 레지스트리
+    - 처음 요청될 때 로드 (lazy)
+    - 파일이 바뀌면 새 모델을 완전히 로드한 뒤 참조만 교체 (교체 중에도 이전 모델로 계속 예측)
+    - 변경 확인은 start_watcher()의 백그라운드 스레드에서 (check_interval을 주면 get()에서도 확인)
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, files=MODEL_FILES, check_interval=None,
+                 watch_interval=MODEL_WATCH_INTERVAL, compile_trees=True):
+        self.model_dir = model_dir
+        self.files = dict(files)
+        self.check_interval = check_interval
+        self.watch_interval = watch_interval
+        self.compile_trees = compile_trees
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.files}
+        self._refresh_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._listeners = []
+        self._watcher = None
+        # 교체된 모델의 캐시된 예측은 더 이상 쓰지 않음
+        self.on_swap(lambda name, entry: get_inference_cache().invalidate())
+
+    def path(self, name):
+        return os.path.join(self.model_dir, self.files[name])
+
+    def get(self, name):
+        """모델 딕셔너리 반환 (처음이면 로드, check_interval이 있으면 그 간격마다 변경 확인)"""
+        if self.check_interval is not None and time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
+        return self.entry(name).model_dict
+
+    def entry(self, name):
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry
+        with self._load_locks[name]:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+                with self._lock:
+                    self._entries[name] = entry
+        return entry
+
+    def prewarm(self, names=None):
+        """백그라운드 스레드에서 모델을 미리 로드하고 스레드 반환 (그동안 다른 준비 작업을 함께 진행)"""
+        def load():
+            for name in names or self.files:
+                try:
+                    self.entry(name)
+                except Exception as e:
+                    # 실패하면 처음 요청될 때 다시 로드하면서 오류가 드러남
+                    print(f"모델 미리 로드 실패 ({name}): {str(e)}")
+
+        thread = threading.Thread(target=load, name="model-registry-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self):
+        """
+        로드된 모델 파일이 바뀌었으면 새로 로드해서 교체, 교체된 모델 이름 목록 반환
+        다른 스레드가 확인 중이면 기다리지 않고 빈 목록 반환 (같은 모델을 두 번 로드하지 않도록)
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return []
+        try:
+            self._last_check = time.monotonic()
+            return self._refresh_locked()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_locked(self):
+        swapped = []
+        for name, current in list(self._entries.items()):
+            try:
+                signature = self._signature(self.path(name))
+            except FileNotFoundError:
+                continue
+            if signature == current.signature:
+                continue
+            with self._load_locks[name]:
+                try:
+                    entry = self._load(name)
+                except Exception as e:
+                    # 쓰는 중인 파일이면 다음 확인 때 다시 시도, 그동안 이전 모델 유지
+                    print(f"모델 교체 실패 ({name}): {str(e)}")
+                    continue
+                if entry.checksum == current.checksum:
+                    current.signature = entry.signature
+                    continue
+                with self._lock:
+                    self._entries[name] = entry
+            swapped.append(name)
+            print(f"모델 교체 완료 - {name}: {current.version} → {entry.version}")
+            for listener in self._listeners:
+                listener(name, entry)
+        return swapped
+
+    def on_swap(self, listener):
+        """모델이 교체될 때 listener(name, entry) 호출"""
+        self._listeners.append(listener)
+
+    def start_watcher(self, interval=None):
+        """
+        백그라운드 스레드에서 interval(기본 watch_interval)초마다 변경 확인 (한 번만 시작)
+        새 모델의 언피클/트리 변환이 예측 루프나 대시보드 시계를 멈추지 않도록 get()에서는 더 이상 확인하지 않음
+        """
+        interval = interval or self.watch_interval
+        with self._lock:
+            if self._watcher is not None or not interval:
+                return
+            self.check_interval = None
+
+            def watch():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        print(f"모델 변경 확인 오류: {str(e)}")
+
+            self._watcher = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+            self._watcher.start()
+
+    def stats(self):
+        """모델별 버전, 로드 시간, 메모리 사용량"""
+        return {
+            name: {
+                'path': entry.path,
+                'version': entry.version,
+                'load_seconds': entry.load_seconds,
+                'memory_bytes': entry.memory_bytes,
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def report(self):
+        for name, info in self.stats().items():
+            memory = info['memory_bytes']
+            memory_text = f"{memory / 1024 / 1024:.1f}MB" if memory is not None else "알 수 없음"
+            print(f"모델 {name} - 버전: {info['version']}, 로드 시간: {info['load_seconds'] * 1000:.0f}ms, "
+                  f"메모리: {memory_text}")
+
+    def _load(self, name):
+        path = self.path(name)
+        signature = self._signature(path)
+        started = time.perf_counter()
+        rss_before = _resident_bytes()
+        with open(path, 'rb') as f:
+            raw = f.read()
+        model_dict = pickle.loads(raw)
+        if self.compile_trees:
+            self._attach_compiled(name, model_dict)
+        rss_after = _resident_bytes()
+        load_seconds = time.perf_counter() - started
+        get_metrics().histogram('model_load_seconds', '모델 로드 시간', model=name).observe(load_seconds)
+        memory_bytes = rss_after - rss_before if rss_before is not None else None
+        checksum = hashlib.sha256(raw).hexdigest()
+        # 추론 캐시 키에 쓰는 모델 버전
+        model_dict['version'] = checksum[:12]
+        return ModelEntry(name, path, model_dict, checksum, signature, load_seconds, memory_bytes)
+
+    @staticmethod
+    def _attach_compiled(name, model_dict):
+        """NumPy 트리 모델로 변환해서 model_dict['compiled']에 추가 (변환할 수 없으면 원본 모델 사용)"""
+        from tree_compiler import compile_model_dict, sample_inputs, verify
+        try:
+            compiled = compile_model_dict(model_dict)
+            # 원본 모델과 예측이 같을 때만 사용
+            verify(model_dict, compiled, sample_inputs(compiled, rows=256))
+            model_dict['compiled'] = compiled
+        except Exception as e:
+            print(f"트리 변환 생략 ({name}): {str(e)}")
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """프로세스 전체에서 공유하는 모델 레지스트리"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly import ANOMALY_COLUMNS, AnomalyDetector, RecentRepairer
+from clock import VirtualClock
+from config import ANOMALY_REPAIR
+from model_registry import get_registry
+from predict import STATE_COLUMNS, feature_plan, model_features, rollout, site_feature_rollout
+from prediction_log import PredictionLogWriter
+from sensor_store import CsvTable
+
+# 이 시간보다 오래된 센서 값밖에 없는 온실은 해당 틱에서 제외
+STATE_STALENESS = pd.Timedelta(minutes=5)
+
+
+class Site:
+    """온실(구역) 하나의 센서 입력과 예측 로그"""
+
+    def __init__(self, site_id, sensor_csv, predictions_csv):
+        self.site_id = site_id
+        self.sensor = CsvTable(sensor_csv, '저장시간')
+        self.writer = PredictionLogWriter(predictions_csv, fsync='interval')
+        # 특성 모델용 이력 보정기 (온실별 감지 상태)
+        self.repairer = RecentRepairer(site_id=site_id)
+        # 로그에 기록한 마지막 예측시간 (예측 구간이 겹치는 다음 틱에서 같은 시간을 다시 쓰지 않도록)
+        self.last_logged = None
+
+    def reset(self):
+        self.writer.reset()
+        self.last_logged = None
+
+    def log(self, times, values):
+        """예측 구간 중 아직 기록하지 않은 시간만 추가 (틱마다 구간 끝의 새 1분만 늘어남)"""
+        for next_time, (next_temp, next_humid) in zip(times, values):
+            if self.last_logged is not None and next_time <= self.last_logged:
+                continue
+            self.writer.append(next_time, round(float(next_temp), 1), round(float(next_humid), 1))
+            self.last_logged = next_time
+
+
+def load_site_registry(path):
+    """
+    온실 목록(JSON) 읽기
+    [{"site_id": "gh-01", "sensor_csv": "...", "predictions_csv": "..."}, ...]
+    predictions_csv가 없으면 센서 CSV와 같은 디렉토리의 predictions_<site_id>.csv (온실끼리 겹치지 않도록)
+    """
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    sites = []
+    for entry in entries:
+        sensor_csv = entry['sensor_csv']
+        predictions_csv = entry.get('predictions_csv') or os.path.join(
+            os.path.dirname(sensor_csv), f"predictions_{entry['site_id']}.csv")
+        sites.append(Site(entry['site_id'], sensor_csv, predictions_csv))
+    return sites
+
+
+def collect_states(sites, clock, detector=None):
+    """
+    모든 온실의 clock 시점 최신 상태를 (n, 2) 행렬로 모음
+    detector가 있으면 온실별 최신 행을 한 번에 검사해서 이상값을 보정한 상태를 사용
+    """
+    columns = ANOMALY_COLUMNS if detector is not None else STATE_COLUMNS
+    rows = np.empty((len(sites), len(columns)))
+    minutes = np.empty(len(sites), dtype=np.int64)
+    active = []
+    for site in sites:
+        row = site.sensor.asof(clock, tolerance=STATE_STALENESS)
+        if row is None:
+            continue
+        rows[len(active)] = row[columns].to_numpy(dtype=float)
+        minutes[len(active)] = pd.Timestamp(row['저장시간']).value // 60_000_000_000
+        active.append(site)
+    rows = rows[:len(active)]
+    if detector is not None and active:
+        rows = detector.process([site.site_id for site in active], minutes[:len(active)], rows)[0]
+        rows = rows[:, [columns.index(column) for column in STATE_COLUMNS]]
+    return active, rows
+
+
+def collect_histories(sites, clock, feature_set, repair=False):
+    """
+    특성 모델용: 온실별 clock 시점까지의 최근 feature_set.history행 배열 목록 (feature_set.columns 순서)
+    repair면 온실별 보정기로 센서 이상값을 보정한 값을 사용
+    """
+    clock = pd.Timestamp(clock)
+    active, histories = [], []
+    for site in sites:
+        frame = site.sensor.window(None, clock)
+        if frame is None or frame.empty or clock - frame['저장시간'].iloc[-1] > STATE_STALENESS:
+            continue
+        if repair:
+            values = site.repairer.repair(frame, feature_set.columns, feature_set.history)
+        else:
+            values = frame[feature_set.columns].iloc[-feature_set.history:].to_numpy(dtype=float)
+        histories.append(values)
+        active.append(site)
+    return active, histories
+
+
+def predict_sites(temp_model_dict, humid_model_dict, sites, clock, horizon=1, detector=None):
+    """
+    한 틱 처리: 전체 온실 상태를 한 번에 스케일링/예측하고 온실별 로그에 나눠 기록
+    특성 모델이면 온실별 이력으로 특성 엔진을 만들어 같은 배치로 예측
+    반환: 예측에 포함된 온실 수
+    """
+    # 스텝마다 타깃별 scaler 변환 + model.predict 한 번씩 (온실 수와 무관)
+    if model_features(temp_model_dict) or model_features(humid_model_dict):
+        feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+        active, histories = collect_histories(sites, clock, feature_set, repair=detector is not None)
+        if not active:
+            return 0
+        forecast = site_feature_rollout(temp_model_dict, humid_model_dict, histories, horizon)
+    else:
+        active, states = collect_states(sites, clock, detector)
+        if not active:
+            return 0
+        forecast = rollout(temp_model_dict, humid_model_dict, states, horizon)
+    times = [clock + pd.Timedelta(minutes=step + 1) for step in range(horizon)]
+    for site, values in zip(active, forecast):
+        site.log(times, values)
+    return len(active)
+
+
+def run_multi_site_service(registry_path, start_time, end_time, horizon=1, tick_seconds=0.0):
+    """여러 온실 예측 서비스 실행 (모델은 프로세스에 한 벌만 로드)"""
+    print("다중 온실 예측 서비스를 시작합니다...")
+    sites = load_site_registry(registry_path)
+    print(f"등록된 온실: {len(sites)}개")
+
+    models = get_registry()
+    try:
+        models.entry('temperature')
+        models.entry('humidity')
+        print("모델 로드 완료")
+        models.report()
+    except Exception as e:
+        print(f"모델 로드 실패: {str(e)}")
+        return
+    # 새 모델은 백그라운드에서 로드해 두고 틱에서는 교체된 참조만 가져옴
+    models.start_watcher()
+
+    for site in sites:
+        site.reset()
+    # 온실별 센서 이상 감지 상태 (온실 × 컬럼당 상수 크기)
+    detector = AnomalyDetector() if ANOMALY_REPAIR else None
+
+    total_predictions = 0
+    started = time.perf_counter()
+    # tick_seconds가 0이면 기다리지 않고 과거 구간을 최대 속도로 재생
+    for clock in VirtualClock(start_time, tick_seconds=tick_seconds).ticks(end_time):
+        tick_started = time.perf_counter()
+        try:
+            # 틱마다 레지스트리에서 가져오므로 새 모델이 교체되면 다음 틱부터 반영
+            temp_model_dict = models.get('temperature')
+            humid_model_dict = models.get('humidity')
+            count = predict_sites(temp_model_dict, humid_model_dict, sites, clock, horizon, detector)
+            total_predictions += count
+            elapsed = time.perf_counter() - tick_started
+            print(f"예측 완료 - 시간: {clock}, 온실: {count}개, 소요: {elapsed * 1000:.1f}ms")
+        except Exception as e:
+            print(f"에러 발생: {str(e)}")
+
+    for site in sites:
+        site.writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"\n예측 완료 - 총 {total_predictions}건, 처리량: {total_predictions / max(elapsed, 1e-9):.0f}건/초")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 온실을 한 프로세스에서 일괄 예측")
+    parser.add_argument("registry", help="온실 목록 JSON 파일")
+    parser.add_argument("--start", default="2018-05-10 10:00:00")
+    parser.add_argument("--end", default="2018-05-10 10:05:00")
+    parser.add_argument("--horizon", type=int, default=1, help="틱마다 예측할 분 수")
+    parser.add_argument("--tick-seconds", type=float, default=0.0, help="틱 사이 대기 시간(초)")
+    args = parser.parse_args()
+    run_multi_site_service(args.registry, args.start, args.end, args.horizon, args.tick_seconds)
@@ -1,24 +1,27 @@
-import pickle
-import os
+from config import MODEL_DIR
+from model_registry import ModelRegistry, get_registry
 
-def load_lgb_models(directory):
+def load_lgb_models(directory=None):
     """
     디렉토리에서 LightGBM 모델 파일들을 읽어오는 함수
+    (directory를 주지 않으면 프로세스 공용 레지스트리를 사용해 이미 로드된 모델을 재사용)
     """
     models = {}
     try:
+        if directory is None or directory == MODEL_DIR:
+            registry = get_registry()
+        else:
+            registry = ModelRegistry(directory)
+
         # 온도 모델 로드
-        temp_path = os.path.join(directory, 'lgb_temp_model_1min.pkl')
-        with open(temp_path, 'rb') as f:
-            models['temperature'] = pickle.load(f)
-            print("온도 모델 로드 완료")
+        models['temperature'] = registry.get('temperature')
+        print("온도 모델 로드 완료")
             
         # 습도 모델 로드
-        humid_path = os.path.join(directory, 'lgb_humid_model_1min.pkl')
-        with open(humid_path, 'rb') as f:
-            models['humidity'] = pickle.load(f)
-            print("습도 모델 로드 완료")
-            
+        models['humidity'] = registry.get('humidity')
+        print("습도 모델 로드 완료")
+        
+        registry.report()
         return models
     except Exception as e:
         print(f"모델 로드 중 오류 발생: {str(e)}")
@@ -44,8 +47,7 @@ def analyze_lgb_model(model, model_name):
 
 # 메인 실행 코드
 if __name__ == "__main__":
-    directory = "/Users/choejihye/pkl"
-    models = load_lgb_models(directory)
+    models = load_lgb_models(MODEL_DIR)
     
     if models:
         for model_name, model in models.items():
@@ -1,34 +1,219 @@
 import pandas as pd
-import pickle
-import time
 from datetime import datetime, timedelta
 import numpy as np
 import os
+import time
+from anomaly import repair_recent
+from config import ANOMALY_REPAIR, METRICS_FILE, SENSOR_ARCHIVE_DIR
+from features import FeatureEngine, FeatureSet
+from hot_store import HotPredictionWriter, default_archive, get_hot_store
+from inference_cache import get_inference_cache
+from metrics import get_metrics, process_start_time
+from model_registry import get_registry
+from prediction_log import PredictionLogWriter
+from sensor_archive import SensorArchive
+from sensor_schema import read_csv
+from tree_compiler import scaler_affine
+
+# 예측 로그 (프로세스당 하나, 첫 저장 시 생성)
+_prediction_writer = None
+
+def get_prediction_writer():
+    """예측 로그 반환 (HOT_STORE_PATH가 있으면 SQLite 저장소, 없으면 predictions.csv에 한 줄씩 추가)"""
+    global _prediction_writer
+    if _prediction_writer is None:
+        hot_store = get_hot_store()
+        if hot_store is not None:
+            _prediction_writer = HotPredictionWriter(hot_store)
+        else:
+            _prediction_writer = PredictionLogWriter("predictions.csv", fsync='interval')
+    return _prediction_writer
 
 def prepare_data_from_time(data, start_time):
-    """특정 시간까지의 데이터만 사용"""
-    data['저장시간'] = pd.to_datetime(data['저장시간'])
-    return data[data['저장시간'] <= start_time].copy()
+    """특정 시간까지의 데이터만 사용 (data는 sensor_schema 타입 데이터프레임 또는 SensorArchive)"""
+    if isinstance(data, SensorArchive):
+        # 아카이브는 start_time 이전 파티션/행 그룹만 읽는다
+        return data.read_range(None, start_time)
+    if data['저장시간'].is_monotonic_increasing:
+        # 시간순이면 복사 없이 앞부분만 사용
+        return data.iloc[:data['저장시간'].searchsorted(start_time, side='right')]
+    return data[data['저장시간'] <= start_time]
+
+# 상태 벡터 컬럼 순서
+STATE_COLUMNS = ['내부온도', '내부습도']
+
+# 예측 경로 시간 측정 (호출마다 찾지 않도록 미리 생성)
+_COMPILED_PREDICT_TIMER = get_metrics().histogram('model_predict_seconds', '모델 예측 시간', path='compiled')
+_MODEL_PREDICT_TIMER = get_metrics().histogram('model_predict_seconds', '모델 예측 시간', path='model')
+_SCALER_TIMER = get_metrics().histogram('scaler_transform_seconds', '스케일러 변환 시간')
+
+def _predict_batch(model_dict, X, affine=None):
+    """(n, 입력 수) 배열 전체에 대해 스케일러 + 모델 예측을 한 번에 수행 (추론 캐시에 있는 행은 재사용)"""
+    return get_inference_cache().predict(model_dict, X, lambda rows: _infer(model_dict, rows, affine))
+
+def _infer(model_dict, X, affine=None):
+    """스케일러 + 모델 예측 (캐시 없이)"""
+    compiled = model_dict.get('compiled')
+    if compiled is not None:
+        # 스케일러가 반영된 NumPy 트리 모델은 원본 입력을 그대로 사용
+        with _COMPILED_PREDICT_TIMER.time():
+            return compiled.predict(X)
+    with _SCALER_TIMER.time():
+        if affine is not None:
+            X_scaled = X * affine[0] + affine[1]
+        else:
+            scaler = model_dict['scaler']
+            columns = getattr(scaler, 'feature_names_in_', STATE_COLUMNS)
+            X_scaled = scaler.transform(pd.DataFrame(X, columns=columns))
+    with _MODEL_PREDICT_TIMER.time():
+        return np.asarray(model_dict['model'].predict(X_scaled), dtype=float)
+
+def rollout(temp_model_dict, humid_model_dict, states, steps, clamp=None, round_state=True):
+    """
+    여러 시점 재귀 예측을 NumPy 배열로 수행
+    states: (n, 2) [내부온도, 내부습도] 초기 상태 → 반환: (n, steps, 2) 예측값
+    clamp: (온도, 습도) 한 스텝 최대 변화량, round_state: 다음 입력을 소수 첫째 자리로 반올림
+    """
+    current = np.array(states, dtype=float).reshape(-1, 2)
+    out = np.empty((current.shape[0], steps, 2))
+    temp_affine = scaler_affine(temp_model_dict['scaler'])
+    humid_affine = scaler_affine(humid_model_dict['scaler'])
+    limits = None if clamp is None else np.asarray(clamp, dtype=float)
+
+    for step in range(steps):
+        predicted = out[:, step]
+        predicted[:, 0] = _predict_batch(temp_model_dict, current, temp_affine)
+        predicted[:, 1] = _predict_batch(humid_model_dict, current, humid_affine)
+        if limits is not None:
+            # 변화량을 제한 (최대 ±clamp)
+            np.clip(predicted - current, -limits, limits, out=predicted)
+            predicted += current
+        if round_state:
+            np.round(predicted, 1, out=current)
+        else:
+            current[:] = predicted
+    return out
+
+def model_features(model_dict):
+    """
+    모델이 사용하는 특성 이름 목록 (현재 상태 2개만 쓰는 기존 모델은 None)
+    모델 피클의 'features' 항목, 없으면 스케일러의 feature_names_in_을 사용
+    """
+    names = model_dict.get('features')
+    if names is None:
+        names = getattr(model_dict.get('scaler'), 'feature_names_in_', None)
+    if names is None or list(names) == STATE_COLUMNS:
+        return None
+    return list(names)
+
+def feature_plan(temp_model_dict, humid_model_dict):
+    """두 모델 특성의 합집합과 모델별 특성 위치: (feature_set, temp_index, humid_index)"""
+    temp_names = model_features(temp_model_dict) or STATE_COLUMNS
+    humid_names = model_features(humid_model_dict) or STATE_COLUMNS
+    # 예측값을 다시 넣을 상태 컬럼은 항상 포함
+    feature_set = FeatureSet(temp_names).union(FeatureSet(humid_names)).union(FeatureSet(STATE_COLUMNS))
+    return feature_set, feature_set.indices(temp_names), feature_set.indices(humid_names)
+
+def feature_rollout(temp_model_dict, humid_model_dict, history, positions, steps, clamp=None, round_state=True):
+    """
+    특성 모델용 재귀 예측: 각 시점까지의 이력으로 특성 엔진을 만들고 예측값을 한 행씩 넣으며 진행
+    history: (T, 컬럼 수) 배열 (feature_plan의 feature_set.columns 순서), positions: 예측 시작 행 위치들
+    외부 센서 컬럼(외부온도, 풍속 등)은 미래 값을 모르므로 마지막 값이 유지된다고 본다
+    반환: (len(positions), steps, 2) 예측값
+    """
+    feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+    engine = FeatureEngine.from_history(history, positions, feature_set)
+    return _engine_rollout(temp_model_dict, humid_model_dict, engine, steps, clamp, round_state)
+
+
+def site_feature_rollout(temp_model_dict, humid_model_dict, histories, steps, clamp=None, round_state=True):
+    """
+    여러 온실용 특성 모델 재귀 예측: 온실별 이력 배열 목록으로 각자 엔진을 만들어 한 배치로 진행
+    histories: 온실별 (T, 컬럼 수) 배열 목록, 반환: (len(histories), steps, 2) 예측값
+    """
+    feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+    engine = FeatureEngine.stack([
+        FeatureEngine.from_history(history, [len(history) - 1], feature_set) for history in histories
+    ])
+    return _engine_rollout(temp_model_dict, humid_model_dict, engine, steps, clamp, round_state)
+
+
+def _engine_rollout(temp_model_dict, humid_model_dict, engine, steps, clamp=None, round_state=True):
+    """특성 엔진의 현재 상태에서 예측값을 한 행씩 넣으며 steps 단계 진행"""
+    feature_set, temp_index, humid_index = feature_plan(temp_model_dict, humid_model_dict)
+    state_index = [feature_set.columns.index(column) for column in STATE_COLUMNS]
+    temp_affine = scaler_affine(temp_model_dict['scaler'])
+    humid_affine = scaler_affine(humid_model_dict['scaler'])
+    limits = None if clamp is None else np.asarray(clamp, dtype=float)
+
+    row = engine.last.copy()
+    current = row[:, state_index]
+    out = np.empty((len(row), steps, 2))
+    for step in range(steps):
+        X = engine.values()
+        predicted = out[:, step]
+        predicted[:, 0] = _predict_batch(temp_model_dict, X[:, temp_index], temp_affine)
+        predicted[:, 1] = _predict_batch(humid_model_dict, X[:, humid_index], humid_affine)
+        if limits is not None:
+            np.clip(predicted - current, -limits, limits, out=predicted)
+            predicted += current
+        current = np.round(predicted, 1) if round_state else predicted.copy()
+        row[:, state_index] = current
+        engine.update(row)
+    return out
+
+def rollout_data(temp_model_dict, humid_model_dict, data, steps, clamp=None, round_state=True):
+    """
+    모델 종류에 맞는 재귀 예측 (특성 모델이면 이력 전체, 아니면 마지막 상태만 사용)
+    ANOMALY_REPAIR이면 모델에 넣을 행의 센서 이상값을 먼저 보정
+    """
+    use_features = bool(model_features(temp_model_dict) or model_features(humid_model_dict))
+    if use_features:
+        feature_set = feature_plan(temp_model_dict, humid_model_dict)[0]
+        columns, rows = feature_set.columns, feature_set.history
+    else:
+        columns, rows = STATE_COLUMNS, 1
+    if ANOMALY_REPAIR:
+        values = repair_recent(data, columns, rows)
+    else:
+        values = data[columns].iloc[-rows:].to_numpy(dtype=float)
+    if use_features:
+        return feature_rollout(temp_model_dict, humid_model_dict, values, [len(values) - 1],
+                               steps, clamp, round_state)
+    return rollout(temp_model_dict, humid_model_dict, values[-1], steps, clamp, round_state)
+
+def _fallback_rollout(states, steps):
+    """모델 예측 실패 시 마지막 값 주변의 작은 변동으로 대체"""
+    states = np.asarray(states, dtype=float).reshape(-1, 1, 2)
+    noise = np.random.uniform(-1.0, 1.0, (states.shape[0], steps, 2)) * np.array([0.2, 0.3])
+    return states + np.cumsum(noise, axis=1)
+
+def predict_horizon(temp_model_dict, humid_model_dict, data, steps, start_time=None, clamp=None):
+    """
+    마지막 시점부터 steps분 뒤까지 전체 예측 구간을 한 번에 계산
+    반환: 예측시간/예측온도/예측습도 데이터프레임
+    """
+    state = data[STATE_COLUMNS].iloc[-1].to_numpy(dtype=float)
+    if start_time is None:
+        start_time = pd.Timestamp(data['저장시간'].iloc[-1])
+    try:
+        values = rollout_data(temp_model_dict, humid_model_dict, data, steps, clamp=clamp)[0]
+    except Exception as e:
+        print(f"예측 중 오류 발생: {str(e)}")
+        values = _fallback_rollout(state, steps)[0]
+    return pd.DataFrame({
+        '예측시간': pd.date_range(start_time + timedelta(minutes=1), periods=steps, freq='min'),
+        '예측온도': values[:, 0],
+        '예측습도': values[:, 1],
+    })
 
 def predict_next_values(temp_model_dict, humid_model_dict, data):
     """다음 시점 예측"""
     try:
-        # 입력 데이터 준비
-        X = data[['내부온도', '내부습도']].iloc[-1:]
-        
-        # 스케일러 적용
-        X_scaled_temp = temp_model_dict['scaler'].transform(X)
-        X_scaled_humid = humid_model_dict['scaler'].transform(X)
-        
-        # 예측
-        next_temp = temp_model_dict['model'].predict(X_scaled_temp)[0]
-        next_humid = humid_model_dict['model'].predict(X_scaled_humid)[0]
-        
-        # 예측값이 너무 급격하게 변하지 않도록 제한
-        last_temp = float(data['내부온도'].iloc[-1])
-        last_humid = float(data['내부습도'].iloc[-1])
-        
-        # 변화량을 제한 (최대 ±0.5도, ±1% 변화) 제거
+        # 스케일러 적용 및 예측 (특성 모델이면 최근 이력으로 특성 계산)
+        next_temp, next_humid = rollout_data(
+            temp_model_dict, humid_model_dict, data, 1, round_state=False
+        )[0, 0]
         
         return float(next_temp), float(next_humid)
         
@@ -43,87 +228,82 @@ def predict_next_values(temp_model_dict, humid_model_dict, data):
 
 def save_prediction(next_time, next_temp, next_humid, mode='a'):
     """예측 데이터 저장 (누적)"""
-    new_prediction = pd.DataFrame({
-        '예측시간': [next_time],
-        '예측온도': [round(next_temp, 1)],
-        '예측습도': [round(next_humid, 1)]
-    })
-
-    if mode == 'w' or not os.path.exists("predictions.csv"):
-        # 파일이 없거나 초기화 모드일 때는 새로 생성
-        new_prediction.to_csv("predictions.csv", index=False)
-    else:
-        # 기존 파일이 있을 때는 누적
-        predictions = pd.read_csv("predictions.csv")
-        updated_predictions = pd.concat([predictions, new_prediction], ignore_index=True)
-        updated_predictions.to_csv("predictions.csv", index=False)
+    writer = get_prediction_writer()
+    if mode == 'w':
+        # 초기화 모드일 때는 헤더만 남기고 새로 시작
+        writer.reset()
+    # 기존 파일을 다시 읽지 않고 끝에 한 줄만 추가
+    writer.append(next_time, round(next_temp, 1), round(next_humid, 1))
     
     print(f"예측 완료 - 시간: {next_time}, 온도: {round(next_temp, 1)}°C, 습도: {round(next_humid, 1)}%")
 
-def run_prediction_service():
-    """예측 서비스 실행"""
+def read_predictions():
+    """저장된 예측 전체 (저장소 또는 predictions.csv)"""
+    hot_store = get_hot_store()
+    if hot_store is not None:
+        return hot_store.read('predictions')
+    return read_csv("predictions.csv")
+
+def record_first_prediction():
+    """프로세스 시작부터 첫 예측 저장까지 걸린 시간 기록 (재시작 후 첫 예측 지연)"""
+    seconds = time.time() - process_start_time()
+    get_metrics().histogram('prediction_time_to_first_seconds', '프로세스 시작부터 첫 예측 저장까지 시간').observe(seconds)
+    print(f"첫 예측까지 {seconds:.2f}초")
+
+def run_prediction_service(horizon=5):
+    """예측 서비스 실행 (horizon: 예측할 분 수, 예: 5/30/60)"""
     print("예측 서비스를 시작합니다...")
     
-    # 모델 파일 경로
-    temp_model_path = "/Users/choejihye/pkl/lgb_temp_model_1min.pkl"
-    humid_model_path = "/Users/choejihye/pkl/lgb_humid_model_1min.pkl"
-    
     # 시작 시간 설정
     start_time = pd.Timestamp('2018-05-10 10:00:00')
     print(f"예측 시작 시간: {start_time}")
     
-    # 모델 로드
+    # 모델은 백그라운드에서 로드하고 그동안 입력 데이터를 읽음 (경로는 config.MODEL_DIR, 프로세스당 한 번만 로드)
+    registry = get_registry()
+    registry.prewarm()
+    # 실행 중 배포된 새 모델은 백그라운드에서 로드해서 교체 (예측 경로에서는 로드하지 않음)
+    registry.start_watcher()
+    
+    # 초기 데이터 읽기
+    with get_metrics().timed('sensor_load_seconds', '예측 입력 데이터 로드 시간'):
+        if get_hot_store() is not None:
+            data = get_hot_store().table('sensor', default_archive()).window(None, start_time)
+        elif SENSOR_ARCHIVE_DIR:
+            data = SensorArchive(SENSOR_ARCHIVE_DIR)
+        else:
+            data = read_csv("sensor_data.csv")
+        data = prepare_data_from_time(data, start_time)
+    
     try:
-        with open(temp_model_path, 'rb') as f:
-            temp_model_dict = pickle.load(f)
-        with open(humid_model_path, 'rb') as f:
-            humid_model_dict = pickle.load(f)
+        temp_model_dict = registry.get('temperature')
+        humid_model_dict = registry.get('humidity')
         print("모델 로드 완료")
+        registry.report()
     except Exception as e:
         print(f"모델 로드 실패: {str(e)}")
         return
     
-    # 초기 데이터 읽기
-    data = pd.read_csv("sensor_data.csv")
-    data = prepare_data_from_time(data, start_time)
-    current_time = start_time
-    
-    # predictions.csv 초기화
-    if os.path.exists("predictions.csv"):
-        os.remove("predictions.csv")
+    # 예측 초기화 (predictions.csv는 삭제하지 않고 헤더만 있는 파일로 원자적 교체)
+    get_prediction_writer().reset()
     
-    while current_time < pd.Timestamp('2018-05-10 10:05:00'):
-        try:
-            # 예측
-            next_temp, next_humid = predict_next_values(temp_model_dict, humid_model_dict, data)
-            next_time = current_time + timedelta(minutes=1)
-            
-            # 예측 결과 저장 (누적)
+    try:
+        # 전체 예측 구간을 한 번에 계산한 뒤 누적 저장
+        forecast = predict_horizon(temp_model_dict, humid_model_dict, data, horizon, start_time)
+        for next_time, next_temp, next_humid in forecast.itertuples(index=False):
             save_prediction(next_time, next_temp, next_humid)
-            
-            # 예측 결과를 데이터에 추가
-            new_row = pd.DataFrame({
-                '저장시간': [next_time],
-                '내부온도': [round(next_temp, 1)],
-                '내부습도': [round(next_humid, 1)]
-            })
-            data = pd.concat([data, new_row], ignore_index=True)
-            
-            # 시간 업데이트
-            current_time = next_time
-            
-            # 1초 대기
-            time.sleep(60)
-            
-        except Exception as e:
-            print(f"에러 발생: {str(e)}")
-            time.sleep(60)
+        record_first_prediction()
+    except Exception as e:
+        print(f"에러 발생: {str(e)}")
     
     # 최종 결과 출력
+    get_prediction_writer().close()
+    if METRICS_FILE:
+        get_metrics().write_textfile(METRICS_FILE)
     print("\n예측 완료")
-    predictions = pd.read_csv("predictions.csv")
+    predictions = read_predictions()
     print("\n최종 예측 결과:")
-    print(predictions)
+    # 예측값은 0.1 단위로 저장됨 (float32 값을 그대로 출력하면 59.299999처럼 보임)
+    print(predictions.to_string(float_format='{:.1f}'.format))
 
 if __name__ == "__main__":
     run_prediction_service()
\ No newline at end of file
@@ -0,0 +1,16 @@
+from append_log import AppendLogReader, AppendLogWriter
+from sensor_schema import PREDICTION_COLUMNS
+
+
+class PredictionLogWriter(AppendLogWriter):
+    """예측 로그 (예측 컬럼을 기본으로 쓰는 AppendLogWriter)"""
+
+    def __init__(self, path="predictions.csv", columns=PREDICTION_COLUMNS, **options):
+        super().__init__(path, columns, **options)
+
+
+class PredictionLogReader(AppendLogReader):
+    """예측 로그를 따라 읽는 AppendLogReader"""
+
+    def __init__(self, path="predictions.csv", time_column='예측시간'):
+        super().__init__(path, time_column)
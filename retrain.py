@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import load_history
+from config import (MODEL_DIR, MODEL_FILES, RETRAIN_HOLDOUT_HOURS, RETRAIN_MIN_ROWS, RETRAIN_NICE,
+                    RETRAIN_ROUNDS)
+from features import FeatureSet, compute_features
+from predict import STATE_COLUMNS, model_features
+
+# 모델별 예측 대상 (다음 1분 값)
+TARGETS = {'temperature': '내부온도', 'humidity': '내부습도'}
+STATE_FILE = 'retrain_state.json'
+# 레지스트리가 로드하면서 붙이는 항목 (피클에는 저장하지 않음)
+_RUNTIME_KEYS = ('compiled', 'version')
+
+
+def load_state(model_dir=MODEL_DIR):
+    """모델별 마지막 학습 시점 등 재학습 상태 (없으면 빈 딕셔너리)"""
+    try:
+        with open(os.path.join(model_dir, STATE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state, model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_model_dict(name, model_dir=MODEL_DIR):
+    """현재 배포된 모델 딕셔너리 (없으면 None)"""
+    try:
+        with open(os.path.join(model_dir, MODEL_FILES[name]), 'rb') as f:
+            model_dict = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    return {key: value for key, value in model_dict.items() if key not in _RUNTIME_KEYS}
+
+
+def publish(name, model_dict, model_dir=MODEL_DIR):
+    """
+    새 모델 피클을 임시 파일에 쓴 뒤 이름을 바꿔 교체 (이전 파일은 .prev로 남김)
+    서빙 중인 프로세스는 레지스트리가 파일 변경을 감지해서 새 모델을 다 로드한 뒤 교체한다
+    """
+    path = os.path.join(model_dir, MODEL_FILES[name])
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model_dict, f)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        # 하드 링크로 백업해서 교체 중에도 모델 파일이 없는 순간이 없도록 함
+        if os.path.exists(path + '.prev'):
+            os.remove(path + '.prev')
+        os.link(path, path + '.prev')
+    os.replace(tmp_path, path)
+
+
+def build_windows(minutes, values, columns, names, target, since=None):
+    """
+    학습 창: 각 시점의 입력 특성(names)과 1분 뒤 target 값 쌍
+    minutes/values: load_history 결과 (values 컬럼은 columns 순서), since 이후 시점만 사용 (앞쪽은 특성 이력)
+    반환: (X, y, 시점 분)
+    """
+    frame = pd.DataFrame(values, columns=columns)
+    features = compute_features(frame, FeatureSet(names)).to_numpy()
+    target_values = values[:, columns.index(target)]
+    pairs = np.flatnonzero(np.diff(minutes) == 1)
+    if since is not None:
+        pairs = pairs[minutes[pairs] > since]
+    return features[pairs], target_values[pairs + 1], minutes[pairs]
+
+
+def _init_worker():
+    # 학습이 서빙 프로세스의 CPU를 빼앗지 않도록 우선순위를 낮춤
+    if RETRAIN_NICE and hasattr(os, 'nice'):
+        os.nice(RETRAIN_NICE)
+
+
+def _scale(scaler, X, names):
+    if getattr(scaler, 'feature_names_in_', None) is not None:
+        return scaler.transform(pd.DataFrame(X, columns=names))
+    return scaler.transform(X)
+
+
+def _mae(model_dict, X, y, names):
+    predicted = model_dict['model'].predict(_scale(model_dict['scaler'], X, names))
+    return float(np.mean(np.abs(np.asarray(predicted, dtype=float) - y)))
+
+
+def _fit(name, current, names, X_train, y_train, X_holdout, y_holdout, rounds, n_jobs, full):
+    """
+    워커 프로세스에서 한 모델 학습 + 검증
+    기존 LightGBM 모델이 있으면 기존 스케일러를 그대로 쓰고 새 데이터로 트리 rounds개를 이어서 학습 (warm start)
+    """
+    import lightgbm as lgb
+    from sklearn.preprocessing import StandardScaler
+
+    started = time.perf_counter()
+    model = current.get('model') if current else None
+    warm = (not full and current is not None and current.get('scaler') is not None
+            and isinstance(model, lgb.LGBMModel) and getattr(model, 'fitted_', False))
+    params = model.get_params() if isinstance(model, lgb.LGBMModel) else {'verbose': -1}
+    params['n_jobs'] = n_jobs
+    if warm:
+        scaler = current['scaler']
+        params['n_estimators'] = rounds
+        candidate = lgb.LGBMRegressor(**params)
+        candidate.fit(_scale(scaler, X_train, names), y_train, init_model=model.booster_)
+    else:
+        if isinstance(model, lgb.LGBMModel) and getattr(model, 'fitted_', False):
+            # 처음부터 다시 학습할 때는 현재 모델과 같은 트리 수로
+            params['n_estimators'] = model.booster_.num_trees()
+        scaler = StandardScaler().fit(pd.DataFrame(X_train, columns=names))
+        candidate = lgb.LGBMRegressor(**params)
+        candidate.fit(scaler.transform(pd.DataFrame(X_train, columns=names)), y_train)
+
+    model_dict = {'model': candidate, 'scaler': scaler}
+    if names != STATE_COLUMNS:
+        model_dict['features'] = list(names)
+    result = {
+        'name': name,
+        'model_dict': model_dict,
+        'warm_start': warm,
+        'train_rows': len(y_train),
+        'holdout_rows': len(y_holdout),
+        'trees': candidate.booster_.num_trees(),
+        'new_mae': _mae(model_dict, X_holdout, y_holdout, names),
+        'current_mae': _mae(current, X_holdout, y_holdout, names) if current else None,
+        'fit_seconds': time.perf_counter() - started,
+    }
+    return result
+
+
+def run_retrain(source=None, model_dir=MODEL_DIR, holdout_hours=RETRAIN_HOLDOUT_HOURS,
+                rounds=RETRAIN_ROUNDS, min_rows=RETRAIN_MIN_ROWS, tolerance=0.0, full=False,
+                dry_run=False, workers=None):
+    """
+    마지막 학습 이후 새로 쌓인 데이터로 온도/습도 모델을 재학습하고, 검증을 통과한 모델만 배포
+    - 아카이브는 마지막 학습 시점(특성 이력 포함) 이후 파일만 읽음
+    - 새 데이터의 마지막 holdout_hours는 검증용: 새 모델 MAE가 현재 모델 MAE × (1 + tolerance) 이하일 때만 교체
+    - 두 모델은 별도 프로세스에서 동시에 학습 (LightGBM 스레드는 CPU를 나눠 사용)
+    반환: 모델별 결과 딕셔너리 목록
+    """
+    started = time.perf_counter()
+    state = {} if full else load_state(model_dir)
+    current = {name: load_model_dict(name, model_dir) for name in TARGETS}
+    names = {name: (model_features(md) if md else None) or STATE_COLUMNS for name, md in current.items()}
+    feature_set = FeatureSet(STATE_COLUMNS)
+    for model_names in names.values():
+        feature_set = feature_set.union(FeatureSet(model_names))
+
+    watermarks = {name: state.get(name, {}).get('watermark') for name in TARGETS}
+    known = [w for w in watermarks.values() if w is not None]
+    start = None
+    if len(known) == len(TARGETS):
+        # 특성 계산에 필요한 이력만큼 앞에서부터 읽음
+        start = pd.Timestamp(min(known) - feature_set.history, unit='m')
+    minutes, values = load_history(source, start, None, feature_set.columns)
+    print(f"이력 로드 완료 - {len(minutes)}행, {time.perf_counter() - started:.1f}초")
+    if len(minutes) < 2:
+        print("재학습할 데이터가 없습니다")
+        return []
+
+    holdout_start = minutes[-1] - int(holdout_hours * 60)
+    jobs = {}
+    for name, target in TARGETS.items():
+        X, y, at = build_windows(minutes, values, feature_set.columns, names[name], target, watermarks[name])
+        train = at <= holdout_start
+        if train.sum() < min_rows or train.all():
+            print(f"{name}: 새 학습 데이터 부족 ({int(train.sum())}행, 검증 {int((~train).sum())}행) - 건너뜀")
+            continue
+        jobs[name] = (X[train], y[train], X[~train], y[~train])
+    if not jobs:
+        return []
+
+    n_jobs = max(1, (os.cpu_count() or 1) // len(jobs))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or len(jobs), initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(_fit, name, current[name], names[name], *arrays, rounds, n_jobs, full)
+            for name, arrays in jobs.items()
+        ]
+        for future in futures:
+            results.append(future.result())
+
+    for result in results:
+        name = result['name']
+        accepted = result['current_mae'] is None or result['new_mae'] <= result['current_mae'] * (1 + tolerance)
+        result['published'] = accepted and not dry_run
+        current_mae = f"{result['current_mae']:.4f}" if result['current_mae'] is not None else "-"
+        print(f"{name}: {'warm start' if result['warm_start'] else '새로 학습'} "
+              f"학습 {result['train_rows']}행, 트리 {result['trees']}개, {result['fit_seconds']:.1f}초 - "
+              f"검증 MAE {current_mae} → {result['new_mae']:.4f} "
+              f"({'배포' if result['published'] else '배포 안 함' if dry_run else '기존 모델 유지'})")
+        if result['published']:
+            publish(name, result.pop('model_dict'), model_dir)
+            # 검증 구간은 다음 재학습 때 학습 데이터로 사용
+            state[name] = {
+                'watermark': int(holdout_start),
+                'trained_until': str(pd.Timestamp(int(holdout_start), unit='m')),
+                'published_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'holdout_mae': result['new_mae'],
+            }
+        else:
+            result.pop('model_dict')
+    if not dry_run and any(result['published'] for result in results):
+        save_state(state, model_dir)
+    print(f"재학습 완료 - {time.perf_counter() - started:.1f}초")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="새 센서 데이터로 온도/습도 모델 재학습 후 배포")
+    parser.add_argument("--source", help="센서 CSV 또는 아카이브 디렉토리")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--holdout-hours", type=float, default=RETRAIN_HOLDOUT_HOURS, help="검증 구간(시간)")
+    parser.add_argument("--rounds", type=int, default=RETRAIN_ROUNDS, help="warm start로 추가할 트리 수")
+    parser.add_argument("--min-rows", type=int, default=RETRAIN_MIN_ROWS, help="재학습에 필요한 최소 새 행 수")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="검증 MAE 허용 증가 비율")
+    parser.add_argument("--full", action="store_true", help="전체 이력으로 처음부터 다시 학습")
+    parser.add_argument("--dry-run", action="store_true", help="학습/검증만 하고 배포하지 않음")
+    parser.add_argument("--interval", type=float, help="주기 실행 간격(초), 없으면 한 번만 실행")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            run_retrain(args.source, args.model_dir, args.holdout_hours, args.rounds, args.min_rows,
+                        args.tolerance, args.full, args.dry_run)
+        except Exception as e:
+            print(f"재학습 오류: {str(e)}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,217 @@
+import argparse
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from metrics import get_metrics
+from sensor_schema import PREDICTION_COLUMNS, SENSOR_COLUMNS, apply_schema, arrow_schema, table_to_frame
+from sensor_store import ROLLUP_TIERS, RollupTier
+
+# 한글 컬럼명 그대로 사용하는 명시적 스키마 (sensor_schema 타입, 이전 float64/int64 파일도 읽을 때 변환됨)
+SENSOR_SCHEMA = arrow_schema(SENSOR_COLUMNS)
+PREDICTION_SCHEMA = arrow_schema(PREDICTION_COLUMNS)
+
+# 1분 데이터 기준 1시간 = 행 그룹 하나 (시간 단위 조회가 행 그룹 하나만 읽도록)
+DEFAULT_ROW_GROUP_SIZE = 60
+
+
+class SensorArchive:
+    """
+    날짜별로 파티션된 Parquet 아카이브
+    root/date=YYYY-MM-DD/part-*.parquet 구조로 저장하고,
+    시간 구간 조회 시 해당 날짜 파티션만 열고 행 그룹 통계로 필요한 그룹만 읽는다
+    """
+
+    def __init__(self, root, schema=SENSOR_SCHEMA, time_column=None,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        self.root = root
+        self.schema = schema
+        self.time_column = time_column or schema.names[0]
+        self.row_group_size = row_group_size
+        # 날짜 → (집계에 반영한 파일 목록, 마지막 시간, 집계 단위별 RollupTier)
+        self._rollups = {}
+        # 지금까지 읽은 데이터 크기 (압축 해제 후 Arrow 기준)
+        self.bytes_read = 0
+
+    @property
+    def version(self):
+        """
+        아카이브의 변경 시각 (write가 어느 날짜 파티션에 쓰든 루트 디렉토리 시각을 갱신하므로 바뀜)
+        보존 작업처럼 과거 날짜에 쓰는 경우도 있어 최근 파티션만 보면 변경을 놓친다
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        return os.stat(self.root).st_mtime_ns
+
+    def write(self, frame):
+        """데이터프레임을 날짜별 파티션에 새 파일로 추가"""
+        frame = apply_schema(frame.copy())
+        frame = frame.sort_values(self.time_column, kind='stable')
+        schema = self._schema_for(frame.columns)
+        days = frame[self.time_column].dt.strftime('%Y-%m-%d')
+        for day, part in frame.groupby(days, sort=True):
+            day_dir = self._day_dir(day)
+            os.makedirs(day_dir, exist_ok=True)
+            table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+            # 임시 파일에 쓴 뒤 이름을 바꿔서 읽는 쪽이 쓰다 만 파일을 보지 않게 함
+            name = f"part-{uuid.uuid4().hex}.parquet"
+            tmp_path = os.path.join(day_dir, f".{name}.tmp")
+            pq.write_table(table, tmp_path, row_group_size=self.row_group_size)
+            os.replace(tmp_path, os.path.join(day_dir, name))
+        if len(frame):
+            # 파티션 안의 파일 추가는 루트 시각을 바꾸지 않으므로 직접 갱신 (version)
+            os.utime(self.root)
+
+    def read_range(self, start=None, end=None, columns=None, include_start=True):
+        """start ~ end 구간(end 포함) 데이터를 시간순으로 반환"""
+        files = self._files(start, end)
+        names = list(columns) if columns is not None else self.schema.names
+        if self.time_column not in names:
+            names = [self.time_column] + names
+        if not files:
+            return table_to_frame(self.schema.empty_table().select(names))
+
+        field = ds.field(self.time_column)
+        condition = None
+        if start is not None:
+            start = pa.scalar(pd.Timestamp(start).as_unit('ns'), type=pa.timestamp('ns'))
+            condition = field >= start if include_start else field > start
+        if end is not None:
+            end = pa.scalar(pd.Timestamp(end).as_unit('ns'), type=pa.timestamp('ns'))
+            condition = field <= end if condition is None else condition & (field <= end)
+
+        metrics = get_metrics()
+        with metrics.timed('sensor_archive_read_seconds', '아카이브 구간 조회 시간'):
+            dataset = ds.dataset(files, schema=self.schema, format='parquet')
+            table = dataset.to_table(columns=names, filter=condition)
+        self.bytes_read += table.nbytes
+        metrics.counter('sensor_archive_bytes_read_total', '아카이브에서 읽은 바이트 수').inc(table.nbytes)
+        frame = table_to_frame(table)
+        return frame.sort_values(self.time_column, kind='stable', ignore_index=True)
+
+    # sensor_store.CsvTable과 같은 조회 인터페이스
+    def snapshot(self):
+        return self.read_range()
+
+    def window(self, start=None, end=None):
+        return self.read_range(start, end)
+
+    def after(self, timestamp):
+        return self.read_range(timestamp, None, include_start=False)
+
+    def asof(self, timestamp, tolerance=None):
+        """timestamp 시점 또는 그 이전의 가장 최근 행 (tolerance보다 오래되면 None)"""
+        timestamp = pd.Timestamp(timestamp)
+        if tolerance is not None:
+            frame = self.read_range(timestamp - tolerance, timestamp)
+            return frame.iloc[-1] if not frame.empty else None
+        # 허용 범위가 없으면 최근 날짜부터 거슬러 올라가며 찾는다
+        for day in reversed(self._days(end=timestamp)):
+            frame = self.read_range(pd.Timestamp(day), timestamp)
+            if not frame.empty:
+                return frame.iloc[-1]
+        return None
+
+    def last_time(self):
+        days = self._days()
+        if not days:
+            return None
+        frame = self.read_range(pd.Timestamp(days[-1]), None, columns=[self.time_column])
+        return frame[self.time_column].iloc[-1] if not frame.empty else None
+
+    def rollup(self, tier, start=None, end=None):
+        """
+        집계 단위 tier로 start ~ end 구간 조회
+        날짜 파티션별로 집계를 유지하고, 새로 추가된 파일만 읽어 갱신한다
+        """
+        frames = [
+            self._day_rollup(day)[tier].window(start, end) for day in self._days(start, end)
+        ]
+        if not frames:
+            return RollupTier(ROLLUP_TIERS[tier], self.time_column).window()
+        return pd.concat(frames, ignore_index=True)
+
+    def _day_rollup(self, day):
+        files = self._files(day, day)
+        known, last, tiers = self._rollups.get(day, ((), None, None))
+        if tiers is not None and files == list(known):
+            return tiers
+        new_files = [path for path in files if path not in set(known)]
+        frame = self._read_files(new_files)
+        rebuild = tiers is None or len(known) + len(new_files) != len(files) or (
+            last is not None and len(frame) and frame[self.time_column].iloc[0] < last)
+        if rebuild:
+            # 처음이거나 파일이 지워졌거나 이전 시간의 행이 추가되었으면 그 날짜만 다시 집계
+            if len(new_files) != len(files):
+                frame = self._read_files(files)
+            last = None
+            tiers = {name: RollupTier(freq, self.time_column) for name, freq in ROLLUP_TIERS.items()}
+        for rollup in tiers.values():
+            rollup.extend(frame)
+        if len(frame):
+            last = frame[self.time_column].iloc[-1]
+        self._rollups[day] = (tuple(files), last, tiers)
+        return tiers
+
+    def _read_files(self, files):
+        if not files:
+            return table_to_frame(self.schema.empty_table())
+        table = ds.dataset(files, schema=self.schema, format='parquet').to_table()
+        return table_to_frame(table).sort_values(self.time_column, kind='stable', ignore_index=True)
+
+    def _schema_for(self, columns):
+        return pa.schema([f for f in self.schema if f.name in set(columns)])
+
+    def _day_dir(self, day):
+        return os.path.join(self.root, f"date={day}")
+
+    def _days(self, start=None, end=None):
+        if not os.path.isdir(self.root):
+            return []
+        days = sorted(
+            name[len('date='):] for name in os.listdir(self.root) if name.startswith('date=')
+        )
+        if start is not None:
+            first = pd.Timestamp(start).strftime('%Y-%m-%d')
+            days = [d for d in days if d >= first]
+        if end is not None:
+            last = pd.Timestamp(end).strftime('%Y-%m-%d')
+            days = [d for d in days if d <= last]
+        return days
+
+    def _files(self, start=None, end=None):
+        files = []
+        for day in self._days(start, end):
+            day_dir = self._day_dir(day)
+            files.extend(
+                os.path.join(day_dir, name) for name in sorted(os.listdir(day_dir))
+                if name.endswith('.parquet') and not name.startswith('.')
+            )
+        return files
+
+
+def convert_csv(csv_path, root, schema=None, chunksize=1_000_000):
+    """기존 CSV 파일을 아카이브로 변환 (청크 단위로 읽어 메모리 사용 제한)"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    if schema is None:
+        schema = PREDICTION_SCHEMA if '예측시간' in header else SENSOR_SCHEMA
+    archive = SensorArchive(root, schema=schema)
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        archive.write(chunk)
+        rows += len(chunk)
+    print(f"변환 완료 - {csv_path} → {root} ({rows}행)")
+    return archive
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV 데이터를 날짜별 Parquet 아카이브로 변환")
+    parser.add_argument("csv_path", help="변환할 CSV 파일 (sensor_data.csv, sensor.csv, predictions.csv)")
+    parser.add_argument("root", help="아카이브 디렉토리")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    args = parser.parse_args()
+    convert_csv(args.csv_path, args.root, chunksize=args.chunksize)
@@ -1,6 +1,13 @@
-import pandas as pd
+import argparse
+import json
+import os
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
+
+from sensor_store import SENSOR_COLUMNS
+
 # 현재 시간을 기준으로 30분 전부터의 데이터 생성
 end_time = datetime(2018, 5, 10, 10, 5, 0)  # 2018-05-10 10:05:00
 start_time = end_time - timedelta(minutes=30)
@@ -8,7 +15,7 @@ start_time = end_time - timedelta(minutes=30)
 # 1분 간격의 시간 배열 생성
 timestamps = pd.date_range(start=start_time, end=end_time, freq='1min')
 
-# 샘플 데이터 생성
+# 샘플 데이터 (sensor_data_v2.csv)
 data = {
     '저장시간': timestamps,
     '내부온도': [19.7, 19.7, 19.8, 19.8, 19.8,
@@ -47,14 +54,167 @@ data = {
     ]
 }
 
-# 각 열의 길이 확인
-for key, value in data.items():
-    print(f"{key}: {len(value)}")
+def write_sample(path='sensor_data_v2.csv'):
+    """고정된 샘플 데이터 31행 저장"""
+    # 각 열의 길이 확인
+    for key, value in data.items():
+        print(f"{key}: {len(value)}")
+
+    # DataFrame 생성
+    df = pd.DataFrame(data)
+
+    # CSV 파일로 저장
+    df.to_csv(path, index=False)
+    print(f"{path} 파일이 생성되었습니다.")
+
+
+MINUTES_PER_DAY = 1440
+
+
+def dew_point(temp, humid):
+    """Magnus 식으로 계산한 이슬점 (°C)"""
+    a, b = 17.62, 243.12
+    gamma = np.log(np.clip(humid, 1.0, 100.0) / 100.0) + a * temp / (b + temp)
+    return b * gamma / (a - gamma)
+
+
+def _daily_weather(rng, n_days):
+    """날짜별 날씨 변동 (기온 편차, 맑음 정도) - 전체 기간을 한 번에 뽑아 청크 경계에서도 이어지게 함"""
+    anomaly = np.cumsum(rng.normal(0.0, 1.2, n_days + 1)) * 0.6
+    anomaly -= np.linspace(anomaly[0], anomaly[-1], n_days + 1) * 0.5
+    clearness = np.clip(rng.beta(4.0, 2.0, n_days + 1), 0.1, 1.0)
+    return anomaly, clearness
+
+
+def generate_chunk(rng, start, n_days, day_offset, anomaly, clearness,
+                   gap_rate=0.0, gap_minutes=10, outlier_rate=0.0):
+    """
+    start(자정)부터 n_days일치 1분 데이터를 NumPy 배열 연산으로 생성
+    anomaly/clearness: 전체 기간 날짜별 날씨 값, day_offset: 이 청크 첫날의 위치
+    """
+    n = n_days * MINUTES_PER_DAY
+    minute_of_day = np.tile(np.arange(MINUTES_PER_DAY), n_days)
+    day_index = np.repeat(np.arange(n_days), MINUTES_PER_DAY) + day_offset
+    hour = minute_of_day / 60.0
+    times = pd.Timestamp(start) + pd.to_timedelta(np.arange(n), unit='min')
+    day_of_year = times.dayofyear.to_numpy()
+
+    # 계절 (7월 말 최고) + 일교차 (15시 최고)
+    season = -np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    diurnal = np.sin(2 * np.pi * (hour - 9) / 24)
+    # 날씨 편차는 날짜 사이를 선형 보간해서 자정에 끊기지 않게
+    frac = minute_of_day / MINUTES_PER_DAY
+    weather = anomaly[day_index] * (1 - frac) + anomaly[day_index + 1] * frac
+
+    # 일사량: 해 뜬 시간(6~19시) 반원 곡선 × 계절 × 맑음 정도, 하루 누적은 자정에 0으로
+    sun = np.clip(np.sin(np.pi * (hour - 6) / 13), 0.0, None)
+    radiation = sun * (0.8 + 0.2 * season) * clearness[day_index] * 3.5
+    radiation *= rng.uniform(0.85, 1.15, n)
+    accumulated = np.cumsum(radiation.reshape(n_days, MINUTES_PER_DAY), axis=1).ravel()
+
+    outside = 13 + 9 * season + 5 * diurnal + weather + rng.normal(0, 0.2, n)
+    # 온실 내부: 외부 영향 완화 + 일사 가열 + 작은 잡음
+    inside = 19 + 0.35 * (outside - 13) + 4 * sun * clearness[day_index] + rng.normal(0, 0.15, n)
+    humid = np.clip(72 - 2.5 * (inside - 20) + 3 * (1 - clearness[day_index])
+                    + rng.normal(0, 0.8, n), 25, 99)
+    wind = np.clip(rng.gamma(2.0, 0.35, n) * (1 + 0.5 * np.clip(diurnal, 0, None)), 0, None)
+
+    frame = pd.DataFrame({
+        '저장시간': times,
+        '내부온도': inside.round(1),
+        '내부습도': humid.round(1),
+        '외부온도': outside.round(1),
+        '풍속': wind.round(1),
+        '이슬점': dew_point(inside, humid).round(1),
+        '누적일사량': accumulated.astype(np.int64),
+    })
+
+    if outlier_rate:
+        # 센서 튐: 임의의 행/측정값에 큰 편차
+        rows = np.flatnonzero(rng.random(n) < outlier_rate)
+        columns = rng.choice(['내부온도', '내부습도', '외부온도', '이슬점'], len(rows))
+        spikes = (rng.uniform(5, 15, len(rows)) * rng.choice([-1, 1], len(rows))).round(1)
+        for column in np.unique(columns):
+            picked = rows[columns == column]
+            frame.loc[picked, column] += spikes[columns == column]
+    if gap_rate:
+        # 결측 구간: 시작 위치마다 평균 gap_minutes분 동안 행이 빠짐
+        starts = np.flatnonzero(rng.random(n) < gap_rate)
+        lengths = rng.geometric(1.0 / gap_minutes, len(starts))
+        marks = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(marks, starts, 1)
+        np.add.at(marks, np.minimum(starts + lengths, n), -1)
+        frame = frame[np.cumsum(marks[:n]) == 0]
+    return frame
+
+
+def generate(output, sites=1, start='2018-01-01', days=30, seed=0, fmt='csv',
+             chunk_days=30, gap_rate=0.0, gap_minutes=10, outlier_rate=0.0):
+    """
+    여러 온실의 1분 데이터를 청크 단위로 생성해서 바로 기록 (전체를 메모리에 올리지 않음)
+    fmt='csv'면 output/<site>.csv + 온실 목록 sites.json, 'parquet'이면 output/<site>/ 날짜별 아카이브
+    """
+    start = pd.Timestamp(start).normalize()
+    os.makedirs(output, exist_ok=True)
+    registry = []
+    total = 0
+    for site in range(sites):
+        site_id = f"gh-{site + 1:02d}"
+        # 온실마다, 청크마다 독립된 시드 (같은 인자면 항상 같은 데이터)
+        site_seed = np.random.SeedSequence([seed, site])
+        anomaly, clearness = _daily_weather(np.random.default_rng(site_seed), days)
+        if fmt == 'parquet':
+            from sensor_archive import SensorArchive
+            sink = SensorArchive(os.path.join(output, site_id))
+        else:
+            path = os.path.join(output, f"{site_id}.csv")
+            pd.DataFrame(columns=SENSOR_COLUMNS).to_csv(path, index=False)
+            registry.append({'site_id': site_id, 'sensor_csv': os.path.abspath(path)})
+
+        for chunk_index, day_offset in enumerate(range(0, days, chunk_days)):
+            n_days = min(chunk_days, days - day_offset)
+            rng = np.random.default_rng(np.random.SeedSequence([seed, site, chunk_index + 1]))
+            frame = generate_chunk(
+                rng, start + pd.Timedelta(days=day_offset), n_days, day_offset, anomaly, clearness,
+                gap_rate, gap_minutes, outlier_rate,
+            )
+            if fmt == 'parquet':
+                sink.write(frame)
+            else:
+                frame.to_csv(path, mode='a', header=False, index=False,
+                             date_format='%Y-%m-%d %H:%M:%S')
+            total += len(frame)
+        print(f"생성 완료 - {site_id}: {days}일")
+
+    if registry:
+        with open(os.path.join(output, 'sites.json'), 'w', encoding='utf-8') as f:
+            json.dump(registry, f, ensure_ascii=False, indent=2)
+    print(f"총 {total}행 생성 ({output})")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="센서 데이터 생성 (인자가 없으면 고정 샘플 sensor_data_v2.csv)")
+    commands = parser.add_subparsers(dest="command")
 
+    sample = commands.add_parser("sample", help="고정 샘플 31행 저장")
+    sample.add_argument("--path", default="sensor_data_v2.csv")
 
-# DataFrame 생성
-df = pd.DataFrame(data)
+    synth = commands.add_parser("generate", help="여러 온실의 장기간 1분 데이터 생성")
+    synth.add_argument("output", help="출력 디렉토리")
+    synth.add_argument("--sites", type=int, default=1, help="온실 수")
+    synth.add_argument("--start", default="2018-01-01", help="시작 날짜")
+    synth.add_argument("--days", type=int, default=30, help="생성할 일 수")
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    synth.add_argument("--chunk-days", type=int, default=30, help="한 번에 생성/기록할 일 수")
+    synth.add_argument("--gap-rate", type=float, default=0.0005, help="분당 결측 구간 시작 확률")
+    synth.add_argument("--gap-minutes", type=float, default=10, help="결측 구간 평균 길이(분)")
+    synth.add_argument("--outlier-rate", type=float, default=0.0002, help="튀는 값 비율")
 
-# CSV 파일로 저장
-df.to_csv('sensor_data_v2.csv', index=False)
-print("sensor_data.csv 파일이 생성되었습니다.")
\ No newline at end of file
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.output, args.sites, args.start, args.days, args.seed, args.format,
+                 args.chunk_days, args.gap_rate, args.gap_minutes, args.outlier_rate)
+    else:
+        write_sample(getattr(args, 'path', 'sensor_data_v2.csv'))
@@ -0,0 +1,126 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# 센서/예측 데이터 컬럼 (첫 컬럼이 시간 컬럼)
+SENSOR_COLUMNS = ['저장시간', '내부온도', '내부습도', '외부온도', '풍속', '이슬점', '누적일사량']
+PREDICTION_COLUMNS = ['예측시간', '예측온도', '예측습도']
+TIME_COLUMNS = ('저장시간', '예측시간')
+
+# 값 컬럼 타입: 측정값은 0.1 단위라 float32(유효숫자 7자리)로 충분하고, 누적일사량은 하루 누적 정수(하루 최대 수천)
+# 시간 컬럼은 데이터프레임에서는 datetime64[ns], 배열로 다룰 때는 epoch_minutes()로 분 단위 int64
+COLUMN_TYPES = {
+    '내부온도': np.float32,
+    '내부습도': np.float32,
+    '외부온도': np.float32,
+    '풍속': np.float32,
+    '이슬점': np.float32,
+    '누적일사량': np.int16,
+    '예측온도': np.float32,
+    '예측습도': np.float32,
+}
+ARROW_TYPES = {
+    **{column: pa.timestamp('ns') for column in TIME_COLUMNS},
+    **{column: pa.from_numpy_dtype(dtype) for column, dtype in COLUMN_TYPES.items()},
+}
+# float32 값을 float64로 넓힐 때 남기는 소수 자릿수 (float32 유효숫자 밖의 이진 오차 제거)
+WIDEN_DECIMALS = 4
+# 이보다 큰 CSV를 읽은 뒤에는 Arrow 할당자가 잡아 둔 파싱 버퍼를 돌려줌
+_RELEASE_BYTES = 16 << 20
+
+
+def arrow_schema(columns):
+    """컬럼 목록의 Arrow 스키마 (Parquet 아카이브용)"""
+    return pa.schema([(column, ARROW_TYPES[column]) for column in columns])
+
+
+def read_csv(source, columns=None, names=None):
+    """
+    CSV를 스키마 타입으로 읽음 (Arrow CSV 파서가 타입 추론 없이 시간/값 컬럼을 바로 변환)
+    source: 경로 또는 바이트, names를 주면 헤더 없는 CSV (파일 꼬리 읽기용)
+    columns: 읽을 컬럼 (없으면 전체)
+    스키마 타입으로 변환할 수 없는 값이 있으면 pandas 파서로 읽은 뒤 apply_schema()로 변환
+    파싱 버퍼와 결과 배열은 시스템 할당자에서 받고, 큰 파일을 읽은 뒤에는 해제된 파싱 버퍼를 운영체제에 돌려준다
+    (할당자 캐시에 남은 버퍼 때문에 상주 메모리가 데이터 크기보다 커지지 않도록)
+    """
+    pool = pa.system_memory_pool()
+    read_options = pa_csv.ReadOptions(column_names=list(names)) if names is not None else None
+    convert_options = pa_csv.ConvertOptions(column_types=ARROW_TYPES,
+                                            include_columns=list(columns) if columns is not None else None)
+    try:
+        table = pa_csv.read_csv(_input(source), read_options=read_options, convert_options=convert_options,
+                                memory_pool=pool)
+    except pa.ArrowInvalid:
+        frame = pd.read_csv(_input(source, arrow=False), usecols=columns,
+                            header=None if names is not None else 'infer', names=names)
+        return apply_schema(frame)
+    release = table.nbytes > _RELEASE_BYTES
+    frame = table_to_frame(table, pool)
+    if release:
+        pa.default_memory_pool().release_unused()
+    return frame
+
+
+def table_to_frame(table, pool=None):
+    """
+    Arrow 테이블 → 데이터프레임 (컬럼별 블록으로 변환해서 2차원 블록으로 합치는 복사를 피함)
+    결측이 있는 정수 컬럼은 float32로
+    """
+    for i, field in enumerate(table.schema):
+        if pa.types.is_integer(field.type) and table.column(i).null_count:
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float32()))
+    return table.to_pandas(split_blocks=True, self_destruct=True, memory_pool=pool)
+
+
+def apply_schema(frame):
+    """이미 만든 데이터프레임의 컬럼을 스키마 타입으로 변환 (제자리 변환 후 그대로 반환)"""
+    for column in frame.columns:
+        if column in TIME_COLUMNS:
+            if frame[column].dtype != 'datetime64[ns]':
+                frame[column] = pd.to_datetime(frame[column]).astype('datetime64[ns]')
+        elif column in COLUMN_TYPES and frame[column].dtype != COLUMN_TYPES[column]:
+            frame[column] = _cast(pd.to_numeric(frame[column]).to_numpy(), COLUMN_TYPES[column])
+    return frame
+
+
+def _cast(values, dtype):
+    if not np.issubdtype(dtype, np.integer):
+        return values.astype(dtype)
+    values = values.astype(np.float64, copy=False)
+    if len(values) == 0:
+        return values.astype(dtype)
+    if np.isnan(values).any() or (values != np.round(values)).any():
+        # 결측이나 소수가 있으면 정수 대신 float32
+        return values.astype(np.float32)
+    # 범위를 넘는 값이 있으면 담을 수 있는 정수 타입으로 넓힘
+    for candidate in (dtype, np.int32, np.int64):
+        info = np.iinfo(candidate)
+        if info.min <= values.min() and values.max() <= info.max:
+            break
+    return values.astype(candidate)
+
+
+def epoch_minutes(times):
+    """시각 배열/컬럼 → 1970-01-01 00:00부터의 분 (int64, 분 미만은 버림)"""
+    times = np.asarray(times)
+    if not np.issubdtype(times.dtype, np.datetime64):
+        times = pd.to_datetime(times).to_numpy()
+    return times.astype('datetime64[m]').astype(np.int64)
+
+
+def widen(values):
+    """float32 값 → 이진 오차를 없앤 float64 배열 (저장/전송용, 20.9f가 20.899999618...이 되지 않도록), 다른 타입은 그대로"""
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values
+    return values.astype(np.float64).round(WIDEN_DECIMALS)
+
+
+def _input(source, arrow=True):
+    """바이트는 복사 없이 읽도록 Arrow 버퍼로 (pandas 파서에는 BytesIO)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(pa.py_buffer(source)) if arrow else io.BytesIO(source)
+    return source
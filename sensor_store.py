@@ -0,0 +1,429 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import get_metrics
+from sensor_schema import PREDICTION_COLUMNS, SENSOR_COLUMNS, read_csv
+
+# 파일이 통째로 다시 쓰였는지 확인할 때 비교하는 꼬리 바이트 수
+_PREFIX_CHECK_BYTES = 64
+# 줄바꿈 없이 끝난 마지막 줄을 완성된 줄로 보고 읽기 전에 파일이 바뀌지 않아야 하는 시간(초)
+PARTIAL_LINE_SECONDS = 2.0
+# 배열이 꽉 찼을 때 늘리는 여유 공간 (현재 크기의 1/4 + 고정 행 수, 2배씩 늘리지 않아 큰 테이블의 메모리를 아낌)
+_GROWTH_DIVISOR = 4
+_MIN_GROWTH_ROWS = 1024
+
+# 긴 구간 조회용 집계 단위 (원본 1분 데이터 위에 유지)
+ROLLUP_TIERS = {
+    '10min': pd.Timedelta(minutes=10),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+}
+# 구간별 최소/평균/최대를 유지하는 컬럼과 마지막 값만 유지하는 컬럼
+ROLLUP_STAT_COLUMNS = ['내부온도', '내부습도', '외부온도', '풍속', '이슬점']
+ROLLUP_LAST_COLUMNS = ['누적일사량']
+
+
+class RollupTier:
+    """
+    일정 간격 구간별 집계 (합계/개수/최소/최대/마지막 값)
+    시간순으로 추가되는 행은 마지막 구간을 갱신하거나 새 구간을 붙이기만 하므로
+    기존 이력 크기와 무관하게 행당 O(1)로 갱신된다
+    """
+
+    def __init__(self, freq, time_column='저장시간', stat_columns=ROLLUP_STAT_COLUMNS,
+                 last_columns=ROLLUP_LAST_COLUMNS):
+        self.freq = pd.Timedelta(freq)
+        self.time_column = time_column
+        self.stat_columns = list(stat_columns)
+        self.last_columns = list(last_columns)
+        self._step = self.freq.value
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._size = 0
+        self._starts = np.empty(0, dtype=np.int64)
+        self._sum = np.empty((0, len(self.stat_columns)))
+        self._count = np.empty((0, len(self.stat_columns)), dtype=np.int64)
+        self._min = np.empty((0, len(self.stat_columns)))
+        self._max = np.empty((0, len(self.stat_columns)))
+        self._last = np.empty((0, len(self.last_columns)))
+
+    def rebuild(self, frame):
+        self.clear()
+        self.extend(frame)
+
+    def extend(self, frame):
+        """시간순으로 정렬된 새 행 추가 (마지막 구간보다 이전 행이 섞이면 rebuild 필요)"""
+        if frame is None or len(frame) == 0:
+            return
+        times = frame[self.time_column].to_numpy().astype('datetime64[ns]').view(np.int64)
+        keys = times - times % self._step
+        stats = frame[self.stat_columns].to_numpy(dtype=float)
+        lasts = frame[self.last_columns].to_numpy(dtype=float)
+
+        starts, first = np.unique(keys, return_index=True)
+        valid = ~np.isnan(stats)
+        sums = np.add.reduceat(np.where(valid, stats, 0.0), first)
+        counts = np.add.reduceat(valid.astype(np.int64), first)
+        mins = np.fmin.reduceat(stats, first)
+        maxs = np.fmax.reduceat(stats, first)
+        ends = np.append(first[1:], len(keys)) - 1
+        last_values = lasts[ends]
+
+        if self._size and starts[0] == self._starts[self._size - 1]:
+            # 첫 구간이 마지막 구간과 같으면 기존 구간에 합친다
+            i = self._size - 1
+            self._sum[i] += sums[0]
+            self._count[i] += counts[0]
+            self._min[i] = np.fmin(self._min[i], mins[0])
+            self._max[i] = np.fmax(self._max[i], maxs[0])
+            self._last[i] = last_values[0]
+            starts, sums, counts, mins, maxs, last_values = (
+                starts[1:], sums[1:], counts[1:], mins[1:], maxs[1:], last_values[1:])
+        self._append(starts, sums, counts, mins, maxs, last_values)
+
+    def window(self, start=None, end=None):
+        """
+        start가 속한 구간부터 end가 속한 구간까지의 집계 반환
+        평균은 원래 컬럼 이름, 최소/최대는 '<컬럼>_min', '<컬럼>_max'
+        """
+        n = self._size
+        starts = self._starts[:n]
+        lo = 0 if start is None else np.searchsorted(starts, self._key(start), side='left')
+        hi = n if end is None else np.searchsorted(starts, self._key(end), side='right')
+        hi = max(lo, hi)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self._sum[lo:hi] / self._count[lo:hi]
+        data = {self.time_column: starts[lo:hi].view('datetime64[ns]')}
+        for j, column in enumerate(self.stat_columns):
+            data[column] = means[:, j]
+            data[f'{column}_min'] = self._min[lo:hi, j]
+            data[f'{column}_max'] = self._max[lo:hi, j]
+        for j, column in enumerate(self.last_columns):
+            data[column] = self._last[lo:hi, j]
+        return pd.DataFrame(data)
+
+    def _key(self, timestamp):
+        value = pd.Timestamp(timestamp).as_unit('ns').value
+        return value - value % self._step
+
+    def _append(self, starts, sums, counts, mins, maxs, last_values):
+        added = len(starts)
+        if not added:
+            return
+        needed = self._size + added
+        if needed > len(self._starts):
+            # 용량을 두 배씩 늘려 추가 비용을 상수로 유지
+            capacity = max(needed, 2 * len(self._starts), 64)
+            self._starts = self._grow(self._starts, capacity)
+            self._sum = self._grow(self._sum, capacity)
+            self._count = self._grow(self._count, capacity)
+            self._min = self._grow(self._min, capacity)
+            self._max = self._grow(self._max, capacity)
+            self._last = self._grow(self._last, capacity)
+        i = self._size
+        self._starts[i:needed] = starts
+        self._sum[i:needed] = sums
+        self._count[i:needed] = counts
+        self._min[i:needed] = mins
+        self._max[i:needed] = maxs
+        self._last[i:needed] = last_values
+        self._size = needed
+
+    def _grow(self, array, capacity):
+        grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+
+class CsvTable:
+    """
+    CSV 파일 하나를 메모리에 유지하는 테이블
+    mtime/size가 바뀌었을 때만 파일을 확인하고, 뒤에 추가된 행만 읽어 붙인다
+    (컬럼별 배열의 여유 공간에 복사하므로 기존 행은 다시 복사하지 않음)
+    줄바꿈 없이 끝난 마지막 줄은 파일이 PARTIAL_LINE_SECONDS 동안 바뀌지 않으면 읽는다
+    시간 컬럼은 정렬된 배열로 따로 유지해서 이진 탐색으로 조회한다
+    """
+
+    def __init__(self, path, time_column, rollups=None):
+        self.path = path
+        self.time_column = time_column
+        # 이름 → 간격, 데이터가 바뀔 때 함께 갱신되는 집계
+        self._rollups = {
+            name: RollupTier(freq, time_column) for name, freq in (rollups or {}).items()
+        }
+        self._version = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._offset = 0
+        self._tail_bytes = b''
+        self._columns = None
+        self._frame = None
+        self._times = None
+        # 컬럼별 배열 (앞의 _rows행이 데이터, 뒤는 추가용 여유 공간)
+        self._arrays = None
+        self._rows = 0
+        # 줄바꿈 없는 마지막 줄을 처음 본 시각, 그 줄을 이미 읽었는지
+        self._partial_since = None
+        self._open_line = False
+        # 지금까지 파일에서 읽은 바이트 수
+        self.bytes_read = 0
+
+    @property
+    def version(self):
+        """파일 변경을 반영한 데이터 버전 (내용이 바뀔 때마다 증가)"""
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def snapshot(self):
+        """변경 사항을 반영한 현재 데이터프레임 반환 (파일이 없으면 None)"""
+        return self._view()[0]
+
+    def last_time(self):
+        """가장 최근 시간 (데이터가 없으면 None)"""
+        frame, times = self._view()
+        if frame is None or len(times) == 0:
+            return None
+        return pd.Timestamp(times[-1])
+
+    def asof(self, timestamp, tolerance=None):
+        """
+        timestamp 시점 또는 그 이전의 가장 최근 행 반환
+        tolerance보다 오래된 행밖에 없으면 None
+        """
+        frame, times = self._view()
+        if frame is None:
+            return None
+        timestamp = pd.Timestamp(timestamp)
+        pos = np.searchsorted(times, timestamp.to_datetime64(), side='right') - 1
+        if pos < 0:
+            return None
+        if tolerance is not None and timestamp - pd.Timestamp(times[pos]) > tolerance:
+            return None
+        return frame.iloc[pos]
+
+    def window(self, start=None, end=None):
+        """start 이상 end 이하 구간의 행 반환 (None이면 해당 방향 제한 없음)"""
+        frame, times = self._view()
+        if frame is None:
+            return None
+        lo, hi = self._bounds(times, start, 'left', end, 'right')
+        return frame.iloc[lo:hi]
+
+    def after(self, timestamp):
+        """timestamp보다 뒤의 행 반환"""
+        frame, times = self._view()
+        if frame is None:
+            return None
+        lo, hi = self._bounds(times, timestamp, 'right', None, 'right')
+        return frame.iloc[lo:hi]
+
+    def rollup(self, tier, start=None, end=None):
+        """집계 단위 tier로 start ~ end 구간 조회 (데이터가 없으면 None)"""
+        with self._lock:
+            self._refresh()
+            if self._frame is None:
+                return None
+            return self._rollups[tier].window(start, end)
+
+    @staticmethod
+    def _bounds(times, start, start_side, end, end_side):
+        lo = 0 if start is None else np.searchsorted(
+            times, pd.Timestamp(start).to_datetime64(), side=start_side)
+        hi = len(times) if end is None else np.searchsorted(
+            times, pd.Timestamp(end).to_datetime64(), side=end_side)
+        return lo, max(lo, hi)
+
+    def _view(self):
+        with self._lock:
+            self._refresh()
+            return self._frame, self._times
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._frame is not None:
+                self._reset()
+                self._version += 1
+            return
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        settled = signature == self._signature
+        if settled and (self._partial_since is None
+                        or time.monotonic() - self._partial_since < PARTIAL_LINE_SECONDS):
+            return
+
+        metrics = get_metrics()
+        table = os.path.basename(self.path)
+        with open(self.path, 'rb') as f:
+            if self._frame is None or not self._is_appended(f, stat):
+                with metrics.timed('sensor_store_load_seconds', '파일 읽기/파싱 시간', table=table, kind='full'):
+                    read = self._load_full(f)
+            else:
+                with metrics.timed('sensor_store_load_seconds', '파일 읽기/파싱 시간', table=table, kind='tail'):
+                    read = self._load_tail(f, settled)
+        self.bytes_read += read
+        metrics.counter('sensor_store_bytes_read_total', '파일에서 읽은 바이트 수', table=table).inc(read)
+        self._signature = signature
+
+    def _is_appended(self, f, stat):
+        """기존에 읽은 부분은 그대로이고 뒤에만 추가되었는지 확인"""
+        if self._signature is None or stat.st_ino != self._signature[0]:
+            return False
+        if stat.st_size < self._offset:
+            return False
+        start = self._offset - len(self._tail_bytes)
+        f.seek(start)
+        if f.read(len(self._tail_bytes)) != self._tail_bytes:
+            return False
+        # 줄바꿈 없던 마지막 줄을 읽은 뒤라면 그 줄이 그대로 끝났어야 함 (이어서 써졌으면 전체를 다시 읽음)
+        return not self._open_line or stat.st_size == self._offset or f.read(1) == b'\n'
+
+    def _load_full(self, f):
+        """파일 전체를 다시 읽음, 읽은 바이트 수 반환"""
+        f.seek(0)
+        raw = f.read()
+        end = raw.rfind(b'\n') + 1
+        if end == 0:
+            # 헤더조차 완성되지 않은 파일
+            self._reset()
+            return len(raw)
+        frame = read_csv(raw[:end])
+        self._columns = list(frame.columns)
+        self._set_frame(frame)
+        self._mark_offset(raw[:end], end)
+        self._open_line = False
+        self._partial_since = time.monotonic() if end < len(raw) else None
+        self._version += 1
+        return len(raw)
+
+    def _load_tail(self, f, settled=False):
+        """
+        마지막으로 읽은 위치 뒤만 읽음, 읽은 바이트 수 반환
+        settled면 (파일이 한동안 바뀌지 않았으면) 줄바꿈 없는 마지막 줄도 읽는다
+        """
+        base = self._offset
+        f.seek(base)
+        raw = f.read()
+        # 이미 읽은 줄바꿈 없는 줄이 그대로 끝났으면 그 줄바꿈은 건너뜀
+        skip = 1 if self._open_line and raw.startswith(b'\n') else 0
+        data = raw[skip:]
+        end = data.rfind(b'\n') + 1
+        if settled and end < len(data):
+            taken, chunk, open_line = len(data), data + b'\n', True
+        else:
+            # 아직 줄이 완성되지 않았으면 파일이 더 바뀌지 않을 때까지 기다렸다가 읽는다
+            taken, chunk, open_line = end, data[:end], False
+            self._partial_since = time.monotonic() if end < len(data) else None
+        if skip + taken == 0:
+            return len(raw)
+        if chunk:
+            try:
+                tail = read_csv(chunk, names=self._columns)
+            except ValueError:
+                if not open_line:
+                    raise
+                # 쓰다 만 줄이라 읽을 수 없으면 다음 변경 때 다시 확인
+                self._partial_since = None
+                return len(raw)
+            self._append_frame(tail)
+            self._version += 1
+        self._open_line = open_line
+        if open_line:
+            self._partial_since = None
+        self._mark_offset(self._tail_bytes + raw[:skip + taken], base + skip + taken)
+        return len(raw)
+
+    def _append_frame(self, tail):
+        """새 행을 컬럼별 배열의 여유 공간에 붙임 (순서가 어긋난 행이 있으면 전체를 다시 정렬)"""
+        tail_times = tail[self.time_column].to_numpy()
+        unordered = (len(tail_times) > 1 and (tail_times[1:] < tail_times[:-1]).any()) or (
+            len(self._times) and len(tail_times) and tail_times.min() < self._times[-1])
+        if unordered:
+            self._set_frame(pd.concat([self._frame, tail], ignore_index=True))
+            return
+        n, rows = self._rows, self._rows + len(tail)
+        for column in self._columns:
+            values = tail[column].to_numpy()
+            array = self._arrays[column]
+            dtype = np.result_type(array.dtype, values.dtype)
+            if rows > len(array) or dtype != array.dtype:
+                # 여유 공간을 현재 크기에 비례해서 늘려 행당 추가 비용을 상수로 유지
+                grown = np.empty(max(rows, len(array) + len(array) // _GROWTH_DIVISOR + _MIN_GROWTH_ROWS),
+                                 dtype=dtype)
+                grown[:n] = array[:n]
+                self._arrays[column] = array = grown
+            array[n:rows] = values
+        self._rows = rows
+        # 배열 앞부분을 복사 없이 감싼 데이터프레임 (이전에 돌려준 데이터프레임은 뒤에 붙는 행을 보지 않음)
+        self._frame = pd.DataFrame({column: self._arrays[column][:rows] for column in self._columns}, copy=False)
+        self._times = self._arrays[self.time_column][:rows]
+        for tier in self._rollups.values():
+            tier.extend(tail)
+
+    def _set_frame(self, frame):
+        times = frame[self.time_column].to_numpy()
+        if len(times) > 1 and (times[1:] < times[:-1]).any():
+            frame = frame.sort_values(self.time_column, kind='stable', ignore_index=True)
+            times = frame[self.time_column].to_numpy()
+        self._frame = frame
+        self._times = times
+        # 처음에는 읽은 배열을 그대로 쓰고, 행이 추가될 때 여유 공간이 있는 배열로 옮긴다
+        self._arrays = {column: frame[column].to_numpy() for column in self._columns}
+        self._rows = len(frame)
+        for tier in self._rollups.values():
+            tier.rebuild(frame)
+
+    def _mark_offset(self, chunk, offset):
+        self._offset = offset
+        self._tail_bytes = chunk[-_PREFIX_CHECK_BYTES:]
+
+    def _reset(self):
+        self._signature = None
+        self._offset = 0
+        self._tail_bytes = b''
+        self._columns = None
+        self._frame = None
+        self._times = None
+        self._arrays = None
+        self._rows = 0
+        self._partial_since = None
+        self._open_line = False
+        for tier in self._rollups.values():
+            tier.clear()
+
+
+class SensorStore:
+    """
+    센서 데이터와 예측 데이터를 함께 관리하는 공용 저장소
+    archive_dir를 주면 센서 데이터는 CSV 대신 날짜별 Parquet 아카이브에서 조회한다
+    hot_store_path를 주면 센서/예측 데이터를 SQLite 저장소에서 조회한다 (오래된 센서 구간은 아카이브)
+    """
+
+    def __init__(self, sensor_path="sensor_data.csv", prediction_path="predictions.csv",
+                 archive_dir=None, hot_store_path=None):
+        if hot_store_path:
+            from hot_store import HotStore
+            store = HotStore(hot_store_path)
+            archive = None
+            if archive_dir:
+                from sensor_archive import SensorArchive
+                archive = SensorArchive(archive_dir)
+            self.sensor = store.table('sensor', archive)
+            self.predictions = store.table('predictions')
+            return
+        if archive_dir:
+            from sensor_archive import SensorArchive
+            self.sensor = SensorArchive(archive_dir)
+        else:
+            self.sensor = CsvTable(sensor_path, '저장시간', rollups=ROLLUP_TIERS)
+        self.predictions = CsvTable(prediction_path, '예측시간')
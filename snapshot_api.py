@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import threading
+
+import tornado.web
+
+from metrics import get_metrics
+
+# 이 크기보다 작은 응답은 압축하지 않음
+GZIP_MIN_BYTES = 256
+
+
+def json_safe(value):
+    """NaN/무한대 실수를 None으로 바꾼 복사본 (표준 JSON에는 NaN이 없어 브라우저 JSON.parse가 거부함)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+class SnapshotResponse:
+    """스냅샷 하나에 대해 한 번만 만드는 응답 (JSON 본문, gzip 본문, 본문 해시 ETag)"""
+
+    def __init__(self, payload):
+        self.body = json.dumps(json_safe(payload), ensure_ascii=False, separators=(',', ':'), default=str,
+                               allow_nan=False).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=6) if len(self.body) >= GZIP_MIN_BYTES else None
+        # 내용이 같으면 스냅샷 버전이나 서버 재시작과 무관하게 같은 ETag
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+class SnapshotHandler(tornado.web.RequestHandler):
+    """GET → 현재 스냅샷 JSON (If-None-Match가 맞으면 본문 없이 304)"""
+
+    def initialize(self, api):
+        self.api = api
+
+    def compute_etag(self):
+        # 응답 본문을 다시 해시하지 않도록 tornado 자동 ETag는 끔
+        return None
+
+    def get(self):
+        response = self.api.response()
+        if response is None:
+            self.api.count(503)
+            self.send_error(503)
+            return
+        self.set_header('ETag', response.etag)
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_header('Vary', 'Accept-Encoding')
+        if self._matches(response.etag):
+            self.api.count(304)
+            self.set_status(304)
+            return
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        if response.gzipped is not None and 'gzip' in self.request.headers.get('Accept-Encoding', ''):
+            self.set_header('Content-Encoding', 'gzip')
+            self.write(response.gzipped)
+        else:
+            self.write(response.body)
+        self.api.count(200)
+
+    def _matches(self, etag):
+        header = self.request.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+        return '*' in tags or etag in tags
+
+
+class SnapshotApi:
+    """
+    외부 표시 장치용 스냅샷 HTTP API (Streamlit과 함께 설치되는 tornado 사용, 별도 포트/스레드)
+    get_snapshot(): 현재 Snapshot, render(snapshot): JSON으로 보낼 딕셔너리
+    응답은 스냅샷 memo에 보관하므로 폴링하는 클라이언트 수와 무관하게 스냅샷당 한 번만 만든다
+    """
+
+    def __init__(self, get_snapshot, render, path='/api/snapshot'):
+        self.get_snapshot = get_snapshot
+        self.render = render
+        self.path = path
+        self._started = False
+        self._lock = threading.Lock()
+        metrics = get_metrics()
+        self._counters = {
+            status: metrics.counter('snapshot_api_requests_total', '스냅샷 API 요청 수', status=str(status))
+            for status in (200, 304, 503)
+        }
+
+    def response(self):
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.memo(('snapshot_api', self.path), lambda: self._build(snapshot))
+
+    def _build(self, snapshot):
+        with get_metrics().timed('snapshot_api_build_seconds', '스냅샷 API 응답 생성 시간'):
+            return SnapshotResponse(self.render(snapshot))
+
+    def count(self, status):
+        self._counters[status].inc()
+
+    def application(self):
+        return tornado.web.Application([(self.path, SnapshotHandler, {'api': self})])
+
+    def start(self, port, host='0.0.0.0'):
+        """백그라운드 스레드의 이벤트 루프에서 http://host:port{path} 서버 시작 (한 번만)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        ready = threading.Event()
+        errors = []
+
+        async def serve():
+            try:
+                self.application().listen(port, address=host)
+            except OSError as e:
+                errors.append(e)
+                return
+            finally:
+                ready.set()
+            await asyncio.Event().wait()
+
+        threading.Thread(target=asyncio.run, args=(serve(),), name="snapshot-api", daemon=True).start()
+        ready.wait()
+        if errors:
+            print(f"스냅샷 API 서버 시작 실패: {str(errors[0])}")
+        else:
+            print(f"스냅샷 API 시작 - http://{host}:{port}{self.path}")
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 저장소 루트의 모듈(sensor_store, predict 등)을 바로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENSOR_HEADER = '저장시간,내부온도,내부습도,외부온도,풍속,이슬점,누적일사량'
+
+
+def sensor_lines(rows, start='2018-05-10 09:35:00', seed=0):
+    """1분 간격 센서 CSV 줄 목록 (헤더 제외, 줄바꿈 없음)"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, periods=rows, freq='min')
+    temp = 20 + np.cumsum(rng.normal(0, 0.1, rows))
+    humid = 60 + np.cumsum(rng.normal(0, 0.2, rows))
+    outside = 15 + np.cumsum(rng.normal(0, 0.1, rows))
+    wind = rng.uniform(0, 3, rows)
+    dew = humid / 5
+    solar = np.cumsum(rng.integers(0, 5, rows))
+    return [
+        f"{t:%Y-%m-%d %H:%M:%S},{a:.1f},{b:.1f},{c:.1f},{d:.1f},{e:.1f},{f}"
+        for t, a, b, c, d, e, f in zip(times, temp, humid, outside, wind, dew, solar)
+    ]
+
+
+@pytest.fixture
+def sensor_frame():
+    """센서 CSV와 같은 컬럼의 데이터프레임 (특성/모델 테스트용)"""
+    from sensor_schema import read_csv
+    return read_csv(('\n'.join([SENSOR_HEADER] + sensor_lines(3000)) + '\n').encode('utf-8'))
@@ -0,0 +1,98 @@
+import glob
+import os
+import re
+
+import pandas as pd
+
+from append_log import AppendLogReader, AppendLogWriter
+
+COLUMNS = ['예측시간', '내부온도', '내부습도']
+
+
+def record(minute):
+    return pd.Timestamp('2018-05-10 10:00') + pd.Timedelta(minutes=minute), 20.0 + minute / 10, 60.0
+
+
+def segment_order(path):
+    """세그먼트 봉인 순서: <이름>-<시각>.csv, 같은 초에 또 봉인하면 <이름>-<시각>-<n>.csv"""
+    stamp, n = re.search(r'-(\d{8}-\d{6})(?:-(\d+))?\.csv$', path).groups()
+    return stamp, int(n or 0)
+
+
+def read_all(path):
+    return [line.split(',')[0] for line in open(path, encoding='utf-8').read().splitlines()[1:]]
+
+
+def test_rotation_by_size_seals_segments(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = AppendLogWriter(path, COLUMNS, fsync='never', max_bytes=200)
+    for minute in range(30):
+        writer.append(*record(minute))
+    writer.close()
+
+    segments = sorted(glob.glob(str(tmp_path / 'log-*.csv')), key=segment_order)
+    assert segments
+    times = [t for segment in segments for t in read_all(segment)] + read_all(path)
+    assert times == [f"{record(m)[0]:%Y-%m-%d %H:%M:%S}" for m in range(30)]
+    for segment in segments:
+        assert open(segment, encoding='utf-8').readline().rstrip('\n') == ','.join(COLUMNS)
+
+
+def test_daily_rotation(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = AppendLogWriter(path, COLUMNS, fsync='never', rotate_daily=True)
+    writer.append(pd.Timestamp('2018-05-10 23:59'), 20.0, 60.0)
+    writer.append(pd.Timestamp('2018-05-11 00:00'), 20.1, 60.0)
+    writer.close()
+    segments = glob.glob(str(tmp_path / 'log-*.csv'))
+    assert len(segments) == 1
+    assert read_all(segments[0]) == ['2018-05-10 23:59:00']
+    assert read_all(path) == ['2018-05-11 00:00:00']
+
+
+def test_reset_keeps_only_header(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = AppendLogWriter(path, COLUMNS, fsync='never', buffer_size=10)
+    for minute in range(5):
+        writer.append(*record(minute))
+    writer.flush()
+    writer.append(*record(5))
+    writer.reset()
+    writer.close()
+    assert open(path, encoding='utf-8').read() == ','.join(COLUMNS) + '\n'
+
+
+def test_reader_follows_rotation_and_reset(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = AppendLogWriter(path, COLUMNS, fsync='never')
+    reader = AppendLogReader(path, '예측시간')
+    writer.append(*record(0))
+    assert len(reader.read_new()) == 1
+    writer.append(*record(1))
+    writer.rotate()
+    writer.append(*record(2))
+    # 회전 전에 추가된 줄과 새 파일의 줄을 모두 읽음
+    assert list(reader.read_new()['예측시간'].dt.minute) == [1, 2]
+    writer.reset()
+    writer.append(*record(3))
+    assert list(reader.read_new()['예측시간'].dt.minute) == [3]
+    writer.close()
+    reader.close()
+
+
+def test_reopen_terminates_torn_line(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    writer = AppendLogWriter(path, COLUMNS, fsync='never')
+    writer.append(*record(0))
+    writer.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('2018-05-10 10:01:00,20.1')
+    size = os.path.getsize(path)
+
+    writer = AppendLogWriter(path, COLUMNS, fsync='never')
+    writer.append(*record(2))
+    writer.close()
+    lines = open(path, encoding='utf-8').read().splitlines()
+    assert lines[2] == '2018-05-10 10:01:00,20.1'
+    assert lines[3].startswith('2018-05-10 10:02:00,')
+    assert os.path.getsize(path) == size + 1 + len(lines[3]) + 1
@@ -0,0 +1,55 @@
+import numpy as np
+
+from features import FeatureEngine, FeatureSet, compute_features
+
+
+def feature_values(frame, feature_set):
+    values = frame[feature_set.columns].to_numpy(dtype=float)
+    values[::97, 0] = np.nan
+    return values
+
+
+def test_streaming_matches_batch(sensor_frame):
+    feature_set = FeatureSet.default()
+    frame = sensor_frame.iloc[:500].copy()
+    values = feature_values(frame, feature_set)
+    frame[feature_set.columns] = values
+    expected = compute_features(frame, feature_set).to_numpy()
+
+    engine = FeatureEngine(feature_set)
+    for i, row in enumerate(values):
+        engine.update(row[None, :])
+        np.testing.assert_allclose(engine.values()[0], expected[i], rtol=1e-9, atol=1e-9)
+
+
+def test_from_history_matches_batch(sensor_frame):
+    feature_set = FeatureSet.default()
+    values = feature_values(sensor_frame, feature_set)
+    frame = sensor_frame.copy()
+    frame[feature_set.columns] = values
+    expected = compute_features(frame, feature_set).to_numpy()
+
+    positions = np.array([0, 5, feature_set.capacity, 1000, len(values) - 1])
+    engine = FeatureEngine.from_history(values, positions, feature_set)
+    np.testing.assert_allclose(engine.values(), expected[positions], rtol=1e-9, atol=1e-9)
+
+    # 이어서 스트리밍으로 갱신해도 같은 값
+    engine = FeatureEngine.from_history(values, [1000], feature_set)
+    for i in range(1001, 1100):
+        engine.update(values[i][None, :])
+    np.testing.assert_allclose(engine.values()[0], expected[1099], rtol=1e-9, atol=1e-9)
+
+
+def test_stacked_engines_keep_series_separate(sensor_frame):
+    feature_set = FeatureSet.default()
+    values = feature_values(sensor_frame, feature_set)
+    histories = [values[:40], values[1000:1400], values[2000:2003] + 5]
+    engines = [FeatureEngine.from_history(h, [len(h) - 1], feature_set) for h in histories]
+    stacked = FeatureEngine.stack(engines)
+    np.testing.assert_array_equal(stacked.values(), np.vstack([e.values() for e in engines]))
+
+    row = stacked.last + 0.1
+    stacked.update(row)
+    for i, engine in enumerate(engines):
+        engine.update(row[i:i + 1])
+        np.testing.assert_allclose(stacked.values()[i], engine.values()[0], rtol=1e-12, atol=1e-12)
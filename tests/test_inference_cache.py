@@ -0,0 +1,56 @@
+import lightgbm as lgb
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from inference_cache import InferenceCache
+
+COLUMNS = ['내부온도', '내부습도']
+
+
+def model_dict(frame, version):
+    X = frame[COLUMNS].to_numpy(dtype=float)
+    scaler = StandardScaler().fit(X)
+    model = lgb.LGBMRegressor(n_estimators=30, verbose=-1).fit(scaler.transform(X), frame['내부습도'])
+    return {'model': model, 'scaler': scaler, 'version': version}
+
+
+def direct(md):
+    return lambda X: md['model'].predict(md['scaler'].transform(X))
+
+
+def test_cached_predictions_match_direct_inference(sensor_frame):
+    md = model_dict(sensor_frame, 'v1')
+    cache = InferenceCache(max_entries=1000, ttl=0, decimals=1)
+    X = sensor_frame[COLUMNS].to_numpy(dtype=float)[:800]
+    # 반복되는 행, float32로 저장된 격자 값, 격자 밖의 값이 섞인 배치
+    X = np.vstack([X, X[:100], X[:50].astype(np.float32), X[:30] + 0.037])
+    expected = direct(md)(X)
+
+    first = cache.predict(md, X, direct(md))
+    second = cache.predict(md, X, direct(md))
+    np.testing.assert_allclose(first, expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(second, expected, rtol=0, atol=1e-12)
+    assert cache.hits > 0 and cache.bypassed > 0
+    for row in X[::97]:
+        np.testing.assert_allclose(cache.predict(md, row[None, :], direct(md)), direct(md)(row[None, :]),
+                                   rtol=0, atol=1e-12)
+
+
+def test_cache_is_keyed_by_model_version(sensor_frame):
+    old = model_dict(sensor_frame, 'v1')
+    new = model_dict(sensor_frame.iloc[::-1].reset_index(drop=True).assign(
+        내부습도=lambda f: f['내부습도'] + 3), 'v2')
+    cache = InferenceCache(max_entries=1000, ttl=0, decimals=1)
+    X = sensor_frame[COLUMNS].to_numpy(dtype=float)[:200]
+    cache.predict(old, X, direct(old))
+    np.testing.assert_allclose(cache.predict(new, X, direct(new)), direct(new)(X), rtol=0, atol=1e-12)
+
+
+def test_eviction_keeps_results_correct(sensor_frame):
+    md = model_dict(sensor_frame, 'v1')
+    cache = InferenceCache(max_entries=50, ttl=0, decimals=1)
+    X = sensor_frame[COLUMNS].to_numpy(dtype=float)
+    for start in range(0, 600, 150):
+        batch = X[start:start + 300]
+        np.testing.assert_allclose(cache.predict(md, batch, direct(md)), direct(md)(batch), rtol=0, atol=1e-12)
+    assert cache.evictions > 0
@@ -0,0 +1,117 @@
+import os
+import time
+
+import pytest
+
+import sensor_store
+from conftest import SENSOR_HEADER, sensor_lines
+from sensor_schema import read_csv
+from sensor_store import ROLLUP_TIERS, CsvTable
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_store, 'PARTIAL_LINE_SECONDS', 0.05)
+    return tmp_path / 'sensor.csv'
+
+
+def write(path, text, mode='a'):
+    with open(path, mode, encoding='utf-8') as f:
+        f.write(text)
+
+
+def expected(path, rows):
+    """파일 전체를 새로 읽은 결과의 앞 rows행"""
+    raw = path.read_bytes()
+    if not raw.endswith(b'\n'):
+        raw += b'\n'
+    return read_csv(raw).iloc[:rows].reset_index(drop=True)
+
+
+def assert_loaded(table, path, rows):
+    frame = table.snapshot().reset_index(drop=True)
+    assert len(frame) == rows
+    assert frame.equals(expected(path, rows))
+
+
+def test_tail_reads_match_full_read(csv_path):
+    lines = sensor_lines(3000)
+    write(csv_path, '\n'.join([SENSOR_HEADER] + lines[:100]) + '\n', 'w')
+    table = CsvTable(str(csv_path), '저장시간', rollups=ROLLUP_TIERS)
+    assert_loaded(table, csv_path, 100)
+
+    # 여유 공간보다 많이 추가되어 배열이 여러 번 커지는 경우
+    i = 100
+    while i < len(lines):
+        k = 1 + i % 37
+        write(csv_path, '\n'.join(lines[i:i + k]) + '\n')
+        i += k
+        table.snapshot()
+    assert_loaded(table, csv_path, len(lines))
+    fresh = CsvTable(str(csv_path), '저장시간', rollups=ROLLUP_TIERS)
+    assert table.rollup('1h').equals(fresh.rollup('1h'))
+
+
+def test_returned_snapshot_does_not_see_later_rows(csv_path):
+    lines = sensor_lines(50)
+    write(csv_path, '\n'.join([SENSOR_HEADER] + lines[:10]) + '\n', 'w')
+    table = CsvTable(str(csv_path), '저장시간')
+    before = table.snapshot()
+    last = before.iloc[-1].copy()
+    write(csv_path, '\n'.join(lines[10:]) + '\n')
+    assert len(table.snapshot()) == 50
+    assert len(before) == 10
+    assert before.iloc[-1].equals(last)
+
+
+def test_partial_last_line_is_loaded_once_settled(csv_path):
+    lines = sensor_lines(20)
+    write(csv_path, '\n'.join([SENSOR_HEADER] + lines[:10]) + '\n', 'w')
+    table = CsvTable(str(csv_path), '저장시간')
+    assert len(table.snapshot()) == 10
+
+    write(csv_path, lines[10])
+    # 쓰는 중일 수 있으므로 바로는 읽지 않음
+    assert len(table.snapshot()) == 10
+    time.sleep(0.1)
+    assert_loaded(table, csv_path, 11)
+
+    # 줄이 그대로 끝나면 같은 행을 다시 추가하지 않음
+    write(csv_path, '\n' + lines[11] + '\n')
+    assert_loaded(table, csv_path, 12)
+
+
+def test_partial_line_extended_after_loading(csv_path):
+    lines = sensor_lines(20)
+    write(csv_path, '\n'.join([SENSOR_HEADER] + lines[:10]) + '\n', 'w')
+    table = CsvTable(str(csv_path), '저장시간')
+    table.snapshot()
+    write(csv_path, lines[10][:-2])
+    table.snapshot()
+    time.sleep(0.1)
+    assert len(table.snapshot()) == 11
+
+    # 읽은 뒤에 이어서 써진 줄은 완성된 값으로 바뀜
+    write(csv_path, lines[10][-2:] + '\n')
+    assert_loaded(table, csv_path, 11)
+
+
+def test_unterminated_file_without_writer(csv_path):
+    write(csv_path, '\n'.join([SENSOR_HEADER] + sensor_lines(10)), 'w')
+    old = time.time() - 10
+    os.utime(csv_path, (old, old))
+    table = CsvTable(str(csv_path), '저장시간')
+    assert len(table.snapshot()) == 9
+    time.sleep(0.1)
+    assert_loaded(table, csv_path, 10)
+
+
+def test_out_of_order_rows_are_sorted(csv_path):
+    lines = sensor_lines(30)
+    write(csv_path, '\n'.join([SENSOR_HEADER] + lines[:20]) + '\n', 'w')
+    table = CsvTable(str(csv_path), '저장시간')
+    table.snapshot()
+    write(csv_path, lines[5] + '\n')
+    frame = table.snapshot()
+    assert len(frame) == 21
+    assert frame['저장시간'].is_monotonic_increasing
@@ -0,0 +1,18 @@
+import json
+import math
+
+from snapshot_api import SnapshotResponse, json_safe
+
+
+def test_nan_and_infinity_become_null():
+    payload = {'temp': math.nan, 'rows': [1.5, math.inf, -math.inf, {'h': math.nan}], 'label': 'x', 'n': 3}
+    assert json_safe(payload) == {'temp': None, 'rows': [1.5, None, None, {'h': None}], 'label': 'x', 'n': 3}
+
+
+def test_response_is_strict_json():
+    response = SnapshotResponse({'metrics': {'내부온도': float('nan'), '내부습도': 61.2}, 'history': [(1, math.nan)]})
+    body = response.body.decode('utf-8')
+    assert 'NaN' not in body
+    # 표준 JSON 파서(브라우저 JSON.parse와 같은 규칙)로 읽힘
+    decoded = json.loads(body, parse_constant=lambda name: (_ for _ in ()).throw(ValueError(name)))
+    assert decoded == {'metrics': {'내부온도': None, '내부습도': 61.2}, 'history': [[1, None]]}
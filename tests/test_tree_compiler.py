@@ -0,0 +1,43 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from tree_compiler import compile_model_dict, sample_inputs, verify
+
+COLUMNS = ['내부온도', '내부습도']
+
+
+def train(frame, nan_fraction=0.0, **params):
+    X = frame[COLUMNS].copy()
+    if nan_fraction:
+        mask = np.random.default_rng(1).random(X.shape) < nan_fraction
+        X = X.mask(mask)
+    scaler = StandardScaler().fit(X)
+    model = lgb.LGBMRegressor(n_estimators=40, num_leaves=15, verbose=-1, **params)
+    model.fit(scaler.transform(X), frame['내부온도'].shift(-1).ffill())
+    return {'model': model, 'scaler': scaler}
+
+
+def lightgbm_predict(model_dict, X):
+    scaled = model_dict['scaler'].transform(pd.DataFrame(X, columns=COLUMNS))
+    return model_dict['model'].predict(scaled)
+
+
+@pytest.mark.parametrize('nan_fraction', [0.0, 0.1])
+def test_compiled_matches_lightgbm(sensor_frame, nan_fraction):
+    model_dict = train(sensor_frame, nan_fraction)
+    compiled = compile_model_dict(model_dict)
+    X = sample_inputs(compiled, rows=2000)
+    np.testing.assert_allclose(compiled.predict(X), lightgbm_predict(model_dict, X), rtol=0, atol=1e-9)
+    assert verify(model_dict, compiled, X) <= 1e-9
+
+
+def test_compiled_matches_lightgbm_on_missing_values(sensor_frame):
+    model_dict = train(sensor_frame, nan_fraction=0.1)
+    compiled = compile_model_dict(model_dict)
+    X = sample_inputs(compiled, rows=500)
+    X[::3, 0] = np.nan
+    X[1::5, 1] = np.nan
+    np.testing.assert_allclose(compiled.predict(X), lightgbm_predict(model_dict, X), rtol=0, atol=1e-9)
@@ -0,0 +1,173 @@
+import os
+import pickle
+import threading
+import time
+
+import pandas as pd
+
+from metrics import get_metrics
+
+
+class Snapshot:
+    """
+    한 시점의 공유 상태 (발행된 뒤에는 바뀌지 않음)
+    조회 범위별 그래프처럼 요청이 있을 때만 필요한 값은 memo()로 스냅샷당 한 번만 계산한다
+    """
+
+    def __init__(self, version, current_time, values, errors=()):
+        self.version = version
+        self.current_time = current_time
+        self.values = values
+        self.errors = list(errors)
+        # 저장된 파일에서 복원한 스냅샷인지 (재시작 직후 첫 화면)
+        self.restored = False
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def memo(self, key, compute):
+        """key 값을 처음 요청될 때 계산해서 보관 (여러 세션이 동시에 요청해도 한 번만 계산)"""
+        value = self._memo.get(key, self._memo)
+        if value is not self._memo:
+            return value
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+
+class Ticker:
+    """
+    서버 프로세스당 하나인 공용 시계
+    tick_seconds마다 advance(현재 시간)으로 시간을 진행하고, 시간이나 데이터 버전(sources())이 바뀌면
+    build(현재 시간, 오류 목록)으로 스냅샷 값을 한 번 계산해서 버전 번호와 함께 발행한다
+    각 세션은 snapshot 속성을 읽기만 하므로 세션 수와 무관하게 계산은 한 번이다
+    state_path를 주면 마지막 스냅샷을 save_interval초마다 저장하고, 다음 시작 때 그 스냅샷을 바로 발행한 뒤
+    (그 시점부터 시계를 이어 감) 새 값은 백그라운드 스레드에서 계산한다
+    """
+
+    def __init__(self, start_time, advance, build, sources=None, tick_seconds=1.0, name="ticker",
+                 state_path=None, save_interval=10.0):
+        self.advance = advance
+        self.build = build
+        self.sources = sources
+        self.tick_seconds = tick_seconds
+        self.name = name
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self._saved_at = time.monotonic()
+        self._saved_key = None
+        self._key = None
+        self._version = 0
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+        restored = load_snapshot(state_path) if state_path else None
+        if restored is not None:
+            # _key가 없으므로 첫 tick에서 새로 계산한 스냅샷으로 바뀜
+            self._snapshot = restored
+            get_metrics().counter('ticker_restored_total', '저장된 스냅샷으로 시작한 횟수', ticker=self.name).inc()
+            print(f"스냅샷 복원 - 조회 시간: {restored.current_time}")
+        else:
+            self._publish(pd.Timestamp(start_time))
+
+    @property
+    def snapshot(self):
+        """가장 최근에 발행된 스냅샷 (참조 교체로 발행하므로 잠금 없이 읽음)"""
+        return self._snapshot
+
+    def start(self):
+        """백그라운드 스레드 시작 (한 번만)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def tick(self):
+        """한 번 진행하고, 바뀐 것이 있으면 새 스냅샷 발행"""
+        current_time = self._snapshot.current_time
+        try:
+            next_time = pd.Timestamp(self.advance(current_time))
+        except Exception as e:
+            print(f"시간 업데이트 오류: {str(e)}")
+            next_time = current_time
+        self._publish(next_time)
+        return self._snapshot
+
+    def _publish(self, current_time):
+        key = (current_time, self.sources() if self.sources is not None else None)
+        if key == self._key:
+            return
+        errors = []
+        with get_metrics().timed('ticker_build_seconds', '공용 스냅샷 계산 시간', ticker=self.name):
+            values = self.build(current_time, errors)
+        self._version += 1
+        self._snapshot = Snapshot(self._version, current_time, values, errors)
+        self._key = key
+        get_metrics().counter('ticker_snapshots_total', '발행한 스냅샷 수', ticker=self.name).inc()
+
+    def save(self):
+        """현재 스냅샷이 마지막으로 저장한 뒤 바뀌었으면 (memo에 채워진 그래프 포함) state_path에 저장"""
+        snapshot = self._snapshot
+        key = (snapshot.version, len(snapshot._memo))
+        if not self.state_path or snapshot.restored or key == self._saved_key:
+            return
+        save_snapshot(snapshot, self.state_path)
+        self._saved_key = key
+
+    def _run(self):
+        if self._key is None:
+            # 복원한 스냅샷이면 같은 시점의 값을 바로 다시 계산
+            try:
+                self._publish(self._snapshot.current_time)
+            except Exception as e:
+                print(f"스냅샷 발행 오류: {str(e)}")
+        next_wall = time.monotonic() + self.tick_seconds
+        while not self._stop.wait(max(0.0, next_wall - time.monotonic())):
+            # 늦어진 만큼 몰아서 진행하지 않고 다음 간격부터 다시 맞춤
+            next_wall = max(next_wall, time.monotonic() - self.tick_seconds) + self.tick_seconds
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"스냅샷 발행 오류: {str(e)}")
+            if self.state_path and time.monotonic() - self._saved_at >= self.save_interval:
+                self._saved_at = time.monotonic()
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"스냅샷 저장 오류: {str(e)}")
+
+
+def save_snapshot(snapshot, path):
+    """스냅샷을 memo에 계산해 둔 값까지 피클로 저장 (임시 파일에 쓴 뒤 교체)"""
+    state = {
+        'current_time': snapshot.current_time,
+        'values': snapshot.values,
+        'errors': snapshot.errors,
+        'memo': dict(snapshot._memo),
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """save_snapshot으로 저장한 스냅샷 (파일이 없거나 읽을 수 없으면 None)"""
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"스냅샷 복원 오류: {str(e)}")
+        return None
+    snapshot = Snapshot(0, state['current_time'], state['values'], state['errors'])
+    snapshot._memo.update(state['memo'])
+    snapshot.restored = True
+    return snapshot
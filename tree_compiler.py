@@ -0,0 +1,332 @@
+import argparse
+
+import numpy as np
+
+# 출력 변환이 필요 없는 objective
+_IDENTITY_OBJECTIVES = {'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape'}
+# 원래 스케일로 되돌릴 때 exp를 적용하는 objective
+_EXP_OBJECTIVES = {'poisson', 'gamma', 'tweedie'}
+
+_MISSING_NONE, _MISSING_ZERO, _MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {'None': _MISSING_NONE, 'Zero': _MISSING_ZERO, 'NaN': _MISSING_NAN}
+
+# 순회 평가 시 한 번에 내려보낼 최대 행 수 (행 x 트리 인덱스 배열 메모리 제한)
+_CHUNK_ROWS = 8192
+# 트리 하나의 조회표 최대 셀 수 (넘으면 순회 평가)
+_MAX_TABLE_CELLS = 4096
+# 이보다 큰 임계값은 LightGBM이 결측값 분기에 쓰는 표식 (검증 입력 범위에서 제외)
+_SENTINEL_THRESHOLD = 1e30
+
+
+def scaler_affine(scaler):
+    """선형 스케일러를 X * mul + add 형태의 계수로 변환 (지원하지 않는 스케일러는 None)"""
+    name = type(scaler).__name__
+    if name == 'StandardScaler':
+        mul = 1.0 / scaler.scale_ if scaler.scale_ is not None else 1.0
+        add = -scaler.mean_ * mul if scaler.mean_ is not None else 0.0
+    elif name == 'MinMaxScaler':
+        mul, add = scaler.scale_, scaler.min_
+    elif name == 'RobustScaler':
+        mul = 1.0 / scaler.scale_ if scaler.scale_ is not None else 1.0
+        add = -scaler.center_ * mul if scaler.center_ is not None else 0.0
+    else:
+        return None
+    return np.asarray(mul, dtype=float), np.asarray(add, dtype=float)
+
+
+class CompiledTreeModel:
+    """
+    LightGBM 트리를 평탄화한 NumPy 배열 모델 (스케일러는 분기 임계값에 반영되어 원본 입력을 그대로 사용)
+
+    평가 방식
+    - 조회표: 트리마다 분기 임계값으로 나뉜 구간 조합별 잎 값을 미리 계산해 두고,
+      특성별로 전체 임계값에 대해 searchsorted 한 번 + 트리별 표 조회로 예측
+    - 순회: 조회표가 너무 크거나 결측 처리가 필요한 행은 (행, 노드) 쌍을 한꺼번에 내려보내고
+      잎에 도달한 쌍은 다음 단계에서 제외
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, nan_left,
+                 zero_value, zero_missing, value, roots, max_depth, n_features,
+                 average_output=False, transform='identity'):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.nan_left = nan_left
+        self.zero_value = zero_value
+        self.zero_missing = zero_missing
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.average_output = bool(average_output)
+        self.transform = str(transform)
+        self._is_leaf = self.left == np.arange(len(self.left))
+        self._tables = self._build_tables()
+
+    def predict(self, X):
+        """(n, n_features) 원본 입력에 대한 예측값 (n,)"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        if self._tables is None:
+            out = self._predict_traverse(X)
+        else:
+            nan_rows = np.isnan(X).any(axis=1)
+            if nan_rows.any():
+                out = np.empty(X.shape[0])
+                out[~nan_rows] = self._predict_tables(X[~nan_rows])
+                out[nan_rows] = self._predict_traverse(X[nan_rows])
+            else:
+                out = self._predict_tables(X)
+        if self.average_output:
+            out /= len(self.roots)
+        if self.transform == 'exp':
+            np.exp(out, out=out)
+        return out
+
+    def _predict_tables(self, X):
+        edges, maps, strides, offsets, table = self._tables
+        cell = np.broadcast_to(offsets[:, None], (len(offsets), X.shape[0])).copy()
+        for f in range(self.n_features):
+            bins = np.searchsorted(edges[f], X[:, f], side='left')
+            cell += maps[f][:, bins] * strides[f][:, None]
+        return table[cell].sum(axis=0)
+
+    def _predict_traverse(self, X):
+        out = np.zeros(X.shape[0])
+        for start in range(0, X.shape[0], _CHUNK_ROWS):
+            chunk = X[start:start + _CHUNK_ROWS]
+            rows = np.repeat(np.arange(chunk.shape[0]), len(self.roots))
+            nodes = np.tile(self.roots, chunk.shape[0])
+            leaves = self._traverse(chunk, rows, nodes)
+            np.add.at(out[start:start + _CHUNK_ROWS], rows, self.value[leaves])
+        return out
+
+    def _traverse(self, X, rows, nodes):
+        """(행, 시작 노드) 쌍들을 잎까지 내려보내고 도달한 잎 노드 반환"""
+        nodes = nodes.copy()
+        active = np.flatnonzero(~self._is_leaf[nodes])
+        has_zero_missing = self.zero_missing.any()
+        while active.size:
+            node = nodes[active]
+            x = X[rows[active], self.feature[node]]
+            go_left = x <= self.threshold[node]
+            nan = np.isnan(x)
+            if nan.any():
+                go_left[nan] = self.nan_left[node[nan]]
+            if has_zero_missing:
+                is_zero = self.zero_missing[node] & (x == self.zero_value[node])
+                go_left[is_zero] = self.default_left[node[is_zero]]
+            node = np.where(go_left, self.left[node], self.right[node])
+            nodes[active] = node
+            active = active[~self._is_leaf[node]]
+        return nodes
+
+    def _build_tables(self):
+        """트리별 구간 조합 -> 잎 값 조회표 생성 (표가 너무 크거나 0 결측 분기가 있으면 None)"""
+        if self.zero_missing.any():
+            return None
+        n_trees = len(self.roots)
+        tree_of = np.empty(len(self.feature), dtype=np.int64)
+        for t, root in enumerate(self.roots):
+            end = self.roots[t + 1] if t + 1 < n_trees else len(self.feature)
+            tree_of[root:end] = t
+        internal = ~self._is_leaf
+
+        edges = []
+        local = [[None] * n_trees for _ in range(self.n_features)]
+        sizes = np.ones(n_trees, dtype=np.int64)
+        for f in range(self.n_features):
+            mask = internal & (self.feature == f)
+            edges.append(np.unique(self.threshold[mask]))
+            for t in range(n_trees):
+                thresholds = np.unique(self.threshold[mask & (tree_of == t)])
+                local[f][t] = thresholds
+                sizes[t] *= len(thresholds) + 1
+        if sizes.max() > _MAX_TABLE_CELLS:
+            return None
+
+        # 특성별 전체 임계값 구간 번호 -> 트리별 구간 번호
+        maps, strides = [], []
+        stride = np.ones(n_trees, dtype=np.int64)
+        for f in range(self.n_features):
+            f_map = np.zeros((n_trees, len(edges[f]) + 1), dtype=np.int64)
+            for t in range(n_trees):
+                f_map[t, 1:] = np.searchsorted(local[f][t], edges[f], side='right')
+            maps.append(f_map)
+            strides.append(stride.copy())
+            stride *= np.array([len(local[f][t]) + 1 for t in range(n_trees)])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        # 구간마다 대표값 하나로 트리를 순회해서 잎 값 채우기
+        table = np.empty(int(sizes.sum()))
+        for t in range(n_trees):
+            grids = np.meshgrid(*[
+                np.append(local[f][t], np.inf) for f in range(self.n_features)
+            ], indexing='ij')
+            # 셀 번호 = sum(bin_f * stride_f) 이므로 특성 0이 가장 빠르게 변하도록 정렬
+            points = np.column_stack([g.transpose().ravel() for g in grids])
+            rows = np.arange(points.shape[0])
+            leaves = self._traverse(points, rows, np.full(points.shape[0], self.roots[t]))
+            table[offsets[t]:offsets[t] + sizes[t]] = self.value[leaves]
+        return edges, maps, np.array(strides), offsets, table
+
+    def save(self, path):
+        np.savez(path, **{key: value for key, value in self.__dict__.items()
+                          if not key.startswith('_')})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+
+def compile_model_dict(model_dict):
+    """
+    {'model', 'scaler'} 딕셔너리를 CompiledTreeModel로 변환
+    스케일러가 선형이 아니거나 지원하지 않는 트리(범주형 분기 등)면 ValueError
+    """
+    model = model_dict['model']
+    booster = getattr(model, 'booster_', model)
+    num_iteration = getattr(model, 'best_iteration_', None) or None
+    dump = booster.dump_model(num_iteration=num_iteration)
+
+    objective = (dump.get('objective') or 'regression').split()[0]
+    if objective in _IDENTITY_OBJECTIVES:
+        transform = 'identity'
+    elif objective in _EXP_OBJECTIVES:
+        transform = 'exp'
+    else:
+        raise ValueError(f"지원하지 않는 objective: {objective}")
+
+    n_features = dump['max_feature_idx'] + 1
+    scaler = model_dict.get('scaler')
+    if scaler is None:
+        mul, add = np.ones(n_features), np.zeros(n_features)
+    else:
+        affine = scaler_affine(scaler)
+        if affine is None:
+            raise ValueError(f"스케일러를 임계값에 반영할 수 없음: {type(scaler).__name__}")
+        mul = np.broadcast_to(affine[0], (n_features,)).astype(float)
+        add = np.broadcast_to(affine[1], (n_features,)).astype(float)
+        if (mul <= 0).any():
+            raise ValueError("스케일 계수가 양수가 아님")
+
+    nodes = {key: [] for key in (
+        'feature', 'threshold', 'left', 'right', 'default_left', 'nan_left',
+        'zero_value', 'zero_missing', 'value')}
+    roots = []
+    max_depth = 0
+
+    def add_node(node, depth):
+        nonlocal max_depth
+        index = len(nodes['feature'])
+        for values in nodes.values():
+            values.append(0)
+        if 'leaf_value' in node:
+            # 잎 노드: 어느 방향으로 가도 자기 자신
+            nodes['feature'][index] = 0
+            nodes['threshold'][index] = np.inf
+            nodes['left'][index] = nodes['right'][index] = index
+            nodes['nan_left'][index] = nodes['default_left'][index] = True
+            nodes['value'][index] = node['leaf_value']
+            max_depth = max(max_depth, depth)
+            return index
+        if node.get('decision_type', '<=') != '<=':
+            raise ValueError("범주형 분기는 지원하지 않음")
+        feature = node['split_feature']
+        threshold = node['threshold']
+        missing_type = _MISSING_TYPES[node.get('missing_type', 'None')]
+        default_left = bool(node.get('default_left', True))
+        # 스케일된 공간의 x_s <= t 는 원본 공간의 x <= (t - add) / mul 과 같다
+        nodes['feature'][index] = feature
+        nodes['threshold'][index] = (threshold - add[feature]) / mul[feature]
+        nodes['default_left'][index] = default_left
+        if missing_type == _MISSING_NONE:
+            # 결측값은 0(스케일된 공간)으로 취급
+            nodes['nan_left'][index] = 0.0 <= threshold
+        else:
+            nodes['nan_left'][index] = default_left
+        nodes['zero_missing'][index] = missing_type == _MISSING_ZERO
+        nodes['zero_value'][index] = -add[feature] / mul[feature]
+        nodes['left'][index] = add_node(node['left_child'], depth + 1)
+        nodes['right'][index] = add_node(node['right_child'], depth + 1)
+        return index
+
+    for tree in dump['tree_info']:
+        roots.append(add_node(tree['tree_structure'], 0))
+
+    return CompiledTreeModel(
+        feature=np.asarray(nodes['feature'], dtype=np.int32),
+        threshold=np.asarray(nodes['threshold'], dtype=np.float64),
+        left=np.asarray(nodes['left'], dtype=np.int32),
+        right=np.asarray(nodes['right'], dtype=np.int32),
+        default_left=np.asarray(nodes['default_left'], dtype=bool),
+        nan_left=np.asarray(nodes['nan_left'], dtype=bool),
+        zero_value=np.asarray(nodes['zero_value'], dtype=np.float64),
+        zero_missing=np.asarray(nodes['zero_missing'], dtype=bool),
+        value=np.asarray(nodes['value'], dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        n_features=n_features,
+        average_output=bool(dump.get('average_output', False)),
+        transform=transform,
+    )
+
+
+def sample_inputs(compiled, rows=1000, seed=0):
+    """
+    분기 임계값 범위를 조금 넘게 덮는 검증용 입력 (소수 첫째 자리로 반올림)
+    결측값 분기에 쓰이는 1e300 같은 표식 임계값은 실제 값 범위가 아니므로 제외
+    """
+    rng = np.random.default_rng(seed)
+    columns = []
+    for f in range(compiled.n_features):
+        thresholds = compiled.threshold[(compiled.feature == f) & ~compiled._is_leaf]
+        thresholds = thresholds[np.isfinite(thresholds) & (np.abs(thresholds) <= _SENTINEL_THRESHOLD)]
+        low, high = (thresholds.min(), thresholds.max()) if thresholds.size else (0.0, 1.0)
+        margin = (high - low) * 0.1 + 1.0
+        columns.append(rng.uniform(low - margin, high + margin, rows))
+    return np.round(np.column_stack(columns), 1)
+
+
+def verify(model_dict, compiled, X, tolerance=1e-9):
+    """원본 모델과 컴파일된 모델의 예측 차이 최댓값 (tolerance 초과 시 ValueError)"""
+    import pandas as pd
+    scaler = model_dict.get('scaler')
+    if scaler is not None:
+        columns = getattr(scaler, 'feature_names_in_', None)
+        X_scaled = scaler.transform(pd.DataFrame(X, columns=columns) if columns is not None else X)
+    else:
+        X_scaled = X
+    expected = np.asarray(model_dict['model'].predict(X_scaled), dtype=float)
+    diff = float(np.max(np.abs(expected - compiled.predict(X)))) if len(X) else 0.0
+    if diff > tolerance:
+        raise ValueError(f"컴파일된 모델 예측 차이가 큼: {diff}")
+    return diff
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    from model_registry import get_registry
+
+    parser = argparse.ArgumentParser(description="LightGBM 모델을 NumPy 배열 모델(.npz)로 변환")
+    parser.add_argument("--rows", type=int, default=10000, help="검증에 사용할 행 수")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    for name in registry.files:
+        model_dict = registry.get(name)
+        compiled = compile_model_dict(model_dict)
+        out_path = os.path.splitext(registry.path(name))[0] + '.npz'
+        compiled.save(out_path)
+
+        X = sample_inputs(compiled, args.rows)
+        diff = verify(model_dict, compiled, X)
+        started = time.perf_counter()
+        compiled.predict(X)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: 트리 {len(compiled.roots)}개, 노드 {len(compiled.feature)}개, "
+              f"최대 오차 {diff:.2e}, {args.rows}행 {elapsed * 1000:.1f}ms → {out_path}")